@@ -116,7 +116,8 @@ class OrganizationAdmin(admin.ModelAdmin):
     schedule_button.allow_tags = True
     schedule_button.short_description = _('Compute a complete schedule')
     readonly_fields = ('schedule_button',)
-    fields = ['name', 'description', 'access_token', 'admins', 'schedule_button', 'max_compute_time', ]
+    fields = ['name', 'description', 'access_token', 'admins', 'schedule_button', 'max_compute_time',
+              'balancing_formulation', 'elastic_constraints', 'horizon_length', 'horizon_overlap', ]
     inlines = [ScheduleRunInline, AgentInline, CategoryInline, MaxTaskAffectationInline, MaxTimeTaskAffectationInline,
                TaskInline, ]
 
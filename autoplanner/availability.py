@@ -0,0 +1,45 @@
+import bisect
+
+__author__ = 'Matthieu Gallet'
+
+
+def is_available(start_time, end_time, start, end) -> bool:
+    """Return `True` if an agent present from `start_time` to `end_time` (`None` when undefined) is present during the
+    whole period from `start` to `end`"""
+    return (start_time is None or start_time <= start) and (end_time is None or end_time >= end)
+
+
+class AvailabilityIndex(object):
+    """Sorted index of the availability periods of agents.
+
+    An agent is unavailable for a task from `start` to `end` when it arrives after `start` or leaves before `end`
+    (undefined arrival or departure times never exclude anything).
+    Each query costs two binary searches and returns the unavailable agents without scanning the available ones.
+
+    >>> index = AvailabilityIndex([(1, None, None), (2, 10, None), (3, None, 20), (4, 5, 30)])
+    >>> sorted(index.unavailable_agents(8, 25))
+    [2, 3]
+    """
+
+    def __init__(self, agents):
+        """
+        :param agents: iterable of `(agent_pk, start_time, end_time)`, times being `None` when undefined
+        """
+        agents = list(agents)
+        by_start = sorted((start_time, agent_pk) for (agent_pk, start_time, end_time) in agents
+                          if start_time is not None)
+        by_end = sorted((end_time, agent_pk) for (agent_pk, start_time, end_time) in agents
+                        if end_time is not None)
+        self.start_times = [x[0] for x in by_start]
+        self.agent_pks_by_start_time = [x[1] for x in by_start]
+        self.end_times = [x[0] for x in by_end]
+        self.agent_pks_by_end_time = [x[1] for x in by_end]
+        self.periods = {agent_pk: (start_time, end_time) for (agent_pk, start_time, end_time) in agents}
+
+    def unavailable_agents(self, start, end) -> set:
+        """Return the set of agents that are not present during the whole period from `start` to `end`"""
+        arrive_after = bisect.bisect_right(self.start_times, start)
+        leave_before = bisect.bisect_left(self.end_times, end)
+        result = set(self.agent_pks_by_start_time[arrive_after:])
+        result.update(self.agent_pks_by_end_time[:leave_before])
+        return result
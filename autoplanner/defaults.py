@@ -8,4 +8,21 @@ DF_PROJECT_NAME = 'AutoPlanner'
 DF_SITE_SEARCH_VIEW = None
 # Make this unique, and don't share it with anybody.
 LP_SOLVE_PATH = 'lp_solve'
+# if set, LP models are written to (and kept in) this directory instead of being piped to lp_solve
+LP_SOLVE_MODEL_DIR = None
+# solver used for computing schedules: 'lp_solve', 'milp' (requires SciPy), 'highs' (requires highspy),
+# 'portfolio' or the dotted path of a SolverBackend, optionally followed by options ('lp_solve -piv1')
+SOLVER_BACKEND = 'lp_solve'
+# solver configurations raced by the 'portfolio' solver
+SOLVER_PORTFOLIO = ['lp_solve', 'lp_solve -piv0', 'lp_solve -piv1']
+# number of independent parts of a schedule that are solved in parallel (None for the number of CPUs)
+SOLVER_WORKERS = None
+# reuse the result of a previous computation of the same model instead of solving it again
+REUSE_IDENTICAL_SCHEDULES = True
+# max time (in seconds) of the heuristic that computes schedule previews and starting points of the solvers
+PREVIEW_COMPUTE_TIME = 1.
+# max time (in seconds) of each check of the diagnosis of schedules without solution (0 to disable the diagnosis)
+DIAGNOSIS_COMPUTE_TIME = 60.
+# solve schedules without their balancing and max affectation rows, then add only the violated rows and solve again
+LAZY_CONSTRAINTS = False
 REFRESH_DURATION = '1H'
@@ -0,0 +1,92 @@
+from django.utils.translation import ugettext as _
+
+from autoplanner.presolve import presolve
+from autoplanner.schedule import Scheduler
+from autoplanner.solvers import get_backend, check_feasibility
+
+__author__ = 'Matthieu Gallet'
+
+
+def get_group_labels(scheduler: Scheduler) -> dict:
+    """Return the label of each group of constraints that can be relaxed (see :meth:`Scheduler.relax`)"""
+    groups = {}
+    for category in sorted(scheduler.categories, key=lambda x: x.name):
+        if category.balancing_mode is not None and category.balancing_tolerance is not None:
+            groups[('balancing', category.pk)] = _('balancing of %(c)s') % {'c': category.name}
+        for index, max_affectation in enumerate(scheduler.max_task_affectations_by_category[category.pk]):
+            if max_affectation.task_maximum_time is not None:
+                value = max_affectation.task_maximum_time
+            else:
+                value = _('%(n)s tasks') % {'n': max_affectation.task_maximum_count}
+            mode = _('at least') if max_affectation.mode == max_affectation.MINIMUM else _('at most')
+            groups[('max_affectation', category.pk, index)] = _('%(m)s %(v)s of %(c)s per %(p)s') % \
+                {'m': mode, 'v': value, 'c': category.name, 'p': max_affectation.range_time_slice}
+    if scheduler.fixed_agent_by_task:
+        groups[('fixed_tasks', )] = _('fixed tasks')
+    if any(x != (None, None) for x in scheduler.availability_index.periods.values()):
+        groups[('availability', )] = _('availability of the resources')
+    return groups
+
+
+class Diagnosis(object):
+    """Find a small set of groups of constraints that cannot be satisfied together, for a scheduler without
+    solution.
+
+    The groups are the balancing of each category, each max affectation rule, the fixed tasks and the availability
+    of the agents. Remaining constraints (each task is performed by one agent, one task at a time) are always kept.
+    Each check only looks for a feasible solution (the objective is removed). All groups are first relaxed one at a
+    time (in parallel): the groups whose relaxation gives a solution belong to every conflict. The other groups are
+    then removed one by one while the model stays infeasible.
+    """
+
+    def __init__(self, scheduler: Scheduler, backend=None, max_compute_time=None, max_workers=None):
+        """
+        :param max_compute_time: max compute time of each check (an unknown result is considered as feasible)
+        """
+        self.scheduler = scheduler
+        self.solver = get_backend(backend)
+        self.max_compute_time = max_compute_time
+        self.max_workers = max_workers
+        self.groups = get_group_labels(scheduler)
+        # self.groups[group] = label of the group (see :meth:`Scheduler.relax`)
+
+    def check(self, relaxed_groups_list: list) -> list:
+        """Return, for each set of relaxed groups, `True` if the relaxed scheduler has a solution, `False` if it has
+        none, `None` if unknown"""
+        results = [None] * len(relaxed_groups_list)
+        to_check = []
+        for index, relaxed_groups in enumerate(relaxed_groups_list):
+            model = self.scheduler.relax(relaxed_groups).get_model()
+            model.objective = {}
+            presolved_model = presolve(model)
+            if presolved_model.infeasible:
+                results[index] = False
+            else:
+                to_check.append((index, presolved_model.model))
+        feasible = check_feasibility(self.solver, [x[1] for x in to_check], max_compute_time=self.max_compute_time,
+                                     max_workers=self.max_workers)
+        for (index, model), value in zip(to_check, feasible):
+            results[index] = value
+        return results
+
+    def run(self):
+        """Return the labels of a small set of conflicting groups, an empty list if there is no solution even without
+        any group, or `None` if no conflict has been proven"""
+        groups = list(self.groups)
+        all_groups = set(groups)
+        feasible = self.check([all_groups])[0]
+        if feasible is False:
+            return []
+        elif feasible is None:
+            return None
+        required = [group for (group, relaxed) in zip(groups, self.check([{x} for x in groups])) if relaxed]
+        candidates = [group for group in groups if group not in required]
+        if required and self.check([set(candidates)])[0] is False:
+            return [self.groups[x] for x in required]
+        kept = list(candidates)
+        for group in candidates:
+            if self.check([all_groups - set(required) - set(kept) | {group}])[0] is False:
+                kept.remove(group)
+        if kept == candidates and self.check([set()])[0] is not False:  # the complete model is not infeasible
+            return None
+        return [self.groups[x] for x in groups if x in required or x in kept]
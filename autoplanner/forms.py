@@ -3,7 +3,7 @@ from django.contrib.admin.widgets import AdminDateWidget, AdminSplitDateTime, Ad
 from django.core.validators import RegexValidator
 from django.utils.translation import ugettext_lazy as _
 
-from autoplanner.models import Task, default_day_start, Category, MaxTaskAffectation, Agent
+from autoplanner.models import Task, default_day_start, Category, MaxTaskAffectation, Agent, Organization
 from autoplanner.utils import TimeDeltaField
 
 __author__ = 'Matthieu Gallet'
@@ -30,6 +30,26 @@ class OrganizationMaxComputeTimeForm(forms.Form):
     max_compute_time = forms.IntegerField(required=False, min_value=0)
 
 
+class OrganizationBalancingFormulationForm(forms.Form):
+    balancing_formulation = forms.ChoiceField(label=_('Formulation of the balancing constraints'),
+                                              choices=((Organization.BALANCING_PAIRWISE,
+                                                        _('Compare all pairs of agents')),
+                                                       (Organization.BALANCING_RANGE,
+                                                        _('Bound agents between a minimum and a maximum'))))
+
+
+class OrganizationElasticConstraintsForm(forms.Form):
+    elastic_constraints = forms.BooleanField(required=False)
+
+
+class OrganizationHorizonLengthForm(forms.Form):
+    horizon_length = forms.IntegerField(required=False, min_value=1)
+
+
+class OrganizationHorizonOverlapForm(forms.Form):
+    horizon_overlap = forms.IntegerField(min_value=0)
+
+
 class CategoryNameForm(forms.Form):
     name = forms.CharField(label=_('Name'), max_length=500, min_length=1)
 
@@ -0,0 +1,348 @@
+import itertools
+import random
+import time
+
+from autoplanner.schedule import Scheduler, sliding_windows
+
+__author__ = 'Matthieu Gallet'
+
+
+class HeuristicSolver(object):
+    """Fast in-process heuristic, used for schedule previews and as starting point of the exact solvers.
+
+    It handles the same constraint families as :meth:`autoplanner.schedule.Scheduler.build_model` (all tasks must be
+    done, fixed tasks, one task of a category at a time, max affectations and balancing), but as penalties: a greedy
+    pass assigns each task to its cheapest agent, then a local search moves tasks to other agents or swaps the agents
+    of two tasks of the same category while this reduces the penalty (or, without violated constraint, increases the
+    total affinity). Random perturbations are applied when the search is stuck.
+    The result is a valid schedule only if :attr:`violations` is empty.
+    """
+    families = ('all_tasks', 'single_task', 'max_affectations', 'balancing')
+    neighbourhood_size = 8
+
+    def __init__(self, scheduler: Scheduler, seed=0):
+        self.scheduler = scheduler
+        self.random = random.Random(seed)
+        tasks = sorted(scheduler.tasks, key=lambda x: (x.start_time, x.end_time, x.pk))
+        self.task_pks = [x.pk for x in tasks]
+        task_ids = {task_pk: task_id for (task_id, task_pk) in enumerate(self.task_pks)}
+        self.agent_pks = sorted(scheduler.agent_pks)
+        agent_ids = {agent_pk: agent_id for (agent_id, agent_pk) in enumerate(self.agent_pks)}
+        agent_count = len(self.agent_pks)
+
+        self.candidates = []
+        # self.candidates[task_id] = [agent_id_1, agent_id_2]
+        self.affinities = []
+        # self.affinities[task_id] = {agent_id: affinity}, without null values
+        for task in tasks:
+            agent_pks = scheduler.available_agents_by_tasks[task.pk]
+            if task.pk in scheduler.fixed_agent_by_task:
+                agent_pks = agent_pks & {scheduler.fixed_agent_by_task[task.pk]}
+            self.candidates.append(sorted(agent_ids[x] for x in agent_pks))
+            affinities = {}
+            for category_pk in scheduler.categories_by_task[task.pk]:
+                for agent_pk, (__, __, affinity) in scheduler.preferences_by_agent_by_category[category_pk].items():
+                    if affinity and agent_pk in agent_pks:
+                        affinities[agent_ids[agent_pk]] = affinities.get(agent_ids[agent_pk], 0.) + affinity
+            self.affinities.append(affinities)
+        self.candidate_sets = [set(x) for x in self.candidates]
+
+        self.conflicts = [set() for _ in tasks]
+        # self.conflicts[task_id] = {ids of the overlapping tasks of a same category}
+        self.tasks_by_category = []
+        # self.tasks_by_category[i] = [task_ids]
+        self.categories_of_task = [[] for _ in tasks]
+        # self.categories_of_task[task_id] = [indices in self.tasks_by_category]
+        self.rows = []
+        # self.rows[row_id] = (sense, limit, scale, agent_ids, loads), loads[agent_id] = current left-hand side
+        self.row_members = [[] for _ in tasks]
+        # self.row_members[task_id] = [(row_id, coefficient)]
+        self.balancings = []
+        # self.balancings[balancing_id] = (tolerance, unit, agent_ids, counts, values, sorted agent_ids)
+        self.balancing_members = [[] for _ in tasks]
+        # self.balancing_members[task_id] = [(balancing_id, weight)]
+        self.balancing_offsets = []
+        # self.balancing_offsets[balancing_id][agent_id] = initial balanced value
+        for category in sorted(scheduler.categories, key=lambda x: x.pk):
+            category_pk = category.pk
+            cat_task_ids = sorted(task_ids[x.pk] for x in scheduler.tasks_by_category[category_pk])
+            if not cat_task_ids:
+                continue
+            for task_id in cat_task_ids:
+                self.categories_of_task[task_id].append(len(self.tasks_by_category))
+            self.tasks_by_category.append(cat_task_ids)
+            self.add_conflicts(tasks, cat_task_ids)
+            cat_agent_ids = sorted(agent_ids[x] for x in scheduler.agent_pks -
+                                   scheduler.agent_exclusions_by_category[category_pk])
+            self.add_max_affectations(tasks, category_pk, cat_task_ids, set(cat_agent_ids), agent_count)
+            if category.balancing_mode is not None and category.balancing_tolerance is not None:
+                self.add_balancing(category, cat_task_ids, cat_agent_ids, agent_count)
+
+        self.balancing_violations = [self.balancing_violation(x) for x in self.balancings]
+        # self.balancing_violations[balancing_id] = current violation of the balancing constraint
+        self.penalty_weight = 1. + sum(max([abs(x) for x in affinities.values()] or [0.])
+                                       for affinities in self.affinities)
+        self.assignment = [-1] * len(tasks)
+        # self.assignment[task_id] = agent_id, -1 when unassigned
+        self.violation = float(len(tasks)) + sum(self.row_violation(row, agent_id) for row in self.rows
+                                                 for agent_id in row[3]) + \
+            sum(self.balancing_violations)
+        self.affinity = 0.
+        self.best_assignment = None
+        self.violations = {}
+        # self.violations[family] = amount of violation of the best assignment
+
+    def add_conflicts(self, tasks, cat_task_ids):
+        active = []
+        for task_id in cat_task_ids:  # sorted by start time
+            start_time = tasks[task_id].start_time
+            active = [x for x in active if tasks[x].end_time > start_time]
+            for other_task_id in active:
+                self.conflicts[task_id].add(other_task_id)
+                self.conflicts[other_task_id].add(task_id)
+            active.append(task_id)
+
+    def add_max_affectations(self, tasks, category_pk, cat_task_ids, cat_agent_ids, agent_count):
+        """Same rows as :meth:`autoplanner.schedule.Scheduler.apply_max_task_affectations`"""
+        start_times = [tasks[x].start_time for x in cat_task_ids]
+        durations = self.scheduler.task_durations
+        max_affectations_by_range = {}
+        for max_affectation in self.scheduler.max_task_affectations_by_category[category_pk]:
+            max_affectations_by_range.setdefault(max_affectation.range_time_slice, []).append(max_affectation)
+        for range_time_slice, max_affectations in max_affectations_by_range.items():
+            windows = sliding_windows(start_times, range_time_slice)
+            maximal_windows = [x for (i, x) in enumerate(windows) if i == 0 or windows[i - 1][1] != x[1]]
+            minimal_windows = [x for (i, x) in enumerate(windows) if i + 1 == len(windows) or windows[i + 1][1] != x[1]]
+            for max_affectation in max_affectations:
+                if max_affectation.mode == max_affectation.MAXIMUM:
+                    sense, selected_windows = -1, maximal_windows
+                else:
+                    sense, selected_windows = 1, minimal_windows
+                for begin, end in selected_windows:
+                    window_task_ids = cat_task_ids[begin:end]
+                    if max_affectation.task_maximum_time is not None:
+                        coefficients = [durations[self.task_pks[x]] for x in window_task_ids]
+                        limit = max_affectation.task_maximum_time.total_seconds()
+                        scale = max(coefficients)
+                    else:
+                        coefficients = [1.] * len(window_task_ids)
+                        limit = max_affectation.task_maximum_count
+                        scale = 1.
+                    row_id = len(self.rows)
+                    self.rows.append((sense, limit, scale, cat_agent_ids, [0.] * agent_count))
+                    for task_id, coefficient in zip(window_task_ids, coefficients):
+                        self.row_members[task_id].append((row_id, coefficient))
+
+    def add_balancing(self, category, cat_task_ids, cat_agent_ids, agent_count):
+        """Same constraints as :meth:`autoplanner.schedule.Scheduler.apply_balancing_constraints`"""
+        preferences = self.scheduler.preferences_by_agent_by_category[category.pk]
+        counts = [0.] * agent_count
+        values = [0.] * agent_count
+        for agent_id in cat_agent_ids:
+            offset, count, __ = preferences.get(self.agent_pks[agent_id], (0, 1., 0.))
+            counts[agent_id], values[agent_id] = count, offset * count
+        if category.balancing_mode == category.BALANCE_NUMBER:
+            weights = [1.] * len(cat_task_ids)
+        else:
+            weights = [self.scheduler.task_durations[self.task_pks[x]] for x in cat_task_ids]
+        unit = sum(weights) / len(weights)
+        balancing_id = len(self.balancings)
+        self.balancing_offsets.append(list(values))
+        self.balancings.append((category.balancing_tolerance, unit, cat_agent_ids, counts, values,
+                                sorted(cat_agent_ids, key=lambda x: values[x])))
+        for task_id, weight in zip(cat_task_ids, weights):
+            self.balancing_members[task_id].append((balancing_id, weight))
+
+    def row_violation(self, row, agent_id, load=None):
+        sense, limit, scale, __, loads = row
+        if load is None:
+            load = loads[agent_id]
+        return max(0., (load - limit) if sense < 0 else (limit - load)) / scale
+
+    @staticmethod
+    def balancing_violation(balancing, changes=()):
+        """Spread of the balanced values in excess of the tolerance, `changes` being new values `[(agent_id, value)]`
+        of some agents"""
+        tolerance, unit, __, __, values, sorted_agent_ids = balancing
+        changed_agent_ids = [x[0] for x in changes]
+        new_values = [x[1] for x in changes]
+        for agent_id in reversed(sorted_agent_ids):
+            if agent_id not in changed_agent_ids:
+                new_values.append(values[agent_id])
+                break
+        for agent_id in sorted_agent_ids:
+            if agent_id not in changed_agent_ids:
+                new_values.append(values[agent_id])
+                break
+        if not new_values:
+            return 0.
+        return max(0., max(new_values) - min(new_values) - tolerance) / unit
+
+    def move_delta(self, task_id, agent_id):
+        """Return the variations of the violation and of the affinity when the task is performed by this agent"""
+        old_agent_id = self.assignment[task_id]
+        if old_agent_id == agent_id:
+            return 0., 0.
+        violation = -1. if old_agent_id < 0 else 0.
+        assignment = self.assignment
+        for other_task_id in self.conflicts[task_id]:
+            other_agent_id = assignment[other_task_id]
+            if other_agent_id == old_agent_id >= 0:
+                violation -= 1.
+            elif other_agent_id == agent_id:
+                violation += 1.
+        for row_id, coefficient in self.row_members[task_id]:
+            row = self.rows[row_id]
+            loads = row[4]
+            violation += self.row_violation(row, agent_id, loads[agent_id] + coefficient) - \
+                self.row_violation(row, agent_id)
+            if old_agent_id >= 0:
+                violation += self.row_violation(row, old_agent_id, loads[old_agent_id] - coefficient) - \
+                    self.row_violation(row, old_agent_id)
+        for balancing_id, weight in self.balancing_members[task_id]:
+            balancing = self.balancings[balancing_id]
+            counts, values = balancing[3], balancing[4]
+            changes = [(agent_id, values[agent_id] + counts[agent_id] * weight)]
+            if old_agent_id >= 0:
+                changes.append((old_agent_id, values[old_agent_id] - counts[old_agent_id] * weight))
+            violation += self.balancing_violation(balancing, changes) - self.balancing_violations[balancing_id]
+        affinities = self.affinities[task_id]
+        affinity = affinities.get(agent_id, 0.) - affinities.get(old_agent_id, 0.)
+        return violation, affinity
+
+    def move(self, task_id, agent_id, delta):
+        old_agent_id = self.assignment[task_id]
+        self.assignment[task_id] = agent_id
+        for row_id, coefficient in self.row_members[task_id]:
+            loads = self.rows[row_id][4]
+            loads[agent_id] += coefficient
+            if old_agent_id >= 0:
+                loads[old_agent_id] -= coefficient
+        for balancing_id, weight in self.balancing_members[task_id]:
+            counts, values, sorted_agent_ids = self.balancings[balancing_id][3:]
+            values[agent_id] += counts[agent_id] * weight
+            if old_agent_id >= 0:
+                values[old_agent_id] -= counts[old_agent_id] * weight
+            sorted_agent_ids.sort(key=values.__getitem__)
+            self.balancing_violations[balancing_id] = self.balancing_violation(self.balancings[balancing_id])
+        self.violation += delta[0]
+        self.affinity += delta[1]
+
+    def cost(self, delta):
+        return self.penalty_weight * delta[0] - delta[1]
+
+    def best_move(self, task_id):
+        """Return the best agent for this task (or `None` if it is already the best one) and the delta"""
+        best_agent_id, best_delta, best_cost = None, None, -1e-9
+        for agent_id in self.neighbourhood(task_id):
+            if agent_id == self.assignment[task_id]:
+                continue
+            delta = self.move_delta(task_id, agent_id)
+            cost = self.cost(delta)
+            if cost < best_cost or (best_agent_id is None and self.assignment[task_id] < 0):
+                best_agent_id, best_delta, best_cost = agent_id, delta, cost
+        return best_agent_id, best_delta
+
+    def neighbourhood(self, task_id):
+        """Agents to try for a task: a random sample of its candidates and the agents with the lowest balanced
+        values in its categories"""
+        candidates = self.candidates[task_id]
+        if len(candidates) <= self.neighbourhood_size:
+            return candidates
+        result = set(self.random.sample(candidates, self.neighbourhood_size))
+        candidate_set = self.candidate_sets[task_id]
+        for balancing_id, __ in self.balancing_members[task_id]:
+            result.update(itertools.islice((x for x in self.balancings[balancing_id][5] if x in candidate_set), 2))
+        return result
+
+    def try_swap(self, task_id, other_task_id):
+        """Exchange the agents of both tasks if this decreases the cost"""
+        agent_id, other_agent_id = self.assignment[task_id], self.assignment[other_task_id]
+        if agent_id == other_agent_id or agent_id < 0 or other_agent_id < 0:
+            return False
+        elif other_agent_id not in self.candidate_sets[task_id] or agent_id not in self.candidate_sets[other_task_id]:
+            return False
+        delta_1 = self.move_delta(task_id, other_agent_id)
+        self.move(task_id, other_agent_id, delta_1)
+        delta_2 = self.move_delta(other_task_id, agent_id)
+        if self.cost(delta_1) + self.cost(delta_2) < -1e-9:
+            self.move(other_task_id, agent_id, delta_2)
+            return True
+        self.move(task_id, agent_id, self.move_delta(task_id, agent_id))
+        return False
+
+    def solve(self, max_compute_time=1.):
+        """Return the best schedule found in the given time (in seconds), as a list of `(agent_pk, task_pk)`"""
+        end = time.time() + max_compute_time
+        task_count = len(self.task_pks)
+        order = sorted(range(task_count), key=lambda x: len(self.candidates[x]))
+        for task_id in order:  # greedy construction, the most constrained tasks first
+            agent_id, delta = self.best_move(task_id)
+            if agent_id is not None:
+                self.move(task_id, agent_id, delta)
+        best_cost = self.penalty_weight * self.violation - self.affinity
+        self.best_assignment = list(self.assignment)
+        order = list(range(task_count))
+        while order and time.time() < end:
+            self.random.shuffle(order)
+            improved = False
+            for task_id in order:
+                if time.time() >= end:
+                    break
+                agent_id, delta = self.best_move(task_id)
+                if agent_id is not None:
+                    self.move(task_id, agent_id, delta)
+                    improved = True
+                    continue
+                for __ in range(3 if self.categories_of_task[task_id] else 0):
+                    cat_task_ids = self.tasks_by_category[self.random.choice(self.categories_of_task[task_id])]
+                    if self.try_swap(task_id, self.random.choice(cat_task_ids)):
+                        improved = True
+                        break
+            cost = self.penalty_weight * self.violation - self.affinity
+            if cost < best_cost - 1e-9:
+                best_cost = cost
+                self.best_assignment = list(self.assignment)
+            if not improved:
+                if self.violation < 1e-9:
+                    break
+                self.perturb()
+        self.violations = self.evaluate(self.best_assignment)
+        return [(self.agent_pks[agent_id], self.task_pks[task_id])
+                for (task_id, agent_id) in enumerate(self.best_assignment) if agent_id >= 0]
+
+    def perturb(self):
+        """Move a few random tasks to a random agent"""
+        task_ids = [x for x in range(len(self.task_pks)) if len(self.candidates[x]) > 1]
+        for task_id in self.random.sample(task_ids, min(len(task_ids), max(1, len(task_ids) // 50))):
+            agent_id = self.random.choice(self.candidates[task_id])
+            self.move(task_id, agent_id, self.move_delta(task_id, agent_id))
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.violations
+
+    def evaluate(self, assignment) -> dict:
+        """Return the violated constraint families of an assignment, as `{family: amount of violation}`"""
+        result = dict.fromkeys(self.families, 0.)
+        result['all_tasks'] = float(assignment.count(-1))
+        for task_id, other_task_ids in enumerate(self.conflicts):
+            agent_id = assignment[task_id]
+            result['single_task'] += sum(1. for x in other_task_ids if x > task_id and assignment[x] == agent_id >= 0)
+        loads_by_row = [[0.] * len(self.agent_pks) for _ in self.rows]
+        values_by_balancing = [[0.] * len(self.agent_pks) for _ in self.balancings]
+        for task_id, agent_id in enumerate(assignment):
+            if agent_id < 0:
+                continue
+            for row_id, coefficient in self.row_members[task_id]:
+                loads_by_row[row_id][agent_id] += coefficient
+            for balancing_id, weight in self.balancing_members[task_id]:
+                values_by_balancing[balancing_id][agent_id] += self.balancings[balancing_id][3][agent_id] * weight
+        for row, loads in zip(self.rows, loads_by_row):
+            result['max_affectations'] += sum(self.row_violation(row, x, loads[x]) for x in row[3])
+        for balancing, offsets, values in zip(self.balancings, self.balancing_offsets, values_by_balancing):
+            tolerance, unit, cat_agent_ids = balancing[:3]
+            totals = [values[x] + offsets[x] for x in cat_agent_ids]
+            if totals:
+                result['balancing'] += max(0., max(totals) - min(totals) - tolerance) / unit
+        return {family: value for (family, value) in result.items() if value > 1e-6}
@@ -1,8 +1,16 @@
-from djangofloor.iniconf import INI_MAPPING as DEFAULTS, OptionParser
+from djangofloor.iniconf import INI_MAPPING as DEFAULTS, OptionParser, bool_setting, strip_split
 
 __author__ = 'Matthieu Gallet'
 
 INI_MAPPING = DEFAULTS + [OptionParser('REDIS_HOST', 'celery.redis_host'),
                           OptionParser('REDIS_PORT', 'celery.redis_port'),
                           OptionParser('BROKER_DB', 'celery.redis_db', int),
-                          OptionParser('REFRESH_DURATION', 'global.refresh_duration')]
\ No newline at end of file
+                          OptionParser('REFRESH_DURATION', 'global.refresh_duration'),
+                          OptionParser('DIAGNOSIS_COMPUTE_TIME', 'global.diagnosis_compute_time', float),
+                          OptionParser('LAZY_CONSTRAINTS', 'global.lazy_constraints', bool_setting),
+                          OptionParser('PREVIEW_COMPUTE_TIME', 'global.preview_compute_time', float),
+                          OptionParser('SOLVER_BACKEND', 'global.solver_backend'),
+                          OptionParser('SOLVER_PORTFOLIO', 'global.solver_portfolio', strip_split),
+                          OptionParser('SOLVER_WORKERS', 'global.solver_workers', int),
+                          OptionParser('REUSE_IDENTICAL_SCHEDULES', 'global.reuse_identical_schedules',
+                                       bool_setting)]
\ No newline at end of file
@@ -0,0 +1,269 @@
+import copy
+import hashlib
+import math
+from array import array
+
+__author__ = 'Matthieu Gallet'
+
+
+class LinearModel(object):
+    """Mixed integer linear program, stored as compact numeric arrays.
+
+    Variables are identified by dense integer indices. Their keys are tuples whose first item is the kind of
+    variable (`('v', agent_pk, task_pk)`) and are only formatted as names (`v_a1_e2`) by the LP serializer.
+    Constraint rows are stored in the CSR format: the columns and coefficients of the i-th row are
+    `columns[row_starts[i]:row_starts[i + 1]]` and `coefficients[row_starts[i]:row_starts[i + 1]]`.
+    """
+    LE = -1
+    EQ = 0
+    GE = 1
+    operators = {LE: '<=', EQ: '=', GE: '>='}
+
+    def __init__(self, variable_formats: dict=None):
+        self.variable_formats = variable_formats or {}
+        # self.variable_formats['v'] = 'v_a%s_e%s'
+        self.keys = []
+        self.indices = {}
+        self.lower_bounds = array('d')
+        self.upper_bounds = array('d')
+        self.integers = array('b')
+        self.objective = {}
+        # self.objective[variable_index] = coefficient (the objective is always minimized)
+        self.row_starts = array('l', [0])
+        self.columns = array('l')
+        self.coefficients = array('d')
+        self.senses = array('b')
+        self.rhs = array('d')
+        self.families = []
+        self.family_indices = {}
+        self.row_families = array('H')
+
+    @property
+    def variable_count(self):
+        return len(self.keys)
+
+    @property
+    def row_count(self):
+        return len(self.rhs)
+
+    @property
+    def nonzero_count(self):
+        return len(self.columns)
+
+    def variable(self, key: tuple, lower=0., upper=math.inf, integer=False) -> int:
+        """Return the index of the variable identified by `key`, creating it if required"""
+        index = self.indices.get(key)
+        if index is None:
+            index = len(self.keys)
+            self.indices[key] = index
+            self.keys.append(key)
+            self.lower_bounds.append(lower)
+            self.upper_bounds.append(upper)
+            self.integers.append(1 if integer else 0)
+        return index
+
+    def set_bounds(self, index: int, lower=0., upper=math.inf, integer=False):
+        self.lower_bounds[index] = lower
+        self.upper_bounds[index] = upper
+        self.integers[index] = 1 if integer else 0
+
+    def add_row(self, columns, coefficients, sense: int, rhs: float, family: str=''):
+        """Add the constraint `sum(coefficients[i] * columns[i]) <sense> rhs`
+        :param columns: list of variable indices
+        :param coefficients: list of coefficients (same length as `columns`), or `None` when all are 1
+        :param sense: one of `LinearModel.LE`, `LinearModel.EQ`, `LinearModel.GE`
+        :param rhs: constant right-hand side
+        :param family: name of the kind of constraint (only used for statistics)
+        """
+        self.columns.extend(columns)
+        if coefficients is None:
+            self.coefficients.extend([1.] * (len(self.columns) - len(self.coefficients)))
+        else:
+            self.coefficients.extend(coefficients)
+        self.row_starts.append(len(self.columns))
+        self.senses.append(sense)
+        self.rhs.append(rhs)
+        family_index = self.family_indices.get(family)
+        if family_index is None:
+            family_index = len(self.families)
+            self.family_indices[family] = family_index
+            self.families.append(family)
+        self.row_families.append(family_index)
+
+    def row(self, row_index: int):
+        """Return `(columns, coefficients, sense, rhs)` for the given row"""
+        start, end = self.row_starts[row_index], self.row_starts[row_index + 1]
+        return self.columns[start:end], self.coefficients[start:end], self.senses[row_index], self.rhs[row_index]
+
+    def family_counts(self) -> dict:
+        """Return the number of rows of each family"""
+        counts = {family: 0 for family in self.families}
+        for family_index in self.row_families:
+            counts[self.families[family_index]] += 1
+        return counts
+
+    def relaxed(self):
+        """Return a copy of this model without any integrality constraint"""
+        result = copy.deepcopy(self)
+        result.integers = array('b', bytes(len(self.integers)))
+        return result
+
+    def subset(self, row_indices):
+        """Return a copy of this model (same variables) with only some of its rows
+        :param row_indices: sorted indices of the kept rows
+        """
+        result = LinearModel(self.variable_formats)
+        result.keys = list(self.keys)
+        result.indices = dict(self.indices)
+        result.lower_bounds = array('d', self.lower_bounds)
+        result.upper_bounds = array('d', self.upper_bounds)
+        result.integers = array('b', self.integers)
+        result.objective = dict(self.objective)
+        for row_index in row_indices:
+            columns, coefficients, sense, rhs = self.row(row_index)
+            result.add_row(columns, coefficients, sense, rhs, self.families[self.row_families[row_index]])
+        return result
+
+    def violated_rows(self, row_indices, values: dict, tolerance=1e-6) -> list:
+        """Return the rows (among `row_indices`) that are not satisfied by the given non-zero values of variables"""
+        result = []
+        for row_index in row_indices:
+            columns, coefficients, sense, rhs = self.row(row_index)
+            activity = sum(coefficient * values.get(index, 0.) for (index, coefficient) in zip(columns, coefficients))
+            if (sense != self.GE and activity > rhs + tolerance) or (sense != self.LE and activity < rhs - tolerance):
+                result.append(row_index)
+        return result
+
+    def objective_value(self, values: dict) -> float:
+        """Return the value of the objective for the given non-zero values of variables"""
+        return sum(coefficient * values.get(index, 0.) for (index, coefficient) in self.objective.items())
+
+    def objective_is_integral(self) -> bool:
+        """Return `True` if the objective can only take integer values (integer coefficients of integer variables)"""
+        return all(not coefficient or (self.integers[index] and coefficient == int(coefficient))
+                   for (index, coefficient) in self.objective.items())
+
+    def fingerprint(self, *extra) -> str:
+        """Return a SHA-256 digest of the model, that does not depend on the order of its variables or rows.
+        :param extra: additional values to add to the digest (like solving options)
+        """
+        digest = hashlib.sha256()
+        keys = self.keys
+        for value in extra:
+            digest.update(repr(value).encode())
+        digest.update(b'\nvariables\n')
+        for index in sorted(range(len(keys)), key=keys.__getitem__):
+            digest.update(repr((keys[index], self.lower_bounds[index], self.upper_bounds[index],
+                                self.integers[index], self.objective.get(index, 0.))).encode())
+        digest.update(b'\nrows\n')
+        rows = []
+        for row_index in range(self.row_count):
+            columns, coefficients, sense, rhs = self.row(row_index)
+            rows.append(repr((sense, rhs, sorted(zip([keys[x] for x in columns], coefficients)))))
+        rows.sort()
+        for row in rows:
+            digest.update(row.encode())
+        return digest.hexdigest()
+
+    def split(self) -> list:
+        """Split the model into independent models: two variables are in the same model when they are connected by
+        a chain of rows. Return a list of `(model, variable_indices)`, where `variable_indices[i]` is the index in
+        this model of the i-th variable of the sub-model.
+        """
+        parents = list(range(self.variable_count))
+
+        def find(index_):
+            while parents[index_] != index_:
+                parents[index_] = parents[parents[index_]]
+                index_ = parents[index_]
+            return index_
+
+        row_starts, columns = self.row_starts, self.columns
+        for row_index in range(self.row_count):
+            start, end = row_starts[row_index], row_starts[row_index + 1]
+            if start == end:
+                continue
+            root = find(columns[start])
+            for i in range(start + 1, end):
+                other = find(columns[i])
+                if other != root:
+                    parents[other] = root
+        component_indices = {}
+        # component_indices[root variable index] = index of the sub-model
+        result = []
+        new_indices = array('l', [0]) * self.variable_count
+        for index in range(self.variable_count):
+            root = find(index)
+            if root not in component_indices:
+                component_indices[root] = len(result)
+                result.append((LinearModel(self.variable_formats), []))
+            model, indices = result[component_indices[root]]
+            new_indices[index] = model.variable(self.keys[index], self.lower_bounds[index], self.upper_bounds[index],
+                                                integer=bool(self.integers[index]))
+            indices.append(index)
+            if self.objective.get(index):
+                model.objective[new_indices[index]] = self.objective[index]
+        for row_index in range(self.row_count):
+            row_columns, coefficients, sense, rhs = self.row(row_index)
+            if not result:  # rows without any variable
+                result.append((LinearModel(self.variable_formats), []))
+            model = result[component_indices[find(row_columns[0])] if row_columns else 0][0]
+            model.add_row([new_indices[x] for x in row_columns], coefficients, sense, rhs,
+                          self.families[self.row_families[row_index]])
+        return result
+
+    def name(self, index: int) -> str:
+        key = self.keys[index]
+        return self.variable_formats[key[0]] % key[1:]
+
+    def lp_statements(self):
+        """Serialize the model in the LP format of lp_solve, one statement (without its trailing ";") at a time.
+
+        Rows on a single variable are labelled, otherwise lp_solve would read them as bounds.
+        """
+        names = [self.name(index) for index in range(len(self.keys))]
+        objective = [(coefficient, names[index]) for (index, coefficient) in sorted(self.objective.items())
+                     if coefficient]
+        yield ('min: %s' % lp_sum(objective)).strip()
+        row_starts, columns, coefficients = self.row_starts, self.columns, self.coefficients
+        for row_index in range(len(self.rhs)):
+            start, end = row_starts[row_index], row_starts[row_index + 1]
+            terms = [(coefficients[i], names[columns[i]]) for i in range(start, end)]
+            if not terms and names:
+                terms = [(0., names[0])]
+            elif not terms:
+                continue
+            label = 'R%d: ' % (row_index + 1) if len(terms) == 1 else ''
+            yield '%s%s %s %.12g' % (label, lp_sum(terms), self.operators[self.senses[row_index]],
+                                     self.rhs[row_index])
+        for index, name in enumerate(names):
+            lower, upper = self.lower_bounds[index], self.upper_bounds[index]
+            if lower == upper:
+                yield '%s = %.12g' % (name, lower)
+                continue
+            if lower != 0.:
+                yield '%s >= %s' % (name, '-1e30' if lower == -math.inf else '%.12g' % lower)
+            if upper != math.inf:
+                yield '%s <= %.12g' % (name, upper)
+        for index, name in enumerate(names):
+            if self.integers[index]:
+                yield 'int %s' % name
+
+
+def lp_sum(terms) -> str:
+    """Format a list of `(coefficient, variable_name)` as a sum in the LP format"""
+    result = []
+    for coefficient, name in terms:
+        sign = '-' if coefficient < 0 else '+'
+        coefficient = abs(coefficient)
+        if coefficient == 1.:
+            value = name
+        else:
+            value = '%.12g %s' % (coefficient, name)
+        if result:
+            result.append(' %s %s' % (sign, value))
+        elif sign == '-':
+            result.append('-%s' % value)
+        else:
+            result.append(value)
+    return ''.join(result)
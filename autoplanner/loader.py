@@ -0,0 +1,136 @@
+import collections
+import collections.abc
+import datetime
+from array import array
+
+from autoplanner.models import Organization, Agent, Category, Task, AgentCategoryPreferences, AgentTaskExclusion, \
+    MaxAffectation, MaxTaskAffectation, MaxTimeTaskAffectation
+
+__author__ = 'Matthieu Gallet'
+
+
+class AgentData(collections.namedtuple('AgentData', ['pk', 'name', 'start_time', 'end_time'])):
+    """Columns of :class:`autoplanner.models.Agent` used by the scheduler"""
+    __slots__ = ()
+
+    def __str__(self):
+        return self.name
+
+
+class CategoryData(collections.namedtuple('CategoryData', ['pk', 'name', 'balancing_mode', 'balancing_tolerance'])):
+    """Columns of :class:`autoplanner.models.Category` used by the scheduler"""
+    __slots__ = ()
+    BALANCE_TIME = Category.BALANCE_TIME
+    BALANCE_NUMBER = Category.BALANCE_NUMBER
+
+    def __str__(self):
+        return self.name
+
+
+class TaskData(collections.namedtuple('TaskData', ['pk', 'name', 'start_time', 'end_time', 'agent_id', 'fixed'])):
+    """Columns of :class:`autoplanner.models.Task` used by the scheduler"""
+    __slots__ = ()
+
+    @property
+    def duration(self) -> datetime.timedelta:
+        return self.end_time - self.start_time
+
+    def __str__(self):
+        return self.name
+
+
+PreferenceData = collections.namedtuple('PreferenceData', ['agent_id', 'category_id', 'affinity', 'balancing_offset',
+                                                           'balancing_count'])
+
+
+class MaxAffectationData(collections.namedtuple('MaxAffectationData', ['category_id', 'mode', 'range_time_slice',
+                                                                       'task_maximum_count', 'task_maximum_time'])):
+    """Rule of :class:`autoplanner.models.MaxTaskAffectation` (`task_maximum_time` is `None`) or of
+    :class:`autoplanner.models.MaxTimeTaskAffectation` (`task_maximum_count` is `None`)"""
+    __slots__ = ()
+    MINIMUM = MaxAffectation.MINIMUM
+    MAXIMUM = MaxAffectation.MAXIMUM
+
+
+class TaskArray(collections.abc.Mapping):
+    """Read-only mapping `{task.pk: value}` over an array indexed by the dense ids of the tasks"""
+    __slots__ = ('task_ids', 'array')
+
+    def __init__(self, task_ids: dict, values: array):
+        self.task_ids = task_ids
+        self.array = values
+
+    def __getitem__(self, task_pk):
+        return self.array[self.task_ids[task_pk]]
+
+    def __iter__(self):
+        return iter(self.task_ids)
+
+    def __len__(self):
+        return len(self.task_ids)
+
+
+def timedelta(days, hours, seconds):
+    return datetime.timedelta(days=days, hours=hours, seconds=seconds)
+
+
+class OrganizationData(object):
+    """All the data of an organization required to build its schedule.
+
+    Only the required columns are fetched, with one `values_list` query per table (tasks and their categories are
+    fetched together). Agents, categories and tasks are numbered by dense ids: `task_pks[i]` is the primary key of the
+    i-th task, `task_ids[task.pk] = i`, and the per-task arrays (`task_start_times`, `task_durations`, …) are indexed by
+    these ids. Tasks are sorted by start time, so dense ids also follow the start times. Times are POSIX timestamps and
+    durations are in seconds. Tasks whose end is not after their start are ignored.
+    """
+
+    def __init__(self, organization: Organization):
+        organization_id = organization.pk
+        self.agents = [AgentData(*row) for row in Agent.objects.filter(organization_id=organization_id)
+                       .order_by('pk').values_list('pk', 'name', 'start_time', 'end_time')]
+        self.agent_pks = array('q', [x.pk for x in self.agents])
+        self.agent_ids = {agent_pk: agent_id for (agent_id, agent_pk) in enumerate(self.agent_pks)}
+
+        self.categories = [CategoryData(*row) for row in Category.objects.filter(organization_id=organization_id)
+                           .order_by('pk').values_list('pk', 'name', 'balancing_mode', 'balancing_tolerance')]
+        self.category_pks = array('q', [x.pk for x in self.categories])
+        self.category_ids = {category_pk: category_id for (category_id, category_pk) in enumerate(self.category_pks)}
+
+        self.tasks = []
+        self.categories_by_task = []
+        # self.categories_by_task[task_id] = [category1.pk, category2.pk]
+        self.task_ids = {}
+        for row in Task.objects.filter(organization_id=organization_id).order_by('start_time', 'end_time', 'pk') \
+                .values_list('pk', 'name', 'start_time', 'end_time', 'agent_id', 'fixed', 'categories'):
+            task_id = self.task_ids.get(row[0])
+            if task_id is None:
+                if not row[2] < row[3]:
+                    continue
+                task_id = self.task_ids[row[0]] = len(self.tasks)
+                self.tasks.append(TaskData(*row[:6]))
+                self.categories_by_task.append([])
+            if row[6] in self.category_ids:
+                self.categories_by_task[task_id].append(row[6])
+        self.task_pks = array('q', [x.pk for x in self.tasks])
+        self.task_start_times = array('d', [x.start_time.timestamp() for x in self.tasks])
+        self.task_end_times = array('d', [x.end_time.timestamp() for x in self.tasks])
+        self.task_durations = array('d', [x.duration.total_seconds() for x in self.tasks])
+
+        self.preferences = [PreferenceData(*row) for row in AgentCategoryPreferences.objects
+                            .filter(organization_id=organization_id)
+                            .values_list('agent_id', 'category_id', 'affinity', 'balancing_offset', 'balancing_count')]
+        self.agent_task_exclusions = [row for row in AgentTaskExclusion.objects.filter(organization_id=organization_id)
+                                      .values_list('agent_id', 'task_id') if row[1] in self.task_ids]
+        # self.agent_task_exclusions = [(agent.pk, task.pk), …]
+
+        self.max_affectations = []
+        for row in MaxTaskAffectation.objects.filter(organization_id=organization_id) \
+                .values_list('category_id', 'mode', 'range_time_slice_days', 'range_time_slice_hours',
+                             'range_time_slice_seconds', 'task_maximum_count'):
+            self.max_affectations.append(MaxAffectationData(row[0], row[1], timedelta(*row[2:5]), row[5], None))
+        for row in MaxTimeTaskAffectation.objects.filter(organization_id=organization_id) \
+                .values_list('category_id', 'mode', 'range_time_slice_days', 'range_time_slice_hours',
+                             'range_time_slice_seconds', 'task_maximum_time_days', 'task_maximum_time_hours',
+                             'task_maximum_time_seconds'):
+            self.max_affectations.append(MaxAffectationData(row[0], row[1], timedelta(*row[2:5]), None,
+                                                            timedelta(*row[5:8])))
@@ -0,0 +1 @@
+__author__ = 'Matthieu Gallet'
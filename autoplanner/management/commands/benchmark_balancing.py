@@ -0,0 +1,91 @@
+import datetime
+import random
+import time
+
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.utils.timezone import utc
+
+from autoplanner.models import Organization, Agent, Category, Task
+from autoplanner.presolve import presolve
+from autoplanner.schedule import Scheduler
+
+__author__ = 'Matthieu Gallet'
+
+
+class Rollback(Exception):
+    pass
+
+
+def create_random_organization(agents=50, tasks=500, categories=2, seed=0):
+    """Create an organization with random tasks spread over one task per agent and per day,
+    and categories balanced by number of tasks"""
+    rnd = random.Random(seed)
+    organization = Organization(name='Benchmark')
+    organization.save()
+    agent_objs = Agent.objects.bulk_create([Agent(organization=organization, name='A%d' % i)
+                                            for i in range(agents)])
+    category_objs = Category.objects.bulk_create(
+        [Category(organization=organization, name='C%d' % i, balancing_mode=Category.BALANCE_NUMBER,
+                  balancing_tolerance=2) for i in range(categories)])
+    if not category_objs[0].pk:  # the primary keys are not set by bulk_create on some databases
+        category_objs = list(Category.objects.filter(organization=organization))
+    start = datetime.datetime(2016, 1, 1, 8, 0, 0, tzinfo=utc)
+    days = max(1, (tasks * 2) // max(1, len(agent_objs)))
+    task_objs = []
+    for i in range(tasks):
+        task_start = start + datetime.timedelta(days=rnd.randrange(days), hours=rnd.randrange(12))
+        task_end = task_start + datetime.timedelta(hours=rnd.randint(1, 4))
+        task_objs.append(Task(organization=organization, name='E%d' % i, start_time=task_start, end_time=task_end))
+    Task.objects.bulk_create(task_objs)
+    through = Task.categories.through
+    through.objects.bulk_create([through(task_id=task.pk, category_id=rnd.choice(category_objs).pk)
+                                 for task in Task.objects.filter(organization=organization)])
+    return organization
+
+
+class Command(BaseCommand):
+    help = 'Compare the model size and the solve time of the balancing formulations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', type=int, default=None,
+                            help='Use this existing organization instead of random data.')
+        parser.add_argument('--agents', type=int, default=50, help='Number of random agents.')
+        parser.add_argument('--tasks', type=int, default=500, help='Number of random tasks.')
+        parser.add_argument('--categories', type=int, default=2, help='Number of random categories.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator.')
+        parser.add_argument('--solve', action='store_true', default=False, help='Also solve each model.')
+        parser.add_argument('--backend', default=None, help='Solver backend (default to settings.SOLVER_BACKEND).')
+        parser.add_argument('--max-compute-time', type=int, default=None, help='Max time for each solve.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['organization']:
+                    organization = Organization.objects.get(pk=options['organization'])
+                else:
+                    organization = create_random_organization(agents=options['agents'], tasks=options['tasks'],
+                                                              categories=options['categories'],
+                                                              seed=options['seed'])
+                # noinspection PyProtectedMember
+                for formulation, label in Organization._meta.get_field('balancing_formulation').choices:
+                    organization.balancing_formulation = formulation
+                    self.benchmark(organization, options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def benchmark(self, organization, options):
+        scheduler = Scheduler(organization)
+        start = time.time()
+        model = scheduler.build_model()
+        build_time = time.time() - start
+        self.stdout.write('%s: %d variables, %d rows (%d balancing rows), %d non-zeros, built in %.2fs' %
+                          (organization.balancing_formulation, model.variable_count, model.row_count,
+                           model.family_counts().get('balancing', 0), model.nonzero_count, build_time))
+        self.stdout.write('%s: %s' % (organization.balancing_formulation, presolve(model).report()))
+        if options['solve']:
+            start = time.time()
+            result_list = scheduler.solve(max_compute_time=options['max_compute_time'], backend=options['backend'])
+            self.stdout.write('%s: %s in %.2fs' % (organization.balancing_formulation,
+                                                   'solved' if result_list else 'no solution', time.time() - start))
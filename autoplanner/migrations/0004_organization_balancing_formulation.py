@@ -0,0 +1,18 @@
+# Generated by Django 2.2.17 on 2026-10-18 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autoplanner', '0003_auto_20170903_2337'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='balancing_formulation',
+            field=models.CharField(choices=[('pairwise', 'Compare all pairs of agents'), ('range', 'Bound agents between a minimum and a maximum')], default='pairwise', help_text='Both formulations accept the same schedules, but the second one is much smaller for large categories.', max_length=10, verbose_name='Formulation of the balancing constraints'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.17 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autoplanner', '0004_organization_balancing_formulation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='horizon_length',
+            field=models.PositiveIntegerField(blank=True, default=None, help_text='Solve successive periods of this length instead of the whole schedule at once. Leave it blank to solve the whole schedule at once.', null=True, verbose_name='Length of the rolling horizon, in days'),
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='horizon_overlap',
+            field=models.PositiveIntegerField(default=1, help_text='Tasks in the overlap are solved again with the next period.', verbose_name='Overlap of consecutive rolling horizon periods, in days'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.17 on 2026-10-18 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autoplanner', '0005_organization_rolling_horizon'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedulerun',
+            name='hint_accepted',
+            field=models.NullBooleanField(default=None, help_text='Empty when there was no previous schedule.', verbose_name='Started from the previous schedule?'),
+        ),
+    ]
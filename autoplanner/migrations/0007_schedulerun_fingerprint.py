@@ -0,0 +1,18 @@
+# Generated by Django 2.2.17 on 2026-10-18 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autoplanner', '0006_schedulerun_hint_accepted'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedulerun',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, default=None, max_length=64, null=True, verbose_name='Fingerprint of the model'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.17 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autoplanner', '0007_schedulerun_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedulerun',
+            name='solver_configuration',
+            field=models.CharField(blank=True, default=None, help_text='Solver configurations that found the schedule, with the number of solved parts when there are several ones.', max_length=500, null=True, verbose_name='Solver configuration'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.17 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autoplanner', '0008_schedulerun_solver_configuration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedulerun',
+            name='family_counts',
+            field=models.TextField(blank=True, default=None, help_text='Number of constraints of each family.', null=True, verbose_name='JSON-serialized constraint counts'),
+        ),
+        migrations.AddField(
+            model_name='schedulerun',
+            name='timings',
+            field=models.TextField(blank=True, default=None, help_text='Duration (in seconds) of each phase of the computation.', null=True, verbose_name='JSON-serialized timings'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.17 on 2026-10-18 13:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autoplanner', '0009_schedulerun_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='elastic_constraints',
+            field=models.BooleanField(default=False, help_text='Balancing tolerances and max affectations can be exceeded (as little as possible): a schedule is always found, with the list of exceeded limits.', verbose_name='Allow exceeding the limits'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.17 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autoplanner', '0010_organization_elastic_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedulerun',
+            name='cancelled',
+            field=models.BooleanField(default=False, help_text='The computation stops as soon as possible and its best schedule is kept, but not applied.', verbose_name='Stopped by the user?'),
+        ),
+    ]
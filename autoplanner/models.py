@@ -1,4 +1,5 @@
 import datetime
+import json
 import random
 
 from django.conf import settings
@@ -33,6 +34,8 @@ def default_token(length=64, allowed_chars='abcdefghijklmnopqrstuvwxyz'
 
 
 class Organization(models.Model):
+    BALANCING_PAIRWISE = 'pairwise'
+    BALANCING_RANGE = 'range'
     name = models.CharField(_('Name'), db_index=True, max_length=500)
     message = models.CharField(_('Message'), blank=True, max_length=500, default='')
     description = models.TextField(_('Description'), default='', blank=True)
@@ -45,6 +48,26 @@ class Organization(models.Model):
     max_compute_time = models.PositiveIntegerField(_('Maximum time, in seconds, for finding a solution'),
                                                    default=None, blank=True, null=True,
                                                    help_text=_('Leave it blank if you do not want to set a limit'))
+    balancing_formulation = models.CharField(_('Formulation of the balancing constraints'), max_length=10,
+                                             choices=((BALANCING_PAIRWISE, _('Compare all pairs of agents')),
+                                                      (BALANCING_RANGE, _('Bound agents between a minimum '
+                                                                          'and a maximum'))),
+                                             default=BALANCING_PAIRWISE,
+                                             help_text=_('Both formulations accept the same schedules, but the '
+                                                         'second one is much smaller for large categories.'))
+    elastic_constraints = models.BooleanField(_('Allow exceeding the limits'), default=False,
+                                              help_text=_('Balancing tolerances and max affectations can be exceeded '
+                                                          '(as little as possible): a schedule is always found, '
+                                                          'with the list of exceeded limits.'))
+    horizon_length = models.PositiveIntegerField(_('Length of the rolling horizon, in days'),
+                                                 default=None, blank=True, null=True,
+                                                 help_text=_('Solve successive periods of this length instead of the '
+                                                             'whole schedule at once. Leave it blank to solve the '
+                                                             'whole schedule at once.'))
+    horizon_overlap = models.PositiveIntegerField(_('Overlap of consecutive rolling horizon periods, in days'),
+                                                  default=1,
+                                                  help_text=_('Tasks in the overlap are solved again with the '
+                                                              'next period.'))
     admins = models.ManyToManyField(settings.AUTH_USER_MODEL, db_index=True, verbose_name=_('Administrators'))
     current_schedule = models.ForeignKey('ScheduleRun', default=None, blank=True, null=True, db_index=True,
                                          related_name='current_organizations', on_delete=models.SET_NULL)
@@ -86,6 +109,40 @@ class ScheduleRun(models.Model):
     celery_end = models.DateTimeField(_('Computation end'), null=True, blank=True, default=None)
     process_id = models.IntegerField(_('Process ID'), db_index=True, blank=True, null=True, default=None)
     result_dict = models.TextField(_('JSON-serialized result'), blank=True, default=None, null=True)
+    fingerprint = models.CharField(_('Fingerprint of the model'), max_length=64, db_index=True, blank=True,
+                                   null=True, default=None)
+    hint_accepted = models.NullBooleanField(_('Started from the previous schedule?'), default=None,
+                                            help_text=_('Empty when there was no previous schedule.'))
+    solver_configuration = models.CharField(_('Solver configuration'), max_length=500, blank=True, null=True,
+                                            default=None,
+                                            help_text=_('Solver configurations that found the schedule, with the '
+                                                        'number of solved parts when there are several ones.'))
+    timings = models.TextField(_('JSON-serialized timings'), blank=True, default=None, null=True,
+                               help_text=_('Duration (in seconds) of each phase of the computation.'))
+    family_counts = models.TextField(_('JSON-serialized constraint counts'), blank=True, default=None, null=True,
+                                     help_text=_('Number of constraints of each family.'))
+    cancelled = models.BooleanField(_('Stopped by the user?'), default=False,
+                                    help_text=_('The computation stops as soon as possible and its best schedule is '
+                                                'kept, but not applied.'))
+    phases = [('load', _('loading')), ('heuristic', _('heuristic')), ('constraints', _('constraints')),
+              ('presolve', _('presolve')), ('hint', _('previous schedule')), ('write', _('LP writing')),
+              ('solve', _('solver')), ('parse', _('output parsing')), ('postsolve', _('postsolve')),
+              ('diagnosis', _('diagnosis')), ('apply', _('application'))]
+    # phases of the computation, in chronological order ("write" and "parse" are included in "solve")
+
+    def get_timings(self):
+        """Return the durations of the phases of the computation as a list of (label, duration in seconds)"""
+        timings = json.loads(self.timings or '{}')
+        return [(label, timings[phase]) for (phase, label) in self.phases if phase in timings]
+
+    def get_family_counts(self):
+        """Return the number of constraints of each family as a sorted list of (family, count)"""
+        return sorted(json.loads(self.family_counts or '{}').items())
+
+    @property
+    def can_be_applied(self):
+        """`True` when this computation gave a schedule, even if it has been stopped before its end"""
+        return bool(self.result_dict) and self.result_dict != '{}'
 
     def __str__(self):
         end = self.celery_end
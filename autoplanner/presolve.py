@@ -0,0 +1,165 @@
+import math
+
+from autoplanner.linear_model import LinearModel
+
+__author__ = 'Matthieu Gallet'
+
+
+class PresolvedModel(object):
+    """Result of :func:`presolve`: a smaller model, equivalent to the original one.
+
+    `model` only contains the variables that are not fixed by the presolve. Their keys are the same as in the
+    original model, so `original_indices[i]` is the index in the original model of the i-th variable of `model`.
+    `fixed_values[original_index]` is the value of the removed variables.
+    """
+
+    def __init__(self, original: LinearModel):
+        self.original = original
+        self.model = LinearModel(original.variable_formats)
+        self.original_indices = []
+        self.fixed_values = {}
+        self.infeasible = False
+        self.removed_rows = {}
+        # self.removed_rows[reason] = number of removed rows
+
+    def postsolve(self, values: dict) -> dict:
+        """Convert the non-zero values `{index: value}` of the presolved model into the non-zero values of the
+        original model (including the fixed variables)"""
+        result = {index: value for (index, value) in self.fixed_values.items() if value}
+        for index, value in values.items():
+            result[self.original_indices[index]] = value
+        return result
+
+    def report(self) -> str:
+        original, model = self.original, self.model
+        if self.infeasible:
+            return 'presolve: the model is infeasible'
+        removed = ', '.join('%d %s' % (count, reason) for (reason, count) in sorted(self.removed_rows.items()))
+        return 'presolve: %d → %d variables, %d → %d rows, %d → %d non-zeros (removed rows: %s)' % \
+               (original.variable_count, model.variable_count, original.row_count, model.row_count,
+                original.nonzero_count, model.nonzero_count, removed or 'none')
+
+
+def presolve(original: LinearModel, tolerance=1e-9) -> PresolvedModel:
+    """Reduce a model before solving it:
+
+      * rows on a single variable are converted into bounds,
+      * fixed variables (equal bounds) are substituted into the rows,
+      * rows that force all their variables to one of their bounds fix them (e.g. "the sum of the agents of a fixed
+        task is 1" when the fixed agent is already set to 1),
+      * empty, redundant and duplicate rows are removed.
+
+    The result is an equivalent model, whose solution is converted back by :meth:`PresolvedModel.postsolve`.
+    """
+    result = PresolvedModel(original)
+    lower = list(original.lower_bounds)
+    upper = list(original.upper_bounds)
+    integers = original.integers
+    row_count = original.row_count
+    rows = []
+    # rows[row_index] = {variable_index: coefficient}, None when removed
+    rows_by_variable = [[] for _ in range(original.variable_count)]
+    rhs = list(original.rhs)
+    senses = original.senses
+    for row_index in range(row_count):
+        columns, coefficients, sense, value = original.row(row_index)
+        row = {}
+        for index, coefficient in zip(columns, coefficients):
+            row[index] = row.get(index, 0.) + coefficient
+        row = {index: coefficient for (index, coefficient) in row.items() if coefficient}
+        rows.append(row)
+        for index in row:
+            rows_by_variable[index].append(row_index)
+
+    def remove_row(row_index_, reason):
+        rows[row_index_] = None
+        result.removed_rows[reason] = result.removed_rows.get(reason, 0) + 1
+
+    def set_bounds(index, new_lower, new_upper):
+        """Tighten the bounds of a variable, return `False` if they are inconsistent"""
+        if integers[index]:
+            new_lower, new_upper = math.ceil(new_lower - tolerance), math.floor(new_upper + tolerance)
+        if new_lower > lower[index] + tolerance:
+            lower[index] = new_lower
+            pending.update(rows_by_variable[index])
+        if new_upper < upper[index] - tolerance:
+            upper[index] = new_upper
+            pending.update(rows_by_variable[index])
+        return lower[index] <= upper[index] + tolerance
+
+    pending = set(range(row_count))
+    while pending and not result.infeasible:
+        row_index = pending.pop()
+        row = rows[row_index]
+        if row is None:
+            continue
+        for index in [x for x in row if upper[x] - lower[x] <= tolerance]:  # substitute the fixed variables
+            rhs[row_index] -= row.pop(index) * lower[index]
+        sense, value = senses[row_index], rhs[row_index]
+        min_activity = sum(c * (lower[x] if c > 0 else upper[x]) for (x, c) in row.items())
+        max_activity = sum(c * (upper[x] if c > 0 else lower[x]) for (x, c) in row.items())
+        if (sense != LinearModel.GE and min_activity > value + tolerance) or \
+                (sense != LinearModel.LE and max_activity < value - tolerance):
+            result.infeasible = True
+        elif not row:
+            remove_row(row_index, 'empty')
+        elif len(row) == 1:
+            index, coefficient = list(row.items())[0]
+            bound = value / coefficient
+            new_lower, new_upper = lower[index], upper[index]
+            if sense == LinearModel.EQ:
+                new_lower, new_upper = bound, bound
+            elif (sense == LinearModel.LE) == (coefficient > 0):
+                new_upper = min(new_upper, bound)
+            else:
+                new_lower = max(new_lower, bound)
+            result.infeasible = not set_bounds(index, new_lower, new_upper)
+            remove_row(row_index, 'singleton')
+        elif (sense != LinearModel.GE and abs(min_activity - value) <= tolerance) or \
+                (sense != LinearModel.LE and abs(max_activity - value) <= tolerance):
+            to_min = sense != LinearModel.GE and abs(min_activity - value) <= tolerance
+            for index, coefficient in row.items():
+                bound = lower[index] if (coefficient > 0) == to_min else upper[index]
+                set_bounds(index, bound, bound)
+            remove_row(row_index, 'forcing')
+        elif (sense == LinearModel.LE and max_activity <= value + tolerance) or \
+                (sense == LinearModel.GE and min_activity >= value - tolerance):
+            remove_row(row_index, 'redundant')
+    if result.infeasible:
+        return result
+
+    model = result.model
+    new_indices = {}
+    for index, key in enumerate(original.keys):
+        if upper[index] - lower[index] <= tolerance:
+            result.fixed_values[index] = lower[index]
+            continue
+        new_indices[index] = model.variable(key, lower[index], upper[index], integer=bool(integers[index]))
+        result.original_indices.append(index)
+        if original.objective.get(index):
+            model.objective[new_indices[index]] = original.objective[index]
+
+    kept_rows = {}
+    # kept_rows[(sense, ((index, coefficient), ...))] = row index in the presolved model
+    for row_index, row in enumerate(rows):
+        if row is None:
+            continue
+        terms = tuple(sorted((new_indices[x], c) for (x, c) in row.items() if x in new_indices))
+        rhs[row_index] -= sum(c * result.fixed_values[x] for (x, c) in row.items() if x not in new_indices)
+        sense, value = senses[row_index], rhs[row_index]
+        duplicate_key = (sense, terms)
+        previous_index = kept_rows.get(duplicate_key)
+        if previous_index is not None:
+            previous_value = model.rhs[previous_index]
+            if sense == LinearModel.LE:
+                model.rhs[previous_index] = min(previous_value, value)
+            elif sense == LinearModel.GE:
+                model.rhs[previous_index] = max(previous_value, value)
+            elif abs(previous_value - value) > tolerance:
+                result.infeasible = True
+            result.removed_rows['duplicate'] = result.removed_rows.get('duplicate', 0) + 1
+            continue
+        kept_rows[duplicate_key] = model.row_count
+        model.add_row([x[0] for x in terms], [x[1] for x in terms], sense, value,
+                      original.families[original.row_families[row_index]])
+    return result
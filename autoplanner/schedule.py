@@ -1,65 +1,149 @@
-import re
+import copy
+import datetime
+import itertools
+import json
+import math
 import subprocess
-import tempfile
+import threading
+import time
 
-import itertools
 from django.conf import settings
 
-from autoplanner.models import Organization, MaxTimeTaskAffectation, Task, ScheduleRun
+from autoplanner.availability import AvailabilityIndex
+from autoplanner.linear_model import LinearModel
+from autoplanner.loader import OrganizationData, CategoryData, TaskArray
+from autoplanner.models import Organization, ScheduleRun
+from autoplanner.presolve import presolve
+from autoplanner.solvers import get_backend, solve_all
 
 __author__ = 'Matthieu Gallet'
 
 
-class Constraint(object):
-    def __init__(self, value: str, name: str=''):
-        self.value = value
-        self.name = name
-
-    def __str__(self):
-        return self.value
+def get_remaining_time(deadline):
+    """Return the time (in seconds) left before `deadline` (a value of `time.perf_counter()`), or `None` when there
+    is no deadline
+    :raise subprocess.TimeoutExpired: when the deadline is reached
+    """
+    if deadline is None:
+        return None
+    remaining_time = deadline - time.perf_counter()
+    if remaining_time <= 0:
+        raise subprocess.TimeoutExpired('schedule', 0)
+    return remaining_time
 
 
 class Scheduler(object):
+    variable_formats = {'v': 'v_a%s_e%s', 'c': 'c_c%s_a%s', 'cmin': 'c_c%s_min', 'cmax': 'c_c%s_max',
+                        'sb': 's_c%s', 'sm': 's_c%s_r%s'}
+    # names of the variables in the LP format:
+    #   ('v', agent_pk, task_pk): 1 if the task is performed by the agent
+    #   ('c', category_pk, agent_pk): balanced value of the agent in the category
+    #   ('cmin', category_pk), ('cmax', category_pk): bounds of the balanced values in the category
+    #   ('sb', category_pk): excess over the balancing tolerance of the category (elastic mode only)
+    #   ('sm', category_pk, rule index): excess over a max affectation rule of the category (elastic mode only)
+    slack_groups = {'sb': 'balancing', 'sm': 'max_affectation'}
+    # slack_groups[type of slack variable] = group of limits (see `relax`)
+    lazy_families = {'balancing', 'max_affectations'}
+    # families whose inequality rows are only added to the solved model when they are violated (see `solve_lazy`)
+
     def __init__(self, organization: Organization):
+        start = time.perf_counter()
+        self.timings = {}
+        # self.timings[phase] = cumulated duration (in seconds) of this phase
+        self.family_counts = {}
+        # self.family_counts[constraint family] = number of constraints of the complete model
         self.organization = organization
-        self.agents = {x for x in organization.agent_set.all()}
-        self.categories = {x for x in organization.category_set.all()}
-        self.categories_by_pk = {x.pk: x for x in self.categories}
-        self.tasks = {x for x in organization.task_set.all() if (x.start_time < x.end_time)}
-        self.agent_category_preferences = {x for x in organization.agentcategorypreferences_set.all()}
-
-        self.task_durations = {task.pk: (task.end_time - task.start_time).total_seconds()
-                               for task in self.tasks}
-        self.agent_pks = {x.pk for x in self.agents}
+        data = OrganizationData(organization)
+        self.agents = set(data.agents)
+        self.categories = set(data.categories)
+        self.categories_by_pk = {x.pk: x for x in data.categories}
+        self.tasks = set(data.tasks)
+        self.agent_category_preferences = data.preferences
+        self.agent_task_exclusions = data.agent_task_exclusions
+        # self.agent_task_exclusions = [(agent.pk, task.pk), …]
+
+        self.task_ids = data.task_ids
+        # self.task_ids[task.pk] = dense id of the task, index of the following arrays (ids follow the start times)
+        self.task_pks = data.task_pks
+        self.task_start_times = data.task_start_times
+        self.task_end_times = data.task_end_times
+        # POSIX timestamps of the bounds of the tasks
+        self.task_durations = TaskArray(data.task_ids, data.task_durations)
+        # self.task_durations[task.pk] = duration of the task in seconds
+        self.time_unit = self.get_time_unit()
+        # durations are expressed in this number of seconds in the linear model
+        self.agent_pks = {x.pk for x in data.agents}
         # self.agent_pks = {agent1.pk, agent2.pk, agent3.pk}
-        self.categories_by_task = self.get_categories_by_task()
+        self.availability_index = AvailabilityIndex((x.pk, x.start_time, x.end_time) for x in data.agents)
+        self.categories_by_task = {task.pk: set(category_pks)
+                                   for (task, category_pks) in zip(data.tasks, data.categories_by_task)}
         # self.categories_by_task[task.pk] = {category1.pk, category2.pk, category3.pk}
-        self.tasks_by_category = self.get_tasks_by_category()
+        self.tasks_by_category = self.get_tasks_by_category(data)
         # self.tasks_by_categories[category.pk] = {task1, task2, task3}
         self.agent_exclusions_by_category = self.get_agent_exclusions_by_category()
         # self.agent_exclusions_by_category[category.pk] = {agent1.pk, agent2.pk, agent3.pk}
-        self.agent_exclusions_by_task = self.get_agent_exclusions_by_task()
+        self.agent_exclusions_by_task = self.get_agent_exclusions_by_task(data)
         # self.agent_exclusions_by_task[task.pk] = {agent1.pk, agent2.pk, agent3.pk}
         self.preferences_by_agent_by_category = self.get_preferences_by_agent_by_category()
         # self.preferences_by_agent_by_category[category.pk][agent.pk] = (balancing_offset, balancing_count, affinity)
-        self.max_task_affectations_by_category = self.get_max_task_affectations_by_category()
+        self.max_task_affectations_by_category = self.get_max_task_affectations_by_category(data)
         # self.max_task_affectations_by_category[category.pk] = [max_task_affectation_1, max_task_affectation_2]
         self.available_agents_by_tasks = {task.pk: (self.agent_pks - self.agent_exclusions_by_task[task.pk])
                                           for task in self.tasks}
+        self.fixed_agent_by_task = {task.pk: task.agent_id for task in self.tasks if task.fixed and task.agent_id}
+        # self.fixed_agent_by_task[task.pk] = agent.pk
+        self.agent_capacities = {}
+        # self.agent_capacities[agent.pk] = number of simultaneous tasks of the same category (1 if not set), see
+        # `aggregate_agents`
+        self.task_classes = {}
+        # self.task_classes[task1.pk] = [task1.pk, task2.pk, task3.pk]: identical tasks represented by the first one,
+        # see `aggregate_tasks`
+        self.model = None
+        # complete model, see `get_model`
+        self.presolved_model = None
+        # reduced model of the last call to `solve`
+        self.hint_accepted = None
+        # `True` if the hint given to the last call to `solve` has been used as a starting point
+        self.solver_configurations = {}
+        # self.solver_configurations[configuration] = number of models solved by this solver configuration
+        self.exceeded_limits = {}
+        # self.exceeded_limits[group] = excess of the last schedule over this limit, in elastic mode (see `relax`)
+        self.stop_event = threading.Event()
+        # set by `stop`, shared by the copies of this scheduler (see `restrict`)
+        self.solvers = set()
+        # solvers used by this scheduler and its copies, stopped by `stop`
+        self.add_timing('load', start)
 
-    def get_categories_by_task(self):
-        result = {x.pk: set() for x in self.tasks}
-        for related in Task.categories.through.objects.filter(category__id__in=self.categories_by_pk,
-                                                              task__id__in=result):
-            result[related.task_id].add(related.category_id)
-        return result
+    def stop(self):
+        """Stop the computation as soon as possible (called from another thread when the user cancels it): the
+        running solves return their best solution and the next ones are refused. The computation then returns the best
+        schedule found so far, or raises `subprocess.TimeoutExpired`."""
+        self.stop_event.set()
+        for solver in list(self.solvers):
+            solver.stop()
+
+    def add_timing(self, phase: str, start: float):
+        """Add the time elapsed since `start` (given by `time.perf_counter()`) to the duration of a phase"""
+        self.timings[phase] = self.timings.get(phase, 0.) + time.perf_counter() - start
 
-    def get_tasks_by_category(self):
+    def get_time_unit(self) -> float:
+        """Return the unit of the durations in the linear model, in seconds: the greatest common divisor of the task
+        durations (in whole seconds), or one minute if it is shorter. Time-based coefficients then stay close to the
+        count-based ones, and are integers in most organizations."""
+        unit = 0
+        for duration in self.task_durations.values():
+            unit = math.gcd(unit, int(round(duration)))
+        return float(max(unit, 60))
+
+    def balancing_unit(self, category) -> float:
+        """Return the unit of the balanced values of a category in the linear model (in seconds for durations)"""
+        return self.time_unit if category.balancing_mode == category.BALANCE_TIME else 1.
+
+    def get_tasks_by_category(self, data: OrganizationData):
         result = {x.pk: set() for x in self.categories}
-        tasks_by_pk = {x.pk: x for x in self.tasks}
-        for task_pk, category_pks in self.categories_by_task.items():
+        for task, category_pks in zip(data.tasks, data.categories_by_task):
             for category_pk in category_pks:
-                result[category_pk].add(tasks_by_pk[task_pk])
+                result[category_pk].add(task)
         return result
 
     def get_agent_exclusions_by_category(self):
@@ -69,21 +153,16 @@ class Scheduler(object):
                 agent_exclusions_by_category[a.category_id].add(a.agent_id)
         return agent_exclusions_by_category
 
-    def get_agent_exclusions_by_task(self):
+    def get_agent_exclusions_by_task(self, data: OrganizationData):
         agent_task_exclusions = {task.pk: set() for task in self.tasks}
         for task in self.tasks:
             task_pk = task.pk
             for category_pk in self.categories_by_task[task_pk]:
-                for agent_pk in self.agent_exclusions_by_category[category_pk]:
-                    agent_task_exclusions[task_pk].add(agent_pk)
-            for agent in self.agents:
-                # TODO optimize
-                if agent.start_time is not None and agent.start_time > task.start_time:
-                    agent_task_exclusions[task_pk].add(agent.pk)
-                elif agent.end_time is not None and agent.end_time < task.end_time:
-                    agent_task_exclusions[task_pk].add(agent.pk)
-        for agent_task_exclusion in self.organization.agenttaskexclusion_set.all():
-            agent_task_exclusions[agent_task_exclusion.task_pk].add(agent_task_exclusion.agent_id)
+                agent_task_exclusions[task_pk].update(self.agent_exclusions_by_category[category_pk])
+            agent_task_exclusions[task_pk].update(self.availability_index.unavailable_agents(task.start_time,
+                                                                                             task.end_time))
+        for agent_pk, task_pk in data.agent_task_exclusions:
+            agent_task_exclusions[task_pk].add(agent_pk)
         return agent_task_exclusions
 
     def get_preferences_by_agent_by_category(self):
@@ -92,123 +171,211 @@ class Scheduler(object):
             preferences[a.category_id][a.agent_id] = (a.balancing_offset, a.balancing_count, a.affinity)
         return preferences
 
-    def get_max_task_affectations_by_category(self):
+    def get_max_task_affectations_by_category(self, data: OrganizationData):
         max_task_affectations_by_category = {x.pk: [] for x in self.categories}
-        for max_affectation in self.organization.maxtaskaffectation_set.all():
-            max_task_affectations_by_category[max_affectation.category_id].append(max_affectation)
-        for max_affectation in self.organization.maxtimetaskaffectation_set.all():
+        for max_affectation in data.max_affectations:
             max_task_affectations_by_category[max_affectation.category_id].append(max_affectation)
         return max_task_affectations_by_category
 
-    def apply_max_task_affectations(self, category_pk: int):
+    def apply_max_task_affectations(self, model: LinearModel, category_pk: int):
         """ "Agent A cannot execute more than X tasks of category C in less than T time slices"
+
+        Windows of tasks are computed once for all rules sharing the same period length. Windows whose constraint is
+        implied by another window (a subset of the previous one for "at most" rules, a superset of the next one
+        for "at least" rules) are skipped.
+        :param model:
         :param category_pk:
         """
-        task_data = [(task.pk, task.start_time, task.end_time) for task in self.tasks_by_category[category_pk]]
-        task_data.sort(key=lambda x: (x[1], x[2]))
+        task_ids = sorted(self.task_ids[task.pk] for task in self.tasks_by_category[category_pk])
+        start_times = [self.task_start_times[x] for x in task_ids]
         agent_pks = self.agent_pks - self.agent_exclusions_by_category[category_pk]
-        previous_start_time = None
-        for index, data in enumerate(task_data):
-            task_pk, start_time, __ = data
-            if start_time == previous_start_time:
-                continue
-            current_tasks = {task_pk}
-            for max_affectation in self.max_task_affectations_by_category[category_pk]:
-                end_block_time_slice = start_time + max_affectation.range_time_slice
-                for data_2 in task_data[index + 1:]:
-                    task_pk_2, start_time_2, __ = data_2
-                    if start_time_2 >= end_block_time_slice:
-                        break
-                    current_tasks.add(task_pk_2)
-                direction = '<=' if max_affectation.mode == max_affectation.MAXIMUM else '>='
-                if isinstance(max_affectation, MaxTimeTaskAffectation):
-                    for agent_pk in agent_pks:
-                        variables = ['%d * %s' % (self.task_durations[task_pk], self.variable(agent_pk, task_pk))
-                                     for task_pk in current_tasks]
-                        yield Constraint('%s %s %d' % (' + '.join(variables), direction,
-                                                       max_affectation.task_maximum_time))
+        max_affectations_by_range = {}
+        for index, max_affectation in enumerate(self.max_task_affectations_by_category[category_pk]):
+            max_affectations_by_range.setdefault(max_affectation.range_time_slice, []).append((index, max_affectation))
+        for range_time_slice, max_affectations in max_affectations_by_range.items():
+            windows = sliding_windows(start_times, range_time_slice.total_seconds())
+            maximal_windows = [x for (i, x) in enumerate(windows) if i == 0 or windows[i - 1][1] != x[1]]
+            minimal_windows = [x for (i, x) in enumerate(windows) if i + 1 == len(windows) or windows[i + 1][1] != x[1]]
+            for index, max_affectation in max_affectations:
+                if max_affectation.mode == max_affectation.MAXIMUM:
+                    sense, selected_windows = model.LE, maximal_windows
                 else:
+                    sense, selected_windows = model.GE, minimal_windows
+                slack_index = self.slack_variable(model, ('sm', category_pk, index))
+                for begin, end in selected_windows:
+                    window_task_pks = [self.task_pks[x] for x in task_ids[begin:end]]
+                    if max_affectation.task_maximum_time is not None:
+                        coefficients = [self.task_durations[task_pk] / self.time_unit for task_pk in window_task_pks]
+                        limit = max_affectation.task_maximum_time.total_seconds() / self.time_unit
+                    else:
+                        coefficients = None
+                        limit = max_affectation.task_maximum_count
+                    if slack_index is not None:
+                        coefficients = (coefficients or [1.] * len(window_task_pks)) + \
+                            [-1. if sense == model.LE else 1.]
                     for agent_pk in agent_pks:
-                        variables = [self.variable(agent_pk, task_pk) for task_pk in current_tasks]
-                        yield Constraint('%s %s %d' % (' + '.join(variables), direction,
-                                                       max_affectation.task_maximum_count))
-            previous_start_time = start_time
+                        columns = [self.task_variable(model, agent_pk, task_pk) for task_pk in window_task_pks]
+                        if slack_index is not None:
+                            columns.append(slack_index)
+                        model.add_row(columns, coefficients, sense, limit, 'max_affectations')
 
-    def apply_all_tasks_must_be_done(self):
+    def apply_all_tasks_must_be_done(self, model: LinearModel):
         """ "Exactly one agent must perform each task"
         """
         for task_pk, task_agent_pks in self.available_agents_by_tasks.items():
-            yield Constraint('%s = 1' % ' + '.join([self.variable(agent_pk, task_pk) for agent_pk in task_agent_pks]))
-            if len(task_agent_pks) == len(self.agent_pks):
-                continue
-            yield Constraint('%s = 1' % ' + '.join([self.variable(agent_pk, task_pk) for agent_pk in self.agent_pks]))
+            columns = [self.task_variable(model, agent_pk, task_pk) for agent_pk in task_agent_pks]
+            model.add_row(columns, None, model.EQ, len(self.task_classes.get(task_pk, (task_pk, ))), 'all_tasks')
 
-    def apply_fixed_tasks(self):
+    def apply_fixed_tasks(self, model: LinearModel):
         """ "Task E must be performed by agent A" """
-        for task in self.tasks:
-            if task.fixed and task.agent_id:
-                yield Constraint('%s = 1' % self.variable(task.agent_id, task.pk))
+        for task_pk, agent_pk in self.fixed_agent_by_task.items():
+            model.add_row([self.task_variable(model, agent_pk, task_pk)], None, model.EQ, 1, 'fixed_tasks')
+
+    def apply_single_task_per_agent(self, model: LinearModel):
+        """ "Agent X can perform at most one task (of the same category) at a time"
 
-    def apply_single_task_per_agent(self):
-        """ "Agent X can perform at most one task (of the same category) at a time" """
-        current_tasks = set()
-        resumed_tasks = {}
+        For each category, a sweep-line over the task bounds gives the maximal sets of overlapping tasks (at most one
+        per task). A row is added only for the agents that are available for at least two tasks of such a set.
+        """
+        events_by_category = {}
+        # events_by_category[category.pk][time] = ([ending task.pk], [starting task.pk])
         for task in self.tasks:
-            resumed_tasks.setdefault(task.start_time, []).append((task.pk, current_tasks.add))
-            resumed_tasks.setdefault(task.end_time, []).append((task.pk, current_tasks.remove))
-        time_slices = [x for x in resumed_tasks]
-        time_slices.sort()
-        for time_slice in time_slices:
-            for (task_pk, action) in resumed_tasks[time_slice]:
-                action(task_pk)
-            if not current_tasks:
-                continue
-            current_tasks_by_category = {}
-            for task_pk in current_tasks:
-                for category_pk in self.categories_by_task[task_pk]:
-                    current_tasks_by_category.setdefault(category_pk, set()).add(task_pk)
-            for agent_pk in self.agent_pks:
-                for current_task_subset in current_tasks_by_category.values():
-                    variables = [self.variable(agent_pk, task_pk) for task_pk in current_task_subset]
-                    yield Constraint('%s <= 1' % ' + '.join(variables))
+            task_id = self.task_ids[task.pk]
+            start_time, end_time = self.task_start_times[task_id], self.task_end_times[task_id]
+            for category_pk in self.categories_by_task[task.pk]:
+                events = events_by_category.setdefault(category_pk, {})
+                events.setdefault(start_time, ([], []))[1].append(task.pk)
+                events.setdefault(end_time, ([], []))[0].append(task.pk)
+        for events in events_by_category.values():
+            previous_task_pks_by_agent = {}
+            for overlapping_task_pks in maximal_overlapping_sets(events):
+                task_pks_by_agent = {}
+                for task_pk in overlapping_task_pks:
+                    for agent_pk in self.available_agents_by_tasks[task_pk]:
+                        task_pks_by_agent.setdefault(agent_pk, []).append(task_pk)
+                for agent_pk, task_pks in task_pks_by_agent.items():
+                    capacity = self.agent_capacities.get(agent_pk, 1)
+                    if sum(self.task_upper_bound(agent_pk, x) for x in task_pks) <= capacity or \
+                            previous_task_pks_by_agent.get(agent_pk) == task_pks:
+                        continue
+                    previous_task_pks_by_agent[agent_pk] = task_pks
+                    columns = [self.task_variable(model, agent_pk, task_pk) for task_pk in task_pks]
+                    model.add_row(columns, None, model.LE, capacity, 'single_task')
 
-    def apply_balancing_constraints(self):
+    def apply_balancing_constraints(self, model: LinearModel):
         for category in self.categories:
             if category.balancing_mode is None or category.balancing_tolerance is None:
                 continue
             category_pk = category.pk
             cat_task_pks = [task.pk for task in self.tasks_by_category[category_pk]]
             cat_agent_pks = self.agent_pks - self.agent_exclusions_by_category[category_pk]
+            unit = self.balancing_unit(category)
             for agent_pk in cat_agent_pks:
                 agent_preferences = self.preferences_by_agent_by_category[category_pk].get(agent_pk, (0, 1., 0.))
+                # offset + sum(count * task) = category variable
+                columns = [self.task_variable(model, agent_pk, task_pk) for task_pk in cat_task_pks]
                 if category.balancing_mode == category.BALANCE_NUMBER:
-                    ag_sum = ['%g * %s' % (agent_preferences[1], self.variable(agent_pk, task_pk))
-                              for task_pk in cat_task_pks]
+                    coefficients = [agent_preferences[1]] * len(cat_task_pks)
                 else:
-                    ag_sum = ['%g * %d * %s' % (agent_preferences[1], self.task_durations[task_pk],
-                                                self.variable(agent_pk, task_pk)) for task_pk in cat_task_pks]
-                yield Constraint('%g + %s = %s' % (agent_preferences[0] * agent_preferences[1], ' + '.join(ag_sum),
-                                                   self.category_variable(category_pk, agent_pk)))
-            # ag_sum = [self.category_variable(category_pk, agent_pk) for agent_pk in cat_agent_pks]
-            # yield Constraint('%s = %s' % (' + '.join(ag_sum), self.category_variable(category_pk)))
-            for agent_pk_1, agent_pk_2 in itertools.product(cat_agent_pks, cat_agent_pks):
-                if agent_pk_1 >= agent_pk_2:
-                    continue
-                yield Constraint(
-                    '%s <= %s + %g' % (self.category_variable(category_pk, agent_pk_1),
-                                       self.category_variable(category_pk, agent_pk_2), category.balancing_tolerance))
-                yield Constraint(
-                    '%s <= %s + %g' % (self.category_variable(category_pk, agent_pk_2),
-                                       self.category_variable(category_pk, agent_pk_1), category.balancing_tolerance))
-            # for agent_pk in cat_agent_pks:
-            #     count = len(cat_agent_pks)
-            #     yield Constraint(
-            #         '%d * %s <= %s + %g' % (count, self.category_variable(category_pk, agent_pk),
-            #                               self.category_variable(category_pk), category.balancing_tolerance * count))
-            #     yield Constraint(
-            #         '%d * %s >= %s - %g' % (count, self.category_variable(category_pk, agent_pk),
-            #                                 self.category_variable(category_pk), category.balancing_tolerance * count)
-            #     )
+                    coefficients = [agent_preferences[1] * self.task_durations[task_pk] / unit
+                                    for task_pk in cat_task_pks]
+                columns.append(self.category_variable(model, category_pk, agent_pk))
+                coefficients.append(-1.)
+                model.add_row(columns, coefficients, model.EQ, -agent_preferences[0] * agent_preferences[1] / unit,
+                              'balancing')
+            if self.organization.balancing_formulation == Organization.BALANCING_RANGE:
+                self.apply_balancing_range(model, category, cat_agent_pks)
+            else:
+                self.apply_balancing_pairwise(model, category, cat_agent_pks)
+
+    def apply_balancing_pairwise(self, model: LinearModel, category, cat_agent_pks):
+        """ "The balanced values of two agents differ by at most the tolerance": O(agents²) rows"""
+        category_pk = category.pk
+        tolerance = category.balancing_tolerance / self.balancing_unit(category)
+        slack_index = self.slack_variable(model, ('sb', category_pk))
+        for agent_pk_1, agent_pk_2 in itertools.product(cat_agent_pks, cat_agent_pks):
+            if agent_pk_1 >= agent_pk_2:
+                continue
+            columns = [self.category_variable(model, category_pk, agent_pk_1),
+                       self.category_variable(model, category_pk, agent_pk_2)]
+            if slack_index is None:
+                model.add_row(columns, [1., -1.], model.LE, tolerance, 'balancing')
+                model.add_row(columns, [-1., 1.], model.LE, tolerance, 'balancing')
+            else:
+                columns.append(slack_index)
+                model.add_row(columns, [1., -1., -1.], model.LE, tolerance, 'balancing')
+                model.add_row(columns, [-1., 1., -1.], model.LE, tolerance, 'balancing')
+
+    def apply_balancing_range(self, model: LinearModel, category, cat_agent_pks):
+        """ "All balanced values are between a min and a max that differ by at most the tolerance": O(agents) rows.
+        Both formulations accept exactly the same schedules."""
+        category_pk = category.pk
+        min_index = model.variable(('cmin', category_pk))
+        max_index = model.variable(('cmax', category_pk))
+        for agent_pk in cat_agent_pks:
+            index = self.category_variable(model, category_pk, agent_pk)
+            model.add_row([index, max_index], [1., -1.], model.LE, 0, 'balancing')
+            model.add_row([index, min_index], [1., -1.], model.GE, 0, 'balancing')
+        tolerance = category.balancing_tolerance / self.balancing_unit(category)
+        slack_index = self.slack_variable(model, ('sb', category_pk))
+        if slack_index is None:
+            model.add_row([max_index, min_index], [1., -1.], model.LE, tolerance, 'balancing')
+        else:
+            model.add_row([max_index, min_index, slack_index], [1., -1., -1.], model.LE, tolerance, 'balancing')
+
+    def slack_variable(self, model: LinearModel, key: tuple):
+        """Return the index of the variable measuring the excess over a group of limits in elastic mode (see
+        :meth:`apply_slack_penalties`), or `None` when the limits cannot be exceeded"""
+        if not self.organization.elastic_constraints:
+            return None
+        return model.variable(key)
+
+    def limit_is_duration(self, group: tuple) -> bool:
+        """Return `True` if the excess over a group of limits (`('balancing', category.pk)` or
+        `('max_affectation', category.pk, rule index)`) is a duration, in seconds"""
+        if group[0] == 'balancing':
+            return self.categories_by_pk[group[1]].balancing_mode == CategoryData.BALANCE_TIME
+        return self.max_task_affectations_by_category[group[1]][group[2]].task_maximum_time is not None
+
+    def apply_slack_penalties(self, model: LinearModel):
+        """Exceed the limits as little as possible: each excess of one task (or of one time unit) costs more than the
+        total affinity of the agents. Smaller excesses are removed by :meth:`solve_elastic`."""
+        penalty = 1. + sum(abs(x) for x in model.objective.values())
+        for index, key in enumerate(model.keys):
+            if key[0] in self.slack_groups:
+                model.objective[index] = penalty
+
+    def get_exceeded_limits(self, model: LinearModel, values: dict) -> dict:
+        """Return the balancing tolerances and the max affectations exceeded by the non-zero values of the variables
+        of a model built in elastic mode, as
+        `{('balancing', category.pk): excess, ('max_affectation', category.pk, rule index): excess}` (durations are
+        given in seconds)"""
+        exceeded_limits = {}
+        balanced_values = {}
+        # balanced_values[category.pk] = [balanced value of each agent]
+        for index, key in enumerate(model.keys):
+            if key[0] == 'c':
+                balanced_values.setdefault(key[1], []).append(values.get(index, 0.))
+        for category_pk, category_values in balanced_values.items():
+            category = self.categories_by_pk[category_pk]
+            excess = (max(category_values) - min(category_values)) * self.balancing_unit(category) - \
+                category.balancing_tolerance
+            if excess > 1e-6:
+                exceeded_limits[('balancing', category_pk)] = excess
+        for row_index in range(model.row_count):
+            columns, coefficients, sense, rhs = model.row(row_index)
+            key = model.keys[columns[-1]]
+            if key[0] != 'sm':
+                continue
+            activity = sum(coefficient * values.get(index, 0.) for (index, coefficient)
+                           in zip(columns[:-1], coefficients[:-1]))
+            excess = activity - rhs if sense == model.LE else rhs - activity
+            group = ('max_affectation', ) + key[1:]
+            if self.limit_is_duration(group):
+                excess *= self.time_unit
+            if excess > 1e-6 and excess > exceeded_limits.get(group, 0.):
+                exceeded_limits[group] = excess
+        return exceeded_limits
 
     def compute_balancing(self, result_list):
         """Return a dict
@@ -247,97 +414,702 @@ class Scheduler(object):
                 balances[category_pk] = (category.name, category.balancing_mode, cat_max - cat_min)
         return balances
 
-    def apply_affinity_constraints(self):
-        variables = []
+    def apply_affinity_constraints(self, model: LinearModel):
+        """Maximize the total affinity of agents for their tasks"""
         for category in self.categories:
             category_pk = category.pk
-            cat_task_pks = [(task.pk, task.start_time, task.end_time) for task in self.tasks_by_category[category_pk]]
-            # if category.auto_affinity:
-            # cat_task_pks.sort(key=lambda x: x[1])
+            cat_task_pks = [task.pk for task in self.tasks_by_category[category_pk]]
             for agent_pk in self.agent_pks - self.agent_exclusions_by_category[category_pk]:
                 agent_preferences = self.preferences_by_agent_by_category[category_pk].get(agent_pk, (0, 1., 0.))
-                variables += ['%g * %s' % (agent_preferences[2], self.variable(agent_pk, x[0]))
-                              for x in cat_task_pks if agent_preferences[2]]
-        if variables:
-            yield Constraint('min: -%s' % self.affinity_variable())
-            yield Constraint('%s = %s' % (' + '.join(variables), self.affinity_variable()))
-        else:
-            yield Constraint('min:')
+                if not agent_preferences[2]:
+                    continue
+                for task_pk in cat_task_pks:
+                    index = self.task_variable(model, agent_pk, task_pk)
+                    model.objective[index] = model.objective.get(index, 0.) - agent_preferences[2]
 
-    def constraints(self):
-        yield from self.apply_affinity_constraints()
+    def build_model(self) -> LinearModel:
+        """Return the complete linear model, as numeric arrays"""
+        model = LinearModel(self.variable_formats)
+        self.apply_affinity_constraints(model)
         # all tasks must be done
-        yield from self.apply_all_tasks_must_be_done()
+        self.apply_all_tasks_must_be_done(model)
         # task with a fixed agent
-        yield from self.apply_fixed_tasks()
+        self.apply_fixed_tasks(model)
         # at most one task by agent at the same time
-        yield from self.apply_single_task_per_agent()
+        self.apply_single_task_per_agent(model)
         for category in self.categories:
             if self.max_task_affectations_by_category[category.pk]:
-                yield from self.apply_max_task_affectations(category.pk)
-        yield from self.apply_balancing_constraints()
-        for task_pk, agent_pks in self.available_agents_by_tasks.items():
-            for agent_pk in agent_pks:
-                yield Constraint('%s >= 0' % self.variable(agent_pk, task_pk))
-                yield Constraint('%s <= 1' % self.variable(agent_pk, task_pk))
-        for task_pk, agent_pks in self.available_agents_by_tasks.items():
-            for agent_pk in agent_pks:
-                yield Constraint('int %s' % self.variable(agent_pk, task_pk))
+                self.apply_max_task_affectations(model, category.pk)
+        self.apply_balancing_constraints(model)
+        if self.organization.elastic_constraints:
+            self.apply_slack_penalties(model)
+        # task variables of excluded agents are fixed to 0 and removed by the presolve
+        for index, key in enumerate(model.keys):
+            if key[0] != 'v':
+                continue
+            elif key[1] in self.available_agents_by_tasks[key[2]]:
+                model.set_bounds(index, 0., self.task_upper_bound(key[1], key[2]), integer=True)
+            else:
+                model.set_bounds(index, 0., 0., integer=True)
+        return model
+
+    def get_model(self) -> LinearModel:
+        """Return the complete linear model, built only once"""
+        if self.model is None:
+            start = time.perf_counter()
+            self.model = self.build_model()
+            self.family_counts = self.model.family_counts()
+            self.add_timing('constraints', start)
+        return self.model
+
+    def get_statistics(self) -> dict:
+        """Return the size of the complete model, as
+        `{'variables': variable count, 'nonzeros': nonzero count, 'constraints': {family: constraint count}}`.
+        Only the numeric arrays of the model are built, not its LP statements."""
+        model = self.get_model()
+        return {'variables': model.variable_count, 'nonzeros': model.nonzero_count,
+                'constraints': self.family_counts}
+
+    def predict_compute_time(self, history=10):
+        """Return the expected duration (in seconds) of a computation, or `None` when there is no previous computation.
+        The durations of the last `history` computations of the organization are scaled by the number of constraints
+        (the median value is returned).
+        """
+        constraint_count = sum(self.get_statistics()['constraints'].values())
+        durations = []
+        for celery_start, celery_end, timings, family_counts in ScheduleRun.objects \
+                .filter(organization_id=self.organization.pk, status__isnull=False, celery_start__isnull=False,
+                        celery_end__isnull=False, timings__isnull=False, family_counts__isnull=False) \
+                .order_by('-celery_end').values_list('celery_start', 'celery_end', 'timings', 'family_counts'):
+            previous_count = sum(json.loads(family_counts).values())
+            if 'solve' not in json.loads(timings) or previous_count == 0:  # previews or reused schedules
+                continue
+            durations.append((celery_end - celery_start).total_seconds() * constraint_count / previous_count)
+            if len(durations) >= history:
+                break
+        if not durations:
+            return None
+        durations.sort()
+        return durations[len(durations) // 2]
 
     @staticmethod
-    def variable(agent_pk, task_pk):
-        return 'v_a%s_e%s' % (agent_pk, task_pk)
+    def suggest_max_compute_time(predicted_time, margin=2.):
+        """Return a max compute time (in seconds, rounded up to the minute) of `margin` times the predicted duration
+        (see :meth:`predict_compute_time`), or `None` when there is no prediction"""
+        if predicted_time is None:
+            return None
+        return max(60, int(math.ceil(predicted_time * margin / 60.)) * 60)
+
+    def get_fingerprint(self, *extra) -> str:
+        """Return a digest of the model: two schedulers with the same fingerprint have the same solutions
+        :param extra: solving options that change the result"""
+        return self.get_model().fingerprint(*extra)
+
+    def constraints(self):
+        """Return the model as statements in the LP format"""
+        yield from self.get_model().lp_statements()
 
-    result_line_re = r'^v_a(\d+)_e(\d+)\s+1$'
+    def task_upper_bound(self, agent_pk, task_pk) -> int:
+        """Return the maximal number of tasks of the class of `task_pk` (see :meth:`aggregate_tasks`) performed by the
+        agent: these tasks are simultaneous, so only the capacity of the agent can perform those with a category"""
+        count = len(self.task_classes.get(task_pk, (task_pk, )))
+        if self.categories_by_task[task_pk]:
+            return min(count, self.agent_capacities.get(agent_pk, 1))
+        return count
 
     @staticmethod
-    def category_variable(category_pk, agent_pk=None):
-        if agent_pk is None:
-            return 'c_c%s' % category_pk
-        return 'c_c%s_a%s' % (category_pk, agent_pk)
+    def task_variable(model: LinearModel, agent_pk, task_pk) -> int:
+        return model.variable(('v', agent_pk, task_pk))
 
     @staticmethod
-    def affinity_variable():
-        return 'a'
+    def category_variable(model: LinearModel, category_pk, agent_pk) -> int:
+        return model.variable(('c', category_pk, agent_pk))
 
-    def solve(self, verbose=False, max_compute_time=None, schedule_run=None):
+    def solve(self, verbose=False, max_compute_time=None, schedule_run=None, backend=None, hint=None,
+              on_incumbent=None, lazy=None):
         """ Return a schedule (if such one exists) as a list of (agent_pk, task_pk)
         :param verbose: print the result to stdout
-        :param max_compute_time: max compute time
+        :param max_compute_time: max compute time, shared by all the phases of the computation
         :param schedule_run: a ScheduleRun object to update with its process id (must have its "id" attribute)
+        :param backend: name of the solver backend (`settings.SOLVER_BACKEND` by default)
+        :param hint: a previous schedule, as a list of (agent_pk, task_pk), used as a starting point if it can be
+          completed into a valid schedule (`self.hint_accepted` is then set to `True`)
+        :param on_incumbent: called with `(result_list, objective_value)` for each improved schedule found during
+          the solve (possibly from another thread)
+        :param lazy: add the balancing and max affectation rows only when they are violated (see :meth:`solve_lazy`,
+          `settings.LAZY_CONSTRAINTS` by default)
         :return:
         :rtype:
         """
+        if self.stop_event.is_set():
+            raise subprocess.TimeoutExpired('schedule', 0)
         if max_compute_time is not None and max_compute_time <= 0:
             max_compute_time = None
-        with tempfile.NamedTemporaryFile() as fd:
-            for constraint in self.constraints():
-                if verbose:
-                    print(constraint)
-                fd.write(('%s;\n' % constraint).encode())
-            fd.flush()
-            cmd = [settings.LP_SOLVE_PATH, '-lp', fd.name]
-            if max_compute_time:
-                cmd += ['-timeout', str(max_compute_time)]
-            p = subprocess.Popen(cmd, stdout=subprocess.PIPE,
-                                 stderr=subprocess.PIPE)
-            if schedule_run:
-                ScheduleRun.objects.filter(pk=schedule_run.pk).update(process_id=p.pid)
-            std_out, std_err = p.communicate(timeout=max_compute_time)
-            if schedule_run:
-                ScheduleRun.objects.filter(pk=schedule_run.pk).update(process_id=None)
+        if lazy is None:
+            lazy = settings.LAZY_CONSTRAINTS
+        deadline = None if max_compute_time is None else time.perf_counter() + max_compute_time
+        options = {'verbose': verbose, 'max_compute_time': max_compute_time, 'schedule_run': schedule_run,
+                   'backend': backend, 'hint': hint, 'on_incumbent': on_incumbent, 'lazy': lazy}
+        pools = [] if self.agent_capacities or self.task_classes else self.get_agent_pools()
+        if pools:
+            result_list = self.solve_pools(pools, **options)
+            if result_list is not None:
+                return result_list
+            options['max_compute_time'] = get_remaining_time(deadline)
+        classes = [] if self.task_classes else self.get_task_classes()
+        if classes:
+            aggregated = self.aggregate_tasks(classes)
+            result_list = aggregated.solve(**options)
+            self.merge_statistics(aggregated)
+            return result_list
+        solver = get_backend(backend)
+        self.solvers.add(solver)
+        if self.stop_event.is_set():  # stopped while this solver was created
+            solver.stop()
+        model = self.get_model()
+        start = time.perf_counter()
+        self.presolved_model = presolve(model)
+        self.add_timing('presolve', start)
+        self.hint_accepted = None
+        self.exceeded_limits = {}
         if verbose:
-            print(std_out.decode())
-            print(std_err.decode())
+            print(self.presolved_model.report())
+        if self.presolved_model.infeasible:
+            return []
+        kwargs = {'verbose': verbose, 'schedule_run': schedule_run}
+        incumbent = None
+        if hint:
+            start = time.perf_counter()
+            # at most half of the remaining time, so the model can still be solved if the hint cannot be completed
+            hint_deadline = None if deadline is None else (start + deadline) / 2.
+            try:
+                incumbent = self.complete_hint(self.presolved_model.model, hint, solver, deadline=hint_deadline,
+                                               **kwargs)
+            except subprocess.TimeoutExpired:
+                incumbent = None
+            self.hint_accepted = incumbent is not None
+            self.add_timing('hint', start)
+        on_values = None
+        if on_incumbent:
+            def on_values(values_):
+                values_ = self.presolved_model.postsolve(values_)
+                on_incumbent(self.get_result_list(model, values_), float(model.objective_value(values_)))
+        start = time.perf_counter()
+        solve_model = self.solve_lazy if lazy else self.solve_model
+        if self.organization.elastic_constraints:
+            values = self.solve_elastic(self.presolved_model.model, solver, solve_model, incumbent=incumbent,
+                                        on_incumbent=on_values, deadline=deadline, **kwargs)
+        else:
+            values = solve_model(self.presolved_model.model, solver, incumbent=incumbent, on_incumbent=on_values,
+                                 deadline=deadline, **kwargs)
+        self.add_timing('solve', start)
+        self.solver_configurations = solver.winning_configurations()
+        for phase, duration in solver.timings.items():
+            self.timings[phase] = self.timings.get(phase, 0.) + duration
+        if values is None:
+            return []
+        start = time.perf_counter()
+        values = self.presolved_model.postsolve(values)
+        result_list = self.get_result_list(model, values)
+        if self.organization.elastic_constraints:
+            self.exceeded_limits = self.get_exceeded_limits(model, values)
+        self.add_timing('postsolve', start)
+        return result_list
+
+    def get_agent_pools(self) -> list:
+        """Return the groups of at least two interchangeable agents, as sorted lists of agent.pk.
+
+        Interchangeable agents have the same preferences, the same available tasks and the same availability. Agents
+        with fixed tasks, or belonging to a category with balancing or max affectations (their individual values are
+        constrained), are never grouped.
+        """
+        constrained_category_pks = [x.pk for x in self.categories if self.max_task_affectations_by_category[x.pk] or
+                                    (x.balancing_mode is not None and x.balancing_tolerance is not None)]
+        fixed_agent_pks = set(self.fixed_agent_by_task.values())
+        category_pks = sorted(x.pk for x in self.categories)
+        available_task_pks = {agent_pk: [] for agent_pk in self.agent_pks}
+        for task_pk in sorted(self.available_agents_by_tasks):
+            for agent_pk in self.available_agents_by_tasks[task_pk]:
+                available_task_pks[agent_pk].append(task_pk)
+        pools = {}
+        for agent_pk in sorted(self.agent_pks):
+            if agent_pk in fixed_agent_pks or any(agent_pk not in self.agent_exclusions_by_category[category_pk]
+                                                  for category_pk in constrained_category_pks):
+                continue
+            key = (tuple(self.preferences_by_agent_by_category[category_pk].get(agent_pk, (0, 1., 0.))
+                         for category_pk in category_pks),
+                   tuple(available_task_pks[agent_pk]), self.availability_index.periods.get(agent_pk))
+            pools.setdefault(key, []).append(agent_pk)
+        return [x for x in pools.values() if len(x) > 1]
+
+    def aggregate_agents(self, pools: list):
+        """Return a copy of this scheduler where each pool of interchangeable agents (see :meth:`get_agent_pools`) is
+        replaced by its first agent, able to perform as many simultaneous tasks of a category as the pool has agents
+        """
+        result = self.restrict(self.tasks, {}, {})
+        removed_agent_pks = {agent_pk for pool in pools for agent_pk in pool[1:]}
+        result.agent_pks = self.agent_pks - removed_agent_pks
+        result.available_agents_by_tasks = {task_pk: agent_pks - removed_agent_pks
+                                            for (task_pk, agent_pks) in self.available_agents_by_tasks.items()}
+        result.agent_capacities = {pool[0]: len(pool) for pool in pools}
+        return result
+
+    def split_pools(self, result_list, pools: list):
+        """Assign the tasks given to the first agent of each pool (see :meth:`aggregate_agents`) to the agents of the
+        pool, or return `None` if they cannot be split without overlapping tasks of the same category.
+
+        Tasks are assigned by increasing start time to the least busy agent that is free in all their categories:
+        this always succeeds when all tasks of the pool have a single category.
+        """
+        agent_pks_by_pool = {pool[0]: pool for pool in pools}
+        tasks_by_pk = {task.pk: task for task in self.tasks}
+        result = []
+        tasks_by_pool = {}
+        for agent_pk, task_pk in result_list:
+            if agent_pk in agent_pks_by_pool:
+                tasks_by_pool.setdefault(agent_pk, []).append(tasks_by_pk[task_pk])
+            else:
+                result.append((agent_pk, task_pk))
+        for first_agent_pk, tasks in tasks_by_pool.items():
+            tasks.sort(key=lambda x: (x.start_time, x.end_time, x.pk))
+            busy_until = {agent_pk: {} for agent_pk in agent_pks_by_pool[first_agent_pk]}
+            # busy_until[agent.pk][category.pk] = end of the last task of the category performed by the agent
+            task_counts = {agent_pk: 0 for agent_pk in agent_pks_by_pool[first_agent_pk]}
+            for task in tasks:
+                category_pks = self.categories_by_task[task.pk]
+                free_agent_pks = [agent_pk for agent_pk in agent_pks_by_pool[first_agent_pk]
+                                  if all(busy_until[agent_pk].get(category_pk, task.start_time) <= task.start_time
+                                         for category_pk in category_pks)]
+                if not free_agent_pks:
+                    return None
+                agent_pk = min(free_agent_pks, key=lambda x: task_counts[x])
+                for category_pk in category_pks:
+                    busy_until[agent_pk][category_pk] = task.end_time
+                task_counts[agent_pk] += 1
+                result.append((agent_pk, task.pk))
+        return result
+
+    def solve_pools(self, pools: list, hint=None, on_incumbent=None, **kwargs):
+        """Solve the aggregated model of :meth:`aggregate_agents` and split its schedule (see :meth:`solve` for the
+        arguments). Return `None` if the schedule cannot be split: the complete model must then be solved.
+
+        The aggregated model accepts the schedules of the complete model, with the same objective: an optimal split
+        schedule is optimal, and there is no schedule when the aggregated model has no solution.
+        """
+        aggregated = self.aggregate_agents(pools)
+        first_agent_pks = {agent_pk: pool[0] for pool in pools for agent_pk in pool}
+        if hint:
+            hint = [(first_agent_pks.get(agent_pk, agent_pk), task_pk) for (agent_pk, task_pk) in hint]
+        on_pool_incumbent = None
+        if on_incumbent:
+            def on_pool_incumbent(result_list_, objective_):
+                result_list_ = self.split_pools(result_list_, pools)
+                if result_list_ is not None:
+                    on_incumbent(result_list_, objective_)
+        result_list = aggregated.solve(hint=hint, on_incumbent=on_pool_incumbent, **kwargs)
+        self.merge_statistics(aggregated)
+        if not result_list:
+            return []
+        start = time.perf_counter()
+        result_list = self.split_pools(result_list, pools)
+        self.add_timing('postsolve', start)
+        return result_list
+
+    def get_task_classes(self) -> list:
+        """Return the groups of at least two identical tasks, as sorted lists of task.pk. Identical tasks have the
+        same start, the same end, the same categories and the same available agents, and are not fixed."""
+        classes = {}
+        for task in self.tasks:
+            if task.pk in self.fixed_agent_by_task:
+                continue
+            key = (task.start_time, task.end_time, frozenset(self.categories_by_task[task.pk]),
+                   frozenset(self.available_agents_by_tasks[task.pk]))
+            classes.setdefault(key, []).append(task.pk)
+        return [sorted(x) for x in classes.values() if len(x) > 1]
+
+    def aggregate_tasks(self, classes: list):
+        """Return a copy of this scheduler where each class of identical tasks (see :meth:`get_task_classes`) is
+        replaced by its first task: its variables are the number of tasks of the class performed by each agent, and
+        the tasks are given back by :meth:`get_result_list`"""
+        removed_task_pks = {task_pk for task_pks in classes for task_pk in task_pks[1:]}
+        result = self.restrict({x for x in self.tasks if x.pk not in removed_task_pks}, {}, {})
+        result.task_classes = {task_pks[0]: task_pks for task_pks in classes}
+        return result
+
+    def merge_statistics(self, aggregated):
+        """Copy the results of the last call to `solve` of an aggregated copy of this scheduler"""
+        for phase, duration in aggregated.timings.items():
+            self.timings[phase] = self.timings.get(phase, 0.) + duration
+        if self.model is None:  # the constraints of the complete model are not counted: count the solved ones
+            for family, count in aggregated.family_counts.items():
+                self.family_counts[family] = self.family_counts.get(family, 0) + count
+        self.presolved_model = aggregated.presolved_model
+        self.hint_accepted = aggregated.hint_accepted
+        self.solver_configurations = aggregated.solver_configurations
+        self.exceeded_limits = aggregated.exceeded_limits
+
+    def get_result_list(self, model: LinearModel, values: dict):
+        """Return the schedule given by the values of the variables, as a list of (agent_pk, task_pk). The tasks of
+        a class (see :meth:`aggregate_tasks`) are given in order to the agents performing some of them."""
         result_list = []
-        std_out = std_out.decode()
-        value_re = re.compile(self.result_line_re)
-        for line in std_out.splitlines():
-            matcher = value_re.match(line)
-            if matcher:
-                result_list.append((int(matcher.group(1)), int(matcher.group(2))))
+        remaining_task_pks = {}
+        # remaining_task_pks[task.pk] = iterator on the tasks of the class that are not yet given to an agent
+        for index, value in values.items():
+            key = model.keys[index]
+            if key[0] != 'v' or value <= 0.5:
+                continue
+            elif key[2] in self.task_classes:
+                task_pks = remaining_task_pks.setdefault(key[2], iter(self.task_classes[key[2]]))
+                result_list += [(key[1], next(task_pks)) for __ in range(int(round(value)))]
+            else:
+                result_list.append((key[1], key[2]))
         return result_list
 
+    @staticmethod
+    def solve_model(model: LinearModel, solver, incumbent=None, on_incumbent=None, deadline=None, **kwargs):
+        """Solve the independent parts of the model (no shared agent, task or balanced category) in parallel and
+        return the values of the non-zero variables, or `None` if there is no solution.
+        :param incumbent: a known solution (non-zero values). It is kept for the parts where it is optimal (no
+          objective, or objective equal to the bound given by the linear relaxation), or where the solver finds
+          nothing in the allowed time.
+        :param on_incumbent: called with the values of the whole model each time the solver improves the solution
+          of a part, as soon as all parts have a solution
+        :param deadline: end of the allowed time (a value of `time.perf_counter()`), shared by all the solves
+        :raise subprocess.TimeoutExpired: when no solution has been found before the deadline
+        """
+        components = model.split()
+        solutions = [None] * len(components)
+        fallbacks = [None] * len(components)
+        to_check = []
+        if incumbent is not None:
+            for component_index, (component, indices) in enumerate(components):
+                fallbacks[component_index] = {index: incumbent[x] for (index, x) in enumerate(indices)
+                                              if incumbent.get(x)}
+                if any(component.objective.values()):
+                    to_check.append(component_index)
+                else:  # any solution is optimal
+                    solutions[component_index] = fallbacks[component_index]
+        if to_check:
+            try:
+                relaxed_solutions = solve_all(solver, [components[x][0].relaxed() for x in to_check],
+                                              max_compute_time=get_remaining_time(deadline), **kwargs)
+            except subprocess.TimeoutExpired:  # the incumbent cannot be proven optimal
+                relaxed_solutions = None
+            for component_index, relaxed_solution in zip(to_check, relaxed_solutions or []):
+                component = components[component_index][0]
+                bound = component.objective_value(relaxed_solution)
+                if component.objective_is_integral():
+                    bound = math.ceil(bound - 1e-6)
+                if component.objective_value(fallbacks[component_index]) <= bound + 1e-6:
+                    solutions[component_index] = fallbacks[component_index]
+        to_solve = [x for x in range(len(components)) if solutions[x] is None]
+        on_component_incumbent = None
+        if on_incumbent:
+            incumbents = [fallbacks[x] if solutions[x] is None else solutions[x] for x in range(len(components))]
+            # incumbents[component_index] = best known solution of this component
+            lock = threading.Lock()
+
+            def on_component_incumbent(model_index, solution_):
+                with lock:
+                    incumbents[to_solve[model_index]] = solution_
+                    if any(x is None for x in incumbents):
+                        return
+                    values_ = {}
+                    for (component_, indices_), solution_ in zip(components, incumbents):
+                        values_.update({indices_[index]: value for (index, value) in solution_.items()})
+                    on_incumbent(values_)
+        try:
+            max_compute_time = get_remaining_time(deadline)
+        except subprocess.TimeoutExpired:
+            if any(fallbacks[x] is None for x in to_solve):
+                raise
+            for component_index in to_solve:
+                solutions[component_index] = fallbacks[component_index]
+            max_compute_time, to_solve = None, []
+        results = solve_all(solver, [components[x][0] for x in to_solve], max_compute_time=max_compute_time,
+                            fallbacks=[fallbacks[x] for x in to_solve], on_incumbent=on_component_incumbent, **kwargs)
+        if results is None:
+            return None
+        for component_index, solution in zip(to_solve, results):
+            solutions[component_index] = solution
+        values = {}
+        for (component, indices), solution in zip(components, solutions):
+            values.update({indices[index]: value for (index, value) in solution.items()})
+        return values
+
+    @classmethod
+    def solve_lazy(cls, model: LinearModel, solver, incumbent=None, on_incumbent=None, deadline=None, verbose=False,
+                   **kwargs):
+        """Solve the model by lazy constraint generation and return the values of the non-zero variables, or `None`
+        if there is no solution (see :meth:`solve_model` for the arguments).
+
+        The model is first solved without its inequality rows of `lazy_families`. The rows violated by the solution
+        are added, and the model is solved again until no row is violated. The incumbent (a solution of the complete
+        model) is a starting point of each solve, and is returned if the deadline (for the whole loop) is reached
+        before the end.
+        """
+        lazy_row_indices = [row_index for row_index in range(model.row_count) if model.senses[row_index] != model.EQ
+                            and model.families[model.row_families[row_index]] in cls.lazy_families]
+        row_indices = sorted(set(range(model.row_count)) - set(lazy_row_indices))
+        on_model_incumbent = None
+        if on_incumbent:
+            def on_model_incumbent(values_):
+                if not model.violated_rows(lazy_row_indices, values_):
+                    on_incumbent(values_)
+        iteration = 0
+        while True:
+            try:
+                values = cls.solve_model(model.subset(row_indices), solver, incumbent=incumbent,
+                                         on_incumbent=on_model_incumbent, deadline=deadline, verbose=verbose,
+                                         **kwargs)
+            except subprocess.TimeoutExpired:
+                if incumbent is None:
+                    raise
+                return incumbent
+            if values is None:
+                return None
+            violated_row_indices = model.violated_rows(lazy_row_indices, values)
+            iteration += 1
+            if verbose:
+                print('lazy constraints: iteration %d, %d/%d rows, %d violated rows' %
+                      (iteration, len(row_indices), model.row_count, len(violated_row_indices)))
+            if not violated_row_indices:
+                return values
+            violated = set(violated_row_indices)
+            lazy_row_indices = [x for x in lazy_row_indices if x not in violated]
+            row_indices = sorted(row_indices + violated_row_indices)
+
+    def solve_elastic(self, model: LinearModel, solver, solve_model, incumbent=None, on_incumbent=None, deadline=None,
+                      **kwargs):
+        """Solve a model built in elastic mode in two steps, and return the values of the non-zero variables, or `None`
+        if there is no solution (see :meth:`solve_model` for the arguments).
+
+        The total excess over the limits is first minimized (with at most half of the remaining time), then the
+        affinity is optimized without exceeding this total: the limits are only exceeded when no other schedule
+        exists, even when the excess is smaller than the time unit of the model.
+        :param solve_model: :meth:`solve_model` or :meth:`solve_lazy`
+        """
+        slack_indices = [index for (index, key) in enumerate(model.keys) if key[0] in self.slack_groups]
+        if not slack_indices:
+            return solve_model(model, solver, incumbent=incumbent, on_incumbent=on_incumbent, deadline=deadline,
+                               **kwargs)
+        slack_model = copy.deepcopy(model)
+        slack_model.objective = {index: 1. for index in slack_indices}
+        slack_deadline = None if deadline is None else (time.perf_counter() + deadline) / 2.
+        values = solve_model(slack_model, solver, incumbent=incumbent, deadline=slack_deadline, **kwargs)
+        if values is None:
+            return None
+        total_excess = sum(values.get(index, 0.) for index in slack_indices)
+        elastic_model = copy.deepcopy(model)
+        if total_excess <= 1e-6:  # no limit is exceeded: the slack variables are removed from the model
+            for index in slack_indices:
+                elastic_model.set_bounds(index, 0., 0., integer=bool(model.integers[index]))
+        else:
+            elastic_model.add_row(slack_indices, None, model.LE, total_excess + 1e-6, 'elastic')
+        return solve_model(elastic_model, solver, incumbent=values, on_incumbent=on_incumbent, deadline=deadline,
+                           **kwargs)
+
+    def complete_hint(self, model: LinearModel, hint, solver, **kwargs):
+        """Return a solution of the model that keeps the agents given by `hint` (list of (agent_pk, task_pk)), the
+        other tasks being solved, or `None` if there is no such solution"""
+        class_pks = {task_pk: class_pk for (class_pk, task_pks) in self.task_classes.items() for task_pk in task_pks}
+        hint_counts = {}
+        # hint_counts[(agent.pk, task.pk)] = number of tasks of the class of the task (see `aggregate_tasks`)
+        for agent_pk, task_pk in hint:
+            key = ('v', agent_pk, class_pks.get(task_pk, task_pk))
+            if key in model.indices:
+                hint_counts[key[1:]] = hint_counts.get(key[1:], 0) + 1
+        hint_task_counts = {}
+        # hint_task_counts[task.pk] = number of tasks of the class that are given by the hint
+        for (agent_pk, task_pk), count in hint_counts.items():
+            hint_task_counts[task_pk] = hint_task_counts.get(task_pk, 0) + count
+        hint_model = copy.deepcopy(model)
+        for index, key in enumerate(model.keys):
+            if key[0] == 'v' and key[2] in hint_task_counts:
+                value = hint_counts.get(key[1:], 0)
+                if hint_task_counts[key[2]] < len(self.task_classes.get(key[2], ())):  # other tasks can be added
+                    hint_model.set_bounds(index, value, model.upper_bounds[index], integer=True)
+                else:
+                    hint_model.set_bounds(index, value, value, integer=True)
+        presolved_model = presolve(hint_model)
+        if presolved_model.infeasible:
+            return None
+        values = self.solve_model(presolved_model.model, solver, **kwargs)
+        return None if values is None else presolved_model.postsolve(values)
+
+    def get_solver_configuration(self):
+        """Return the solver configurations used by the last call to `solve`, as a string, or `None`"""
+        if len(self.solver_configurations) <= 1:
+            return next(iter(self.solver_configurations), None)
+        configurations = sorted(self.solver_configurations.items(), key=lambda x: (-x[1], x[0]))
+        return ', '.join('%s (%d)' % x for x in configurations)
+
+    def get_previous_schedule(self):
+        """Return the current agents of tasks or, if no task is assigned, the result of the last valid ScheduleRun,
+        as a list of (agent_pk, task_pk)"""
+        result_list = [(task.agent_id, task.pk) for task in self.tasks if task.agent_id]
+        if result_list:
+            return result_list
+        schedule_run = ScheduleRun.objects.filter(organization=self.organization, status=True) \
+            .exclude(result_dict=None).order_by('-celery_end').first()
+        if schedule_run is None:
+            return []
+        return self.result_from_json(schedule_run.result_dict)
+
+    @staticmethod
+    def result_from_json(serialized_result_dict: str):
+        """Convert the `result_dict` of a ScheduleRun to a list of (agent_pk, task_pk)"""
+        return [(int(agent_pk), task_pk) for (agent_pk, task_pks) in json.loads(serialized_result_dict).items()
+                for task_pk in task_pks]
+
+    def solve_rolling_horizon(self, length: datetime.timedelta, overlap: datetime.timedelta, verbose=False,
+                              max_compute_time=None, schedule_run=None, backend=None, hint=None, on_incumbent=None,
+                              lazy=None):
+        """ Return a schedule (if such one exists) as a list of (agent_pk, task_pk), by solving successive time
+        windows of `length` instead of the whole period at once.
+
+        Tasks starting in the first `length - overlap` of a window are frozen once the window is solved, the other
+        ones are solved again with the next window. Frozen tasks that may interact with the next window (overlapping
+        tasks, periods of max affectation rules) are kept as fixed tasks, the others are replaced by balancing
+        offsets. Balancing tolerances are thus checked on the cumulated values at the end of each window.
+        :param length: length of each window
+        :param overlap: duration shared by two consecutive windows
+        :param max_compute_time: max compute time, shared by all the windows
+        :param hint: a previous schedule, used as a starting point for each window (see :meth:`solve`)
+        :param on_incumbent: called with `(result_list, objective_value)` for each improved schedule of a window,
+          completed by the tasks frozen by the previous windows (the objective is the one of the window)
+        :param lazy: use lazy constraint generation for each window (see :meth:`solve`)
+        """
+        step = length - overlap
+        if step <= datetime.timedelta(0):
+            raise ValueError('The overlap of the rolling horizon must be shorter than its length')
+        if max_compute_time is not None and max_compute_time <= 0:
+            max_compute_time = None
+        deadline = None if max_compute_time is None else time.perf_counter() + max_compute_time
+        tasks = sorted(self.tasks, key=lambda x: (x.start_time, x.end_time, x.pk))
+        margin = max([x.range_time_slice for x in itertools.chain(*self.max_task_affectations_by_category.values())],
+                     default=datetime.timedelta(0))
+        frozen = {}
+        # frozen[task.pk] = agent.pk
+        self.hint_accepted = None
+        self.solver_configurations = {}
+        self.family_counts = {}  # constraints of all windows
+        self.exceeded_limits = {}  # largest excess among all windows
+        on_window_incumbent = None
+        if on_incumbent:
+            def on_window_incumbent(result_list_, objective):
+                window_task_pks = {task_pk for (agent_pk, task_pk) in result_list_}
+                on_incumbent([(agent_pk, task_pk) for (task_pk, agent_pk) in frozen.items()
+                              if task_pk not in window_task_pks] + result_list_, objective)
+        first_index = 0  # all tasks before this index are frozen
+        window_start = None
+        while first_index < len(tasks):
+            if self.stop_event.is_set():
+                raise subprocess.TimeoutExpired('schedule', 0)
+            if window_start is None or window_start + length <= tasks[first_index].start_time:
+                window_start = tasks[first_index].start_time  # skip empty windows
+            window_end = window_start + length
+            is_last = window_end > tasks[-1].start_time
+            window_tasks = {x for x in tasks[first_index:] if x.start_time < window_end}
+            context_tasks = {x for x in tasks[:first_index] if x.end_time > window_start - margin}
+            scheduler = self.restrict(window_tasks | context_tasks, {x.pk: frozen[x.pk] for x in context_tasks},
+                                      self.get_balancing_values([(frozen[x.pk], x.pk) for x in tasks[:first_index]
+                                                                 if x not in context_tasks]))
+            result_list = scheduler.solve(verbose=verbose, max_compute_time=get_remaining_time(deadline),
+                                          schedule_run=schedule_run, backend=backend, hint=hint,
+                                          on_incumbent=on_window_incumbent, lazy=lazy)
+            if scheduler.hint_accepted is not None:
+                self.hint_accepted = scheduler.hint_accepted and self.hint_accepted is not False
+            for configuration, count in scheduler.solver_configurations.items():
+                self.solver_configurations[configuration] = self.solver_configurations.get(configuration, 0) + count
+            for phase, duration in scheduler.timings.items():
+                self.timings[phase] = self.timings.get(phase, 0.) + duration
+            for family, count in scheduler.family_counts.items():
+                self.family_counts[family] = self.family_counts.get(family, 0) + count
+            for group, excess in scheduler.exceeded_limits.items():
+                self.exceeded_limits[group] = max(excess, self.exceeded_limits.get(group, 0.))
+            if not result_list:
+                return []
+            window_start += step
+            for agent_pk, task_pk in result_list:
+                frozen.setdefault(task_pk, agent_pk)
+            while first_index < len(tasks) and tasks[first_index].pk in frozen and \
+                    (is_last or tasks[first_index].start_time < window_start):
+                first_index += 1
+            for task in tasks[first_index:]:  # in the overlap: must be solved again with the next window
+                frozen.pop(task.pk, None)
+        return [(agent_pk, task_pk) for (task_pk, agent_pk) in frozen.items()]
+
+    def restrict(self, tasks: set, fixed_agent_by_task: dict, balancing_offsets: dict):
+        """Return a copy of this scheduler, limited to a subset of its tasks
+        :param tasks: set of tasks
+        :param fixed_agent_by_task: additional fixed tasks `{task.pk: agent.pk}`
+        :param balancing_offsets: values added to the balancing offsets, `{category.pk: {agent.pk: value}}`
+        """
+        result = copy.copy(self)
+        task_pks = {x.pk for x in tasks}
+        result.tasks = tasks
+        result.tasks_by_category = {category_pk: {x for x in category_tasks if x.pk in task_pks}
+                                    for (category_pk, category_tasks) in self.tasks_by_category.items()}
+        result.available_agents_by_tasks = {task_pk: self.available_agents_by_tasks[task_pk] for task_pk in task_pks}
+        result.fixed_agent_by_task = {task_pk: agent_pk for (task_pk, agent_pk)
+                                      in itertools.chain(self.fixed_agent_by_task.items(),
+                                                         fixed_agent_by_task.items()) if task_pk in task_pks}
+        result.preferences_by_agent_by_category = {category_pk: dict(preferences) for (category_pk, preferences)
+                                                   in self.preferences_by_agent_by_category.items()}
+        for category_pk, offsets in balancing_offsets.items():
+            preferences = result.preferences_by_agent_by_category[category_pk]
+            for agent_pk, offset in offsets.items():
+                agent_preferences = preferences.get(agent_pk, (0, 1., 0.))
+                preferences[agent_pk] = (agent_preferences[0] + offset, agent_preferences[1], agent_preferences[2])
+        result.model = None
+        result.presolved_model = None
+        result.solver_configurations = {}
+        result.timings = {}
+        result.family_counts = {}
+        result.exceeded_limits = {}
+        return result
+
+    def relax(self, groups):
+        """Return a copy of this scheduler without some groups of constraints
+        :param groups: set of `('balancing', category.pk)`, `('max_affectation', category.pk, rule index)`,
+          `('fixed_tasks', )` or `('availability', )`
+        """
+        result = self.restrict(self.tasks, {}, {})
+        result.categories = {category._replace(balancing_mode=None) if ('balancing', category.pk) in groups
+                             else category for category in self.categories}
+        result.categories_by_pk = {x.pk: x for x in result.categories}
+        result.max_task_affectations_by_category = {
+            category_pk: [x for (index, x) in enumerate(max_affectations)
+                          if ('max_affectation', category_pk, index) not in groups]
+            for (category_pk, max_affectations) in self.max_task_affectations_by_category.items()}
+        if ('fixed_tasks', ) in groups:
+            result.fixed_agent_by_task = {}
+        if ('availability', ) in groups:
+            result.available_agents_by_tasks = {}
+            for task_pk in self.available_agents_by_tasks:
+                excluded_agent_pks = set()
+                for category_pk in self.categories_by_task[task_pk]:
+                    excluded_agent_pks |= self.agent_exclusions_by_category[category_pk]
+                result.available_agents_by_tasks[task_pk] = self.agent_pks - excluded_agent_pks
+            for agent_pk, task_pk in self.agent_task_exclusions:
+                result.available_agents_by_tasks[task_pk].discard(agent_pk)
+        return result
+
+    def get_balancing_values(self, result_list) -> dict:
+        """Return the number of tasks (or their total duration) of each agent in each balanced category, without
+        the balancing offsets and counts, as a dict `{category.pk: {agent.pk: value}}`"""
+        values = {}
+        for agent_pk, task_pk in result_list:
+            for category_pk in self.categories_by_task[task_pk]:
+                category = self.categories_by_pk[category_pk]
+                if category.balancing_mode is None or category.balancing_tolerance is None:
+                    continue
+                value = 1 if category.balancing_mode == category.BALANCE_NUMBER else self.task_durations[task_pk]
+                category_values = values.setdefault(category_pk, {})
+                category_values[agent_pk] = category_values.get(agent_pk, 0) + value
+        return values
+
     @staticmethod
     def result_by_agent(result_list):
         result_dict = {}
@@ -351,3 +1123,46 @@ class Scheduler(object):
         for agent_pk, task_pk in result_list:
             result_dict.setdefault(task_pk, set()).add(agent_pk)
         return result_dict
+
+
+def maximal_overlapping_sets(events: dict):
+    """Yield the maximal sets of overlapping intervals, as sorted lists.
+    Intervals are half-open: an interval ending at `t` does not overlap an interval starting at `t`.
+
+    >>> list(maximal_overlapping_sets({0: ([], [1]), 1: ([], [2]), 2: ([1], [3]), 3: ([2, 3], [])}))
+    [[1, 2], [2, 3]]
+
+    :param events: `events[time] = ([ending interval ids], [starting interval ids])`
+    """
+    current = set()
+    grown = False
+    for time in sorted(events):
+        ending, starting = events[time]
+        if ending and grown:
+            yield sorted(current)
+            grown = False
+        current.difference_update(ending)
+        if starting:
+            current.update(starting)
+            grown = True
+
+
+def sliding_windows(start_times: list, length) -> list:
+    """Return the windows `[start, start + length)` beginning at each distinct start time, as a list of
+    `(begin, end)` indices in the sorted list `start_times`. Both indices only move forward.
+
+    >>> sliding_windows([0, 0, 1, 3, 4, 8], 3)
+    [(0, 3), (2, 4), (3, 5), (4, 5), (5, 6)]
+
+    """
+    windows = []
+    end = 0
+    count = len(start_times)
+    for begin, start_time in enumerate(start_times):
+        if begin > 0 and start_times[begin - 1] == start_time:
+            continue
+        end = max(end, begin)
+        while end < count and start_times[end] < start_time + length:
+            end += 1
+        windows.append((begin, end))
+    return windows
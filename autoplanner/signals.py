@@ -10,7 +10,9 @@ from django.utils.timezone import utc
 from django.utils.translation import ugettext as _
 
 from autoplanner.forms import OrganizationDescriptionForm, OrganizationAccessTokenForm, \
-    OrganizationMaxComputeTimeForm, CategoryNameForm, CategoryBalancingModeForm, CategoryAutoAffinityForm, \
+    OrganizationMaxComputeTimeForm, OrganizationBalancingFormulationForm, OrganizationElasticConstraintsForm, \
+    OrganizationHorizonLengthForm, OrganizationHorizonOverlapForm, CategoryNameForm, CategoryBalancingModeForm, \
+    CategoryAutoAffinityForm, \
     CategoryAddForm, AgentAddForm, AgentNameForm, AgentStartTimeForm, AgentEndTimeForm, \
     AgentCategoryPreferencesAffinityForm, AgentCategoryPreferencesAddForm, \
     AgentCategoryPreferencesBalancingOffsetForm, \
@@ -20,6 +22,7 @@ from autoplanner.forms import OrganizationDescriptionForm, OrganizationAccessTok
     CategoryBalancingToleranceTimeForm, CategoryBalancingToleranceNumberForm, AgentStartDateForm, AgentEndDateForm, \
     TaskNameForm, TaskStartTimeForm, TaskEndTimeForm, TaskStartDateForm, TaskEndDateForm, TaskAgentForm, \
     TaskCategoriesForm, TaskAddForm, TaskMultiplyForm, TaskMultipleUpdateForm, TaskImportForm, TaskMultipleRemoveForm
+from autoplanner.availability import is_available
 from autoplanner.models import Organization, default_token, Category, Agent, AgentCategoryPreferences, \
     MaxTaskAffectation, MaxTimeTaskAffectation, Task, ScheduleRun, API_KEY_VARIABLE
 from autoplanner.schedule import Scheduler
@@ -38,6 +41,11 @@ def check_task(window_info, task):
     if task.end_time < task.start_time:
         msg = _('Finish time is before start time for %(t)s') % {'t': task}
         notify(window_info, msg, level=WARNING, style=NOTIFICATION)
+    if task.agent_id:
+        agent = task.agent
+        if not is_available(agent.start_time, agent.end_time, task.start_time, task.end_time):
+            msg = _('%(a)s is not available during %(t)s') % {'a': agent, 't': task}
+            notify(window_info, msg, level=WARNING, style=NOTIFICATION)
 
 
 def int_or_none(value):
@@ -58,7 +66,9 @@ def change_tab(window_info, organization_pk: int, tab_name: str):
 
 
 def change_tab_general(window_info, organization):
-    context = {'organization': organization, }
+    # noinspection PyProtectedMember
+    balancing_formulations = Organization._meta.get_field('balancing_formulation').choices
+    context = {'organization': organization, 'balancing_formulations': balancing_formulations}
     render_to_client(window_info, 'autoplanner/tabs/general.html', context, '#general')
 
 
@@ -152,10 +162,54 @@ def set_max_compute_time(window_info, organization_pk: int, value: SerializedFor
         max_compute_time = value.cleaned_data['max_compute_time']
         Organization.query(window_info).filter(pk=organization_pk).update(max_compute_time=max_compute_time)
         add_attribute(window_info, '#check_max_compute_time', 'class', 'fa fa-check')
+        add_attribute(window_info, '#id_max_compute_time', 'value',
+                      '' if max_compute_time is None else max_compute_time)
     elif value:
         add_attribute(window_info, '#check_max_compute_time', 'class', 'fa fa-remove')
 
 
+@signal(is_allowed_to=is_authenticated, path='autoplanner.forms.set_balancing_formulation', queue='fast')
+def set_balancing_formulation(window_info, organization_pk: int,
+                              value: SerializedForm(OrganizationBalancingFormulationForm)):
+    if value and value.is_valid():
+        balancing_formulation = value.cleaned_data['balancing_formulation']
+        Organization.query(window_info).filter(pk=organization_pk).update(balancing_formulation=balancing_formulation)
+        add_attribute(window_info, '#check_balancing_formulation', 'class', 'fa fa-check')
+    elif value:
+        add_attribute(window_info, '#check_balancing_formulation', 'class', 'fa fa-remove')
+
+
+@signal(is_allowed_to=is_authenticated, path='autoplanner.forms.set_elastic_constraints', queue='fast')
+def set_elastic_constraints(window_info, organization_pk: int,
+                            value: SerializedForm(OrganizationElasticConstraintsForm)):
+    if value and value.is_valid():
+        elastic_constraints = value.cleaned_data['elastic_constraints']
+        Organization.query(window_info).filter(pk=organization_pk).update(elastic_constraints=elastic_constraints)
+        add_attribute(window_info, '#check_elastic_constraints', 'class', 'fa fa-check')
+    elif value:
+        add_attribute(window_info, '#check_elastic_constraints', 'class', 'fa fa-remove')
+
+
+@signal(is_allowed_to=is_authenticated, path='autoplanner.forms.set_horizon_length', queue='fast')
+def set_horizon_length(window_info, organization_pk: int, value: SerializedForm(OrganizationHorizonLengthForm)):
+    if value and value.is_valid():
+        horizon_length = value.cleaned_data['horizon_length']
+        Organization.query(window_info).filter(pk=organization_pk).update(horizon_length=horizon_length)
+        add_attribute(window_info, '#check_horizon_length', 'class', 'fa fa-check')
+    elif value:
+        add_attribute(window_info, '#check_horizon_length', 'class', 'fa fa-remove')
+
+
+@signal(is_allowed_to=is_authenticated, path='autoplanner.forms.set_horizon_overlap', queue='fast')
+def set_horizon_overlap(window_info, organization_pk: int, value: SerializedForm(OrganizationHorizonOverlapForm)):
+    if value and value.is_valid():
+        horizon_overlap = value.cleaned_data['horizon_overlap']
+        Organization.query(window_info).filter(pk=organization_pk).update(horizon_overlap=horizon_overlap)
+        add_attribute(window_info, '#check_horizon_overlap', 'class', 'fa fa-check')
+    elif value:
+        add_attribute(window_info, '#check_horizon_overlap', 'class', 'fa fa-remove')
+
+
 @signal(is_allowed_to=is_authenticated, path='autoplanner.forms.set_category_name', queue='fast')
 def set_category_name(window_info, organization_pk: int, category_pk: int, value: SerializedForm(CategoryNameForm)):
     can_update = Organization.query(window_info).filter(pk=organization_pk).count() > 0
@@ -803,6 +857,9 @@ def set_task_agent(window_info, organization_pk: int, task_pk: int, value: Seria
                     _('Proposed to %(name)s') % {'name': task.agent.name})
         elif agent or task.agent is None:
             content(window_info, '#row_task_%s small.agent' % task_pk, '')
+        if agent:
+            task.agent = agent
+            check_task(window_info, task)
 
         add_attribute(window_info, '#check_task_%s' % task_pk, 'class', 'fa fa-check')
     elif value:
@@ -1085,6 +1142,27 @@ def schedule_launch(window_info, organization_pk: int):
     compute_schedule.delay(organization_pk, window_info.to_dict())
 
 
+@signal(is_allowed_to=is_authenticated, path='autoplanner.schedule.preview', queue='fast')
+def schedule_preview(window_info, organization_pk: int):
+    organization = Organization.query(window_info).filter(pk=organization_pk).first()
+    if not organization:
+        return
+    compute_schedule.delay(organization_pk, window_info.to_dict(), preview=True)
+
+
+@signal(is_allowed_to=is_authenticated, path='autoplanner.schedule.estimate', queue='celery')
+def schedule_estimate(window_info, organization_pk: int):
+    organization = Organization.query(window_info).filter(pk=organization_pk).first()
+    if not organization:
+        return
+    scheduler = Scheduler(organization)
+    predicted_time = scheduler.predict_compute_time()
+    context = {'organization': organization, 'statistics': scheduler.get_statistics(),
+               'predicted_time': None if predicted_time is None else datetime.timedelta(seconds=round(predicted_time)),
+               'suggested_time': scheduler.suggest_max_compute_time(predicted_time)}
+    render_to_client(window_info, 'autoplanner/include/schedule_estimate.html', context, '#schedule_estimate')
+
+
 @signal(is_allowed_to=is_authenticated, path='autoplanner.schedule.kill', queue='fast')
 def schedule_kill(window_info, organization_pk: int, celery_task_id: str):
     organization = Organization.query(window_info).filter(pk=organization_pk).first()
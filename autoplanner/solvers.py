@@ -0,0 +1,706 @@
+import copy
+import functools
+import multiprocessing
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from autoplanner.linear_model import LinearModel
+from autoplanner.models import ScheduleRun
+
+__author__ = 'Matthieu Gallet'
+
+
+class SolverBackend(object):
+    """Base class of all solvers.
+
+    A solver receives a :class:`autoplanner.linear_model.LinearModel` and returns the value of all
+    non-zero variables, as a dict `{variable_index: value}`. An empty dict means that no solution has been found.
+    """
+    name = None
+    in_process = False  # `True` when the solver runs in the Python process, so parallel solves require processes
+    supports_hint = False  # `True` when the solver can start from a known solution
+
+    def __init__(self, options=None, path=None):
+        """
+        :param options: list of solver options, like `['-piv1']` for lp_solve or `['mip_rel_gap=0.01']` for HiGHS
+        :param path: path of the solver binary, for the solvers that call an external program
+        """
+        self.options = list(options or [])
+        self.path = path
+        self.optimal = None
+        # `True` when the result of the last solve is proven (optimal solution or no solution at all),
+        # only meaningful when a single model is solved at a time
+        self.infeasible = None
+        # `True` when the last solve proved that the model has no solution (an empty dict is also returned for
+        # solutions whose variables are all zero), only meaningful when a single model is solved at a time
+        self.timings = {}
+        # self.timings[phase] = cumulated duration (in seconds) of the phases measured by the solver itself
+        self.stopped = False
+        # `True` once :meth:`stop` has been called: the running solves return their best solution and the next ones
+        # are refused
+        self.lock = threading.Lock()
+
+    def add_timing(self, phase: str, duration: float):
+        with self.lock:
+            self.timings[phase] = self.timings.get(phase, 0.) + duration
+
+    def __getstate__(self):
+        # in-process solvers are sent to other processes by `solve_all`, but locks cannot be pickled
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @property
+    def configuration(self) -> str:
+        """Configuration of this solver, as accepted by :func:`get_backend`"""
+        name = '%s:%s' % (self.name, self.path) if self.path else self.name
+        return ' '.join([name] + self.options)
+
+    def winning_configurations(self) -> dict:
+        """Return the configurations that found the solutions, as `{configuration: number of solved models}`"""
+        return {self.configuration: 1}
+
+    def option_values(self) -> dict:
+        """Return the options written as `key=value`, values being converted to bool, int or float when possible"""
+        result = {}
+        for option in self.options:
+            key, sep, value = option.partition('=')
+            if not sep:
+                raise ImproperlyConfigured('Invalid option "%s" for the "%s" solver (key=value expected).' %
+                                           (option, self.name))
+            if value.lower() in ('true', 'false'):
+                value = value.lower() == 'true'
+            else:
+                for cast in (int, float):
+                    try:
+                        value = cast(value)
+                        break
+                    except ValueError:
+                        pass
+            result[key] = value
+        return result
+
+    def solve(self, model: LinearModel, verbose=False, max_compute_time=None, schedule_run=None, hint=None,
+              on_incumbent=None) -> dict:
+        """
+        :param model: the model to solve
+        :param verbose: print the model and the solver output to stdout
+        :param max_compute_time: max compute time (in seconds), `None` for no limit
+        :param schedule_run: a ScheduleRun object to update with its process id (must have its "id" attribute)
+        :param hint: a feasible solution `{variable_index: value}` (only non-zero values), used as a starting point
+          by the solvers that support it (see `supports_hint`)
+        :param on_incumbent: called with each improved solution `{variable_index: value}` found during the solve,
+          by the solvers that report them (possibly from another thread)
+        :raise subprocess.TimeoutExpired: when no solution has been found in the allowed time
+        """
+        raise NotImplementedError
+
+    def terminate(self):
+        """Stop all running solves (called from another thread)"""
+        pass
+
+    def stop(self):
+        """Stop the running solves and refuse the next ones, when the computation is cancelled by the user (called
+        from another thread)"""
+        self.stopped = True
+        self.terminate()
+
+
+class LpSolveOutputParser(object):
+    """Incremental parser of the standard output of lp_solve, given line by line as bytes.
+
+    Each block of "Actual values of the variables" is a solution. With the `-i` option, lp_solve prints a block for
+    each improved solution, before the final one. Zero values are skipped.
+    """
+
+    def __init__(self, on_solution=None, indices=None):
+        """
+        :param on_solution: called with the non-zero values and the objective value of each solution, as soon as it
+          is read
+        :param indices: index table `{variable name as bytes: variable index}`: values are then given as
+          `{variable_index: value}` instead of `{variable_name: value}`
+        """
+        self.on_solution = on_solution
+        self.indices = indices
+        self.values = {}
+        # non-zero values of the last solution
+        self.objective = None
+        self.solution_count = 0
+        self.current_values = None
+        # values of the block being read
+        self.infeasible = False
+        self.suboptimal = False
+
+    def feed(self, line: bytes):
+        if self.current_values is not None:
+            fields = line.split()
+            if len(fields) == 2:
+                try:
+                    value = float(fields[1])
+                except ValueError:
+                    value = 0.
+                if value:
+                    name = fields[0]
+                    self.current_values[self.indices[name] if self.indices is not None else name.decode()] = value
+                return
+            elif not fields:
+                return
+            self.end_solution()
+        if b'infeasible' in line:
+            self.infeasible = True
+        elif b'sub-optimal' in line:
+            self.suboptimal = True
+        elif line.startswith(b'Value of objective function:'):
+            try:
+                self.objective = float(line.partition(b':')[2])
+            except ValueError:
+                self.objective = None
+        elif line.startswith(b'Actual values of the variables'):
+            self.current_values = {}
+
+    def close(self):
+        """Called at the end of the output"""
+        if self.current_values is not None:
+            self.end_solution()
+
+    def end_solution(self):
+        self.values, self.current_values = self.current_values, None
+        self.solution_count += 1
+        if self.on_solution:
+            self.on_solution(self.values, self.objective)
+
+
+class LpSolveBackend(SolverBackend):
+    """Write the model in the LP format and call the `lp_solve` binary (`settings.LP_SOLVE_PATH`).
+
+    The model is streamed to the standard input of lp_solve while it is serialized. For debugging purposes, it is
+    written to a file in `settings.LP_SOLVE_MODEL_DIR` (and kept) when this setting is defined.
+    The output is read while lp_solve is running, so improved solutions are reported as soon as they are printed.
+    When the time limit is reached, the last improved solution is returned.
+    lp_solve is asked to print only the non-zero variables when it supports it (see :func:`lp_solve_nonzero_option`).
+    """
+    name = 'lp_solve'
+    chunk_size = 1000  # number of LP statements written at once
+
+    def __init__(self, options=None, path=None):
+        super().__init__(options=options, path=path)
+        self.processes = set()
+
+    def solve(self, model: LinearModel, verbose=False, max_compute_time=None, schedule_run=None, hint=None,
+              on_incumbent=None):
+        cmd = [self.path or settings.LP_SOLVE_PATH, '-lp'] + self.options
+        if max_compute_time:
+            cmd += ['-timeout', str(max_compute_time)]
+        if on_incumbent:
+            cmd += ['-i']
+        nonzero_option = lp_solve_nonzero_option(cmd[0])
+        if nonzero_option:
+            cmd += [nonzero_option]
+        start = time.perf_counter()
+        if settings.LP_SOLVE_MODEL_DIR:
+            with tempfile.NamedTemporaryFile(dir=settings.LP_SOLVE_MODEL_DIR, prefix='autoplanner-', suffix='.lp',
+                                             delete=False) as fd:
+                self.write_model(model, fd, verbose=verbose)
+            p = self.start_process(cmd + [fd.name], schedule_run)
+        else:
+            p = self.start_process(cmd, schedule_run, stdin=subprocess.PIPE)
+            try:
+                self.write_model(model, p.stdin, verbose=verbose)
+            except BrokenPipeError:  # lp_solve stopped reading the model, its error is on stderr
+                pass
+            p.stdin.close()
+        self.add_timing('write', time.perf_counter() - start)
+        indices = {model.name(index).encode(): index for index in range(model.variable_count)}
+        # index table of the variable names printed by lp_solve
+        on_solution = None
+        if on_incumbent:
+            def on_solution(values, objective):
+                on_incumbent(values)
+        parser = LpSolveOutputParser(on_solution=on_solution, indices=indices)
+        expired = threading.Event()
+        timer = None
+        if max_compute_time:
+            timer = threading.Timer(max_compute_time, self.kill, args=(p, expired))
+            timer.start()
+        std_err = []
+        std_err_reader = threading.Thread(target=lambda: std_err.append(p.stderr.read()))
+        std_err_reader.start()
+        parse_time = 0.
+        try:
+            for line in p.stdout:
+                start = time.perf_counter()
+                if verbose:
+                    print(line.decode(), end='')
+                parser.feed(line)
+                parse_time += time.perf_counter() - start
+            parser.close()
+            self.add_timing('parse', parse_time)
+            p.wait()
+            std_err_reader.join()
+        finally:
+            if timer:
+                timer.cancel()
+            with self.lock:
+                self.processes.discard(p)
+            if schedule_run:
+                ScheduleRun.objects.filter(pk=schedule_run.pk, process_id=p.pid).update(process_id=None)
+        if verbose:
+            print(b''.join(std_err).decode())
+        self.infeasible = parser.infeasible
+        if expired.is_set() or self.stopped or p.returncode < 0:  # time limit, stop or killed by `kill_schedule`
+            self.optimal = False
+            if not parser.values:
+                raise subprocess.TimeoutExpired(cmd, max_compute_time)
+        else:
+            self.optimal = parser.infeasible or (parser.solution_count > 0 and not parser.suboptimal)
+        return parser.values
+
+    @staticmethod
+    def kill(p, expired):
+        expired.set()
+        p.kill()
+
+    def start_process(self, cmd, schedule_run=None, stdin=None):
+        """Start lp_solve and store its process id on the ScheduleRun (the last one when several models are
+        solved in parallel)"""
+        with self.lock:
+            p = subprocess.Popen(cmd, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            self.processes.add(p)
+        if schedule_run:
+            ScheduleRun.objects.filter(pk=schedule_run.pk).update(process_id=p.pid)
+        return p
+
+    def terminate(self):
+        with self.lock:
+            for p in self.processes:
+                p.kill()
+
+    def write_model(self, model: LinearModel, fd, verbose=False):
+        """Write the model to a binary file object, by chunks of `chunk_size` statements"""
+        chunk = []
+        for statement in model.lp_statements():
+            if verbose:
+                print(statement)
+            chunk.append(statement)
+            if len(chunk) >= self.chunk_size:
+                fd.write((';\n'.join(chunk) + ';\n').encode())
+                chunk = []
+        if chunk:
+            fd.write((';\n'.join(chunk) + ';\n').encode())
+        fd.flush()
+
+    @staticmethod
+    def parse_output(std_out: bytes) -> dict:
+        """Extract the non-zero variables from the last "Actual values of the variables" block,
+        as a dict `{variable_name: value}`"""
+        parser = LpSolveOutputParser()
+        for line in std_out.splitlines():
+            parser.feed(line)
+        parser.close()
+        return parser.values
+
+
+@functools.lru_cache()
+def lp_solve_nonzero_option(path: str):
+    """Return the option of the lp_solve binary that prints only the non-zero values of the variables (`-ia`), or
+    `None` when this binary does not support it. The option is checked once by solving a tiny model."""
+    try:
+        p = subprocess.run([path, '-lp', '-ia'], input=b'max: x;\nc1: x + y <= 1;\n', stdout=subprocess.PIPE,
+                           stderr=subprocess.PIPE, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    lines = [line.split() for line in p.stdout.splitlines()]
+    if p.returncode == 0 and [b'x', b'1'] in lines and not any(line[:1] == [b'y'] for line in lines):
+        return '-ia'
+    return None
+
+
+class MilpBackend(SolverBackend):
+    """In-process solver, using the HiGHS MILP solver shipped with SciPy (`scipy.optimize.milp`).
+
+    No temporary file nor process is required: the model is directly given as numeric arrays.
+    A running solve cannot be interrupted: when the computation is stopped, it ends at its time limit.
+    """
+    name = 'milp'
+    in_process = True
+
+    def solve(self, model: LinearModel, verbose=False, max_compute_time=None, schedule_run=None, hint=None,
+              on_incumbent=None):
+        try:
+            import numpy
+            from scipy.optimize import milp, Bounds, LinearConstraint
+            from scipy.sparse import csr_matrix
+        except ImportError:
+            raise ImproperlyConfigured('The "%s" solver requires SciPy>=1.9 (pip install scipy).' % self.name)
+        variable_count = model.variable_count
+        self.optimal, self.infeasible = True, False
+        if variable_count == 0:
+            return {}
+        objective = numpy.zeros(variable_count)
+        for index, coefficient in model.objective.items():
+            objective[index] = coefficient
+        constraints = []
+        if model.row_count:
+            matrix = csr_matrix((numpy.frombuffer(model.coefficients, dtype=numpy.float64),
+                                 numpy.array(model.columns), numpy.array(model.row_starts)),
+                                shape=(model.row_count, variable_count))
+            senses = numpy.array(model.senses)
+            rhs = numpy.frombuffer(model.rhs, dtype=numpy.float64)
+            lower = numpy.where(senses == model.LE, -numpy.inf, rhs)
+            upper = numpy.where(senses == model.GE, numpy.inf, rhs)
+            constraints.append(LinearConstraint(matrix, lower, upper))
+        options = {'disp': verbose}
+        if max_compute_time:
+            options['time_limit'] = max_compute_time
+        options.update(self.option_values())
+        result = milp(objective, constraints=constraints, integrality=numpy.array(model.integers),
+                      bounds=Bounds(numpy.frombuffer(model.lower_bounds, dtype=numpy.float64),
+                                    numpy.frombuffer(model.upper_bounds, dtype=numpy.float64)),
+                      options=options)
+        self.optimal = result.status in (0, 2)  # optimal or infeasible
+        self.infeasible = result.status == 2
+        if result.x is None:
+            if result.status == 1:  # time limit reached without any feasible solution
+                raise subprocess.TimeoutExpired(self.name, max_compute_time)
+            return {}
+        return {index: value for (index, value) in enumerate(result.x) if round(value, 6)}
+
+
+class HighsBackend(SolverBackend):
+    """In-process solver, using the Python interface of HiGHS (`highspy`).
+    Unlike `scipy.optimize.milp`, it accepts a known solution as a starting point and reports improved solutions.
+    """
+    name = 'highs'
+    in_process = True
+    supports_hint = True
+
+    def __init__(self, options=None, path=None):
+        super().__init__(options=options, path=path)
+        self.running = set()
+
+    def solve(self, model: LinearModel, verbose=False, max_compute_time=None, schedule_run=None, hint=None,
+              on_incumbent=None):
+        try:
+            import numpy
+            import highspy
+        except ImportError:
+            raise ImproperlyConfigured('The "%s" solver requires highspy (pip install highspy).' % self.name)
+        variable_count = model.variable_count
+        self.optimal, self.infeasible = True, False
+        if variable_count == 0:
+            return {}
+        highs = highspy.Highs()
+        highs.setOptionValue('output_flag', bool(verbose))
+        if max_compute_time:
+            highs.setOptionValue('time_limit', float(max_compute_time))
+        for key, value in self.option_values().items():
+            highs.setOptionValue(key, value)
+        objective = numpy.zeros(variable_count)
+        for index, coefficient in model.objective.items():
+            objective[index] = coefficient
+        no_index = numpy.array([], dtype=numpy.int32)
+        highs.addCols(variable_count, objective, numpy.frombuffer(model.lower_bounds, dtype=numpy.float64),
+                      numpy.frombuffer(model.upper_bounds, dtype=numpy.float64), 0, no_index, no_index,
+                      numpy.array([], dtype=numpy.float64))
+        if model.row_count:
+            senses = numpy.array(model.senses)
+            rhs = numpy.frombuffer(model.rhs, dtype=numpy.float64)
+            highs.addRows(model.row_count, numpy.where(senses == model.LE, -highspy.kHighsInf, rhs),
+                          numpy.where(senses == model.GE, highspy.kHighsInf, rhs), model.nonzero_count,
+                          numpy.array(model.row_starts[:-1], dtype=numpy.int32),
+                          numpy.array(model.columns, dtype=numpy.int32),
+                          numpy.frombuffer(model.coefficients, dtype=numpy.float64))
+        highs.changeColsIntegrality(variable_count, numpy.arange(variable_count, dtype=numpy.int32),
+                                    numpy.array(model.integers, dtype=numpy.uint8))
+        if hint is not None:
+            solution = highspy.HighsSolution()
+            solution.col_value = [hint.get(index, 0.) for index in range(variable_count)]
+            solution.value_valid = True
+            highs.setSolution(solution)
+        if on_incumbent:
+            def on_improving_solution(callback_type, message, data_out, data_in, user_data):
+                on_incumbent({index: value for (index, value) in enumerate(data_out.mip_solution) if round(value, 6)})
+
+            highs.setCallback(on_improving_solution, None)
+            highs.startCallback(highspy.cb.HighsCallbackType.kCallbackMipImprovingSolution)
+        with self.lock:
+            self.running.add(highs)
+        try:
+            highs.run()
+        finally:
+            with self.lock:
+                self.running.discard(highs)
+        status = highs.getModelStatus()
+        self.infeasible = status == highspy.HighsModelStatus.kInfeasible
+        self.optimal = status in (highspy.HighsModelStatus.kOptimal, highspy.HighsModelStatus.kInfeasible)
+        if highs.getInfo().primal_solution_status != highspy.SolutionStatus.kSolutionStatusFeasible:
+            if status in (highspy.HighsModelStatus.kTimeLimit, highspy.HighsModelStatus.kInterrupt):
+                raise subprocess.TimeoutExpired(self.name, max_compute_time)
+            return {}
+        return {index: value for (index, value) in enumerate(highs.getSolution().col_value) if round(value, 6)}
+
+    def terminate(self):
+        with self.lock:
+            for highs in self.running:
+                highs.cancelSolve()
+
+
+class PortfolioBackend(SolverBackend):
+    """Race several solver configurations (`settings.SOLVER_PORTFOLIO`) on each model.
+
+    All configurations are started at once, in threads. The first proven result (optimal solution or infeasible
+    model) wins and the other solves are stopped; otherwise, the best solution found in the allowed time wins.
+    Only the incumbents improving the best one of all configurations are reported.
+    The winning configurations are counted in :attr:`winners` and only their timings are kept.
+    """
+    name = 'portfolio'
+    supports_hint = True
+
+    def __init__(self, options=None, path=None, configurations=None):
+        super().__init__(options=options, path=path)
+        self.configurations = list(configurations or settings.SOLVER_PORTFOLIO)
+        if not self.configurations:
+            raise ImproperlyConfigured('The "%s" solver requires at least one configuration.' % self.name)
+        for configuration in self.configurations:  # check the configurations before any solve
+            get_backend(configuration)
+        self.winners = {}
+        # self.winners[configuration] = number of models solved by this configuration
+        self.running = set()
+
+    def solve(self, model: LinearModel, verbose=False, max_compute_time=None, schedule_run=None, hint=None,
+              on_incumbent=None):
+        solvers = [get_backend(configuration) for configuration in self.configurations]
+        with self.lock:
+            self.running.update(solvers)
+            for solver in solvers:
+                solver.stopped = self.stopped
+        executor = ThreadPoolExecutor(max_workers=len(solvers))
+        incumbent_objective = []
+        # incumbent_objective = [objective value of the best incumbent reported by any configuration]
+
+        def on_solver_incumbent(values):
+            objective_ = model.objective_value(values)
+            with self.lock:
+                if incumbent_objective and objective_ >= incumbent_objective[0] - 1e-9:
+                    return
+                incumbent_objective[:] = [objective_]
+            on_incumbent(values)
+
+        futures = {executor.submit(solve_in_thread, solver, model, verbose=verbose, max_compute_time=max_compute_time,
+                                   schedule_run=schedule_run, hint=hint,
+                                   on_incumbent=on_solver_incumbent if on_incumbent else None): solver
+                   for solver in solvers}
+        pending = set(futures)
+        best, timeout, error = None, None, None
+        # best = (objective value, values, solver)
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    solver = futures[future]
+                    try:
+                        values = future.result()
+                    except subprocess.TimeoutExpired as e:
+                        timeout = e
+                        continue
+                    except Exception as e:  # a misconfigured solver must not stop the other ones
+                        error = e
+                        continue
+                    if model.row_count and not values and not solver.optimal:
+                        continue
+                    objective = model.objective_value(values)
+                    if best is None or objective < best[0] - 1e-9 or solver.optimal:
+                        best = (objective, values, solver)
+                    if solver.optimal:
+                        pending = set()
+                        break
+        finally:
+            for solver in solvers:
+                solver.terminate()
+            executor.shutdown(wait=False)
+            with self.lock:
+                self.running.difference_update(solvers)
+        if best is None:
+            if timeout is not None or error is not None:
+                raise timeout or error
+            self.optimal, self.infeasible = False, None
+            return {}
+        self.optimal, self.infeasible = best[2].optimal, best[2].infeasible
+        for phase, duration in best[2].timings.items():
+            self.add_timing(phase, duration)
+        with self.lock:
+            self.winners[best[2].configuration] = self.winners.get(best[2].configuration, 0) + 1
+        return best[1]
+
+    def winning_configurations(self) -> dict:
+        with self.lock:
+            return dict(self.winners)
+
+    def terminate(self):
+        with self.lock:
+            for solver in self.running:
+                solver.terminate()
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+            for solver in self.running:
+                solver.stop()
+
+
+backends = {LpSolveBackend.name: LpSolveBackend, MilpBackend.name: MilpBackend, HighsBackend.name: HighsBackend,
+            PortfolioBackend.name: PortfolioBackend}
+
+
+def get_backend(name: str=None) -> SolverBackend:
+    """Return a solver instance, given its configuration: its name (`"lp_solve"`, `"milp"`, `"highs"`, `"portfolio"`)
+    or the dotted path of its class, optionally followed by `:` and the path of the solver binary, then by
+    space-separated options (e.g. `"lp_solve:/opt/lp_solve/lp_solve -piv1"` or `"highs mip_rel_gap=0.01"`).
+    Use `settings.SOLVER_BACKEND` by default."""
+    name, *options = (name or settings.SOLVER_BACKEND).split()
+    name, __, path = name.partition(':')
+    if name in backends:
+        cls = backends[name]
+    else:
+        try:
+            cls = import_string(name)
+        except ImportError:
+            raise ImproperlyConfigured('Invalid solver backend "%s".' % name)
+    return cls(options=options, path=path or None)
+
+
+def solve_in_thread(solver: SolverBackend, model: LinearModel, **kwargs):
+    """Call `solver.solve` and close the database connection opened by this thread"""
+    try:
+        if solver.stopped:
+            raise subprocess.TimeoutExpired(solver.name, 0)
+        return solver.solve(model, **kwargs)
+    finally:
+        connections.close_all()
+
+
+def solve_all(solver: SolverBackend, models: list, verbose=False, max_compute_time=None, schedule_run=None,
+              max_workers=None, fallbacks=None, on_incumbent=None):
+    """Solve independent models in parallel, each one with the whole `max_compute_time` (the models solved one after
+    the other share this time).
+
+    Solvers running in external processes are called from threads, in-process solvers (like SciPy) from a pool of
+    processes (or sequentially when the current process is itself a daemon, like Celery workers).
+    Return the list of the solutions, or `None` as soon as one of the models has no solution: remaining solves are
+    then stopped.
+    :param max_workers: number of parallel solves (`settings.SOLVER_WORKERS`, or the number of CPUs by default)
+    :param fallbacks: `fallbacks[i]` is a known solution of `models[i]` (or `None`), given as hint to the solver and
+      used when the solver does not find any solution in the allowed time
+    :param on_incumbent: called with `(i, values)` for each improved solution of `models[i]` found during the solves
+      (not available when models are solved in separate processes)
+    When the solver is stopped (see :meth:`SolverBackend.stop`), the models without any solution are not solved and
+    their fallbacks are used.
+    :raise subprocess.TimeoutExpired: when no solution has been found for a model in the allowed time
+    """
+    max_workers = max_workers or settings.SOLVER_WORKERS or os.cpu_count() or 1
+    if solver.in_process and multiprocessing.current_process().daemon:
+        max_workers = 1
+    fallbacks = fallbacks or [None] * len(models)
+    results = [None] * len(models)
+    if solver.stopped:
+        if any(x is None for x in fallbacks):
+            raise subprocess.TimeoutExpired(solver.name, 0)
+        return list(fallbacks)
+
+    def get_result(model_index_, fn_, *args):
+        try:
+            values = fn_(*args)
+        except subprocess.TimeoutExpired:
+            if fallbacks[model_index_] is None:
+                raise
+            values = {}
+        if models[model_index_].row_count and not values:
+            return fallbacks[model_index_]
+        return values
+
+    def model_incumbent(model_index_):
+        return functools.partial(on_incumbent, model_index_) if on_incumbent else None
+
+    if len(models) <= 1 or max_workers <= 1:
+        deadline = None if not max_compute_time else time.perf_counter() + max_compute_time
+
+        def solve_before_deadline(model_index_):
+            remaining_time = None if deadline is None else deadline - time.perf_counter()
+            if solver.stopped or (remaining_time is not None and remaining_time <= 0):
+                raise subprocess.TimeoutExpired(solver.name, max_compute_time)
+            return solver.solve(models[model_index_], verbose, remaining_time, schedule_run, fallbacks[model_index_],
+                                model_incumbent(model_index_))
+
+        for model_index in range(len(models)):
+            results[model_index] = get_result(model_index, solve_before_deadline, model_index)
+            if results[model_index] is None:
+                return None
+        return results
+    if solver.in_process:
+        executor_cls, fn = ProcessPoolExecutor, solver.solve
+        on_incumbent = None  # callbacks cannot be sent to other processes
+    else:
+        executor_cls, fn = ThreadPoolExecutor, functools.partial(solve_in_thread, solver)
+    with executor_cls(max_workers=min(max_workers, len(models))) as executor:
+        futures = {executor.submit(fn, model, verbose=verbose, max_compute_time=max_compute_time,
+                                   schedule_run=schedule_run, hint=fallbacks[model_index],
+                                   on_incumbent=model_incumbent(model_index)): model_index
+                   for (model_index, model) in enumerate(models)}
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    model_index = futures[future]
+                    results[model_index] = get_result(model_index, future.result)
+                    if results[model_index] is None:
+                        return None
+        finally:
+            if pending:
+                for future in pending:
+                    future.cancel()
+                solver.terminate()
+    return results
+
+
+def is_feasible(solver: SolverBackend, model: LinearModel, max_compute_time=None):
+    """Return `True` if the model has a solution, `False` if it has none, or `None` if no solution has been found
+    in the allowed time"""
+    if not model.row_count:
+        return True
+    solver = copy.copy(solver)  # the status of the solve is stored on the solver, that may be shared by threads
+    try:
+        values = solver.solve(model, max_compute_time=max_compute_time)
+    except subprocess.TimeoutExpired:
+        return None
+    if solver.infeasible:
+        return False
+    elif values or solver.optimal:  # only non-zero values are returned
+        return True
+    return None
+
+
+def check_feasibility(solver: SolverBackend, models: list, max_compute_time=None, max_workers=None) -> list:
+    """Call :func:`is_feasible` on several models in parallel (in the same way as :func:`solve_all`), and return
+    the list of the results"""
+    max_workers = max_workers or settings.SOLVER_WORKERS or os.cpu_count() or 1
+    if solver.in_process and multiprocessing.current_process().daemon:
+        max_workers = 1
+    if len(models) <= 1 or max_workers <= 1:
+        return [is_feasible(solver, model, max_compute_time=max_compute_time) for model in models]
+    executor_cls = ProcessPoolExecutor if solver.in_process else ThreadPoolExecutor
+    with executor_cls(max_workers=min(max_workers, len(models))) as executor:
+        return list(executor.map(functools.partial(is_feasible, solver, max_compute_time=max_compute_time), models))
@@ -1,9 +1,15 @@
+import datetime
+import functools
 import json
 import os
 import signal
 import subprocess
+import threading
+import time
 
 import celery
+from django.conf import settings
+from django.db import connections
 from django.utils import timezone
 from django.utils.formats import date_format, time_format
 from django.utils.translation import ugettext_lazy as _
@@ -12,6 +18,8 @@ from djangofloor.signals.bootstrap3 import notify, SUCCESS, DANGER, INFO
 from djangofloor.signals.html import render_to_client, after, replace_with
 from djangofloor.wsgi.window_info import WindowInfo, render_to_string
 
+from autoplanner.diagnosis import Diagnosis, get_group_labels
+from autoplanner.heuristic import HeuristicSolver
 from autoplanner.models import Organization, Task, ScheduleRun, Agent
 from autoplanner.schedule import Scheduler
 
@@ -31,7 +39,13 @@ class SetJSONEncoder(json.JSONEncoder):
 
 
 @shared_task(serializer='json', bind=True)
-def compute_schedule(self, organization_id, window_info_data=None):
+def compute_schedule(self, organization_id, window_info_data=None, preview=False):
+    """Compute the schedule of an organization and apply it.
+
+    In preview mode, the schedule is only computed by the fast heuristic and is not applied.
+    Otherwise, the improved schedules found during the computation are saved on the ScheduleRun (and displayed), so
+    the best one can be applied before the end of the computation.
+    """
     window_info = None
     if window_info_data:
         window_info = WindowInfo.from_dict(window_info_data)
@@ -61,13 +75,58 @@ def compute_schedule(self, organization_id, window_info_data=None):
     scheduler = Scheduler(organization)
     level = SUCCESS
     try:
-        result_list = scheduler.solve(verbose=False, max_compute_time=organization.max_compute_time,
-                                      schedule_run=schedule_run)
+        horizon = (organization.horizon_length, organization.horizon_overlap) if organization.horizon_length else None
+        max_compute_time = organization.max_compute_time
+        previous_run = None
+        heuristic = None
+        hint = []
+        if preview:
+            heuristic_start = time.perf_counter()
+            heuristic = HeuristicSolver(scheduler)
+            result_list = heuristic.solve(max_compute_time=settings.PREVIEW_COMPUTE_TIME)
+            if not heuristic.is_valid:
+                result_list = []
+            scheduler.add_timing('heuristic', heuristic_start)
+        else:
+            fingerprint = scheduler.get_fingerprint(horizon, max_compute_time, settings.SOLVER_BACKEND,
+                                                    settings.SOLVER_PORTFOLIO, settings.LAZY_CONSTRAINTS)
+            ScheduleRun.objects.filter(pk=schedule_run.pk).update(fingerprint=fingerprint)
+            if settings.REUSE_IDENTICAL_SCHEDULES:
+                previous_run = get_identical_run(schedule_run, fingerprint, max_compute_time)
+        if previous_run:
+            result_list = scheduler.result_from_json(previous_run.result_dict)
+        elif not preview:
+            hint = scheduler.get_previous_schedule()
+            on_incumbent = functools.partial(save_incumbent, scheduler, schedule_run, organization, window_info)
+            finished = threading.Event()
+            watcher = threading.Thread(target=watch_cancellation, args=(scheduler, schedule_run.pk, finished))
+            watcher.start()
+            try:
+                if horizon:
+                    result_list = scheduler.solve_rolling_horizon(
+                        datetime.timedelta(days=organization.horizon_length),
+                        datetime.timedelta(days=organization.horizon_overlap), verbose=False,
+                        max_compute_time=max_compute_time, schedule_run=schedule_run,
+                        hint=hint or get_heuristic_schedule(scheduler), on_incumbent=on_incumbent)
+                else:
+                    result_list = scheduler.solve(verbose=False, max_compute_time=max_compute_time,
+                                                  schedule_run=schedule_run,
+                                                  hint=hint or get_heuristic_schedule(scheduler),
+                                                  on_incumbent=on_incumbent)
+            finally:
+                finished.set()
+                watcher.join()
+        stopped = scheduler.stop_event.is_set()
+        # hint_accepted is only displayed for the previous schedule, not for the heuristic one
+        hint_accepted = scheduler.hint_accepted if hint else None
         result_dict = scheduler.result_by_agent(result_list)
         end = timezone.localtime(timezone.now())
-        selected = bool(result_dict)
-        if selected:
-            apply_schedule(organization_id, result_dict)
+        selected = bool(result_dict) and not preview and not stopped
+        if result_dict:
+            if selected:
+                apply_start = time.perf_counter()
+                apply_schedule(organization_id, result_dict)
+                scheduler.add_timing('apply', apply_start)
             msg = _('Computation finished at %(d)s, %(t)s') % {'d': date_format(end, use_l10n=True),
                                                                't': time_format(end, use_l10n=True)}
             balancing = scheduler.compute_balancing(result_list)
@@ -76,25 +135,65 @@ def compute_schedule(self, organization_id, window_info_data=None):
                 schedule_msg = _('Balancing: %(b)s') % {'b': balances}
             else:
                 schedule_msg = _('No balance required.')
-            ScheduleRun.objects.filter(organization__id=organization_id).update(is_selected=False)
+            if scheduler.exceeded_limits:
+                schedule_msg = '%s %s' % (schedule_msg, get_exceeded_limits_message(scheduler))
+            if previous_run:
+                schedule_msg = '%s %s' % (schedule_msg, _('Same schedule as the computation of %(d)s.') %
+                                          {'d': previous_run})
+            if preview:
+                schedule_msg = '%s %s' % (_('Preview (not optimized).'), schedule_msg)
+            elif stopped:
+                msg = _('Computation stopped at %(d)s, %(t)s') % {'d': date_format(end, use_l10n=True),
+                                                                  't': time_format(end, use_l10n=True)}
+                schedule_msg = '%s %s' % (_('Stopped by the user (not applied).'), schedule_msg)
+                level = INFO
+            else:
+                ScheduleRun.objects.filter(organization__id=organization_id).update(is_selected=False)
+        elif stopped:
+            msg = _('Computation stopped at %(d)s, %(t)s') % {'d': date_format(end, use_l10n=True),
+                                                              't': time_format(end, use_l10n=True)}
+            schedule_msg = _('Stopped by the user (not applied).')
+            level = INFO
+        elif preview:
+            schedule_msg = _('Unable to find a preview satisfying all constraints (%(f)s).') % \
+                {'f': ', '.join(sorted(heuristic.violations))}
+            msg = _('Preview finished at %(d)s, %(t)s') % {'d': date_format(end, use_l10n=True),
+                                                           't': time_format(end, use_l10n=True)}
+            level = INFO
         else:
-            schedule_msg = _('Unable to find a solution')
+            schedule_msg = get_diagnosis_message(scheduler)
+            end = timezone.localtime(timezone.now())
             msg = _('Unable to find a solution, maybe you should remove some constraints or relax the balancing values.'
                     ' Computation finished at %(d)s, %(t)s') % {'d': date_format(end, use_l10n=True),
                                                                 't': time_format(end, use_l10n=True)}
             level = DANGER
         serialized_result_dict = json.dumps(result_dict, cls=SetJSONEncoder)
-        Organization.objects.filter(pk=organization_id).update(current_schedule_id=schedule_run.pk)
-        ScheduleRun.objects.filter(pk=schedule_run.pk).update(celery_end=end, process_id=None, status=bool(result_dict),
+        if stopped and not result_dict:  # the best schedule saved by `save_incumbent` is kept
+            serialized_result_dict = schedule_run.result_dict
+        if not preview and not stopped:
+            Organization.objects.filter(pk=organization_id).update(current_schedule_id=schedule_run.pk)
+        ScheduleRun.objects.filter(pk=schedule_run.pk).update(celery_end=end, process_id=None,
+                                                              status=bool(result_dict) and not stopped,
                                                               result_dict=serialized_result_dict, is_selected=selected,
-                                                              message=schedule_msg)
+                                                              message=schedule_msg, hint_accepted=hint_accepted,
+                                                              solver_configuration=scheduler.get_solver_configuration(),
+                                                              timings=json.dumps(scheduler.timings),
+                                                              family_counts=json.dumps(scheduler.family_counts))
     except subprocess.TimeoutExpired:
         end = timezone.localtime(timezone.now())
-        msg = _('%(d)s, %(t)s: Unable to find a schedule in the allowed time.') % \
-            {'d': date_format(end, use_l10n=True), 't': time_format(end, use_l10n=True)}
-        schedule_msg = _('Max computation time reached.')
+        if scheduler.stop_event.is_set():
+            msg = _('Computation stopped at %(d)s, %(t)s') % {'d': date_format(end, use_l10n=True),
+                                                              't': time_format(end, use_l10n=True)}
+            schedule_msg = _('Stopped by the user (not applied).')
+        else:
+            msg = _('%(d)s, %(t)s: Unable to find a schedule in the allowed time.') % \
+                {'d': date_format(end, use_l10n=True), 't': time_format(end, use_l10n=True)}
+            schedule_msg = _('Max computation time reached.')
         ScheduleRun.objects.filter(pk=schedule_run.pk).update(celery_end=end, process_id=None, status=False,
-                                                              message=schedule_msg)
+                                                              message=schedule_msg,
+                                                              hint_accepted=scheduler.hint_accepted,
+                                                              timings=json.dumps(scheduler.timings),
+                                                              family_counts=json.dumps(scheduler.family_counts))
         level = DANGER
     except Exception as e:
         end = timezone.localtime(timezone.now())
@@ -112,11 +211,91 @@ def compute_schedule(self, organization_id, window_info_data=None):
         organization.celery_task_id = None
         render_to_client(window_info, 'autoplanner/include/schedule_status.html', {'organization': organization},
                          '#schedule_status', to=[organization])
+        schedule_run.refresh_from_db()
         content_str = render_to_string('autoplanner/include/schedule.html',
                                        context={'obj': schedule_run, 'organization': organization})
         replace_with(window_info, '#schedule_%s' % schedule_run.id, content_str)
 
 
+def watch_cancellation(scheduler: Scheduler, schedule_run_pk: int, finished: threading.Event, interval=1.):
+    """Stop the scheduler as soon as the computation is cancelled by :func:`kill_schedule`, until `finished` is set
+    (run in a separate thread)"""
+    try:
+        while not finished.wait(interval):
+            if ScheduleRun.objects.filter(pk=schedule_run_pk, cancelled=True).exists():
+                scheduler.stop()
+                return
+    finally:
+        connections.close_all()
+
+
+def get_identical_run(schedule_run: ScheduleRun, fingerprint: str, max_compute_time):
+    """Return the last successful computation with the same fingerprint that ended before its max compute time, or
+    `None`. The schedule of a computation stopped by the time limit may not be optimal, so it is never reused."""
+    for previous_run in ScheduleRun.objects.filter(organization__id=schedule_run.organization_id,
+                                                   fingerprint=fingerprint, status=True) \
+            .exclude(pk=schedule_run.pk).exclude(result_dict=None).exclude(celery_start=None) \
+            .exclude(celery_end=None).order_by('-celery_end'):
+        duration = (previous_run.celery_end - previous_run.celery_start).total_seconds()
+        if not max_compute_time or duration < max_compute_time:
+            return previous_run
+    return None
+
+
+def save_incumbent(scheduler: Scheduler, schedule_run: ScheduleRun, organization: Organization, window_info,
+                   result_list, objective):
+    """Save an improved schedule found during the computation and display it"""
+    schedule_run.result_dict = json.dumps(scheduler.result_by_agent(result_list), cls=SetJSONEncoder)
+    schedule_run.message = _('Best schedule found so far (objective: %(o)g).') % {'o': objective}
+    ScheduleRun.objects.filter(pk=schedule_run.pk, status=None).update(result_dict=schedule_run.result_dict,
+                                                                       message=schedule_run.message)
+    if window_info:
+        notify(window_info, content=str(schedule_run.message), to=[organization], level=INFO)
+        content_str = render_to_string('autoplanner/include/schedule.html',
+                                       context={'obj': schedule_run, 'organization': organization})
+        replace_with(window_info, '#schedule_%s' % schedule_run.id, content_str)
+
+
+def get_diagnosis_message(scheduler: Scheduler):
+    """Return a message describing why there is no schedule (see :class:`autoplanner.diagnosis.Diagnosis`)"""
+    conflict = None
+    if settings.DIAGNOSIS_COMPUTE_TIME:
+        start = time.perf_counter()
+        conflict = Diagnosis(scheduler, max_compute_time=settings.DIAGNOSIS_COMPUTE_TIME).run()
+        scheduler.add_timing('diagnosis', start)
+    if conflict:
+        return _('Unable to find a solution: these constraints cannot be satisfied together: %(c)s.') % \
+            {'c': ', '.join(conflict)}
+    elif conflict is not None:
+        return _('Unable to find a solution, even without balancing, max affectations, fixed tasks and availabilities:'
+                 ' there are not enough resources for simultaneous tasks.')
+    return _('Unable to find a solution')
+
+
+def get_exceeded_limits_message(scheduler: Scheduler):
+    """Return a message describing the limits exceeded by the last schedule, in elastic mode"""
+    excesses = []
+    for group, label in get_group_labels(scheduler).items():
+        excess = scheduler.exceeded_limits.get(group)
+        if excess is None:
+            continue
+        elif scheduler.limit_is_duration(group):
+            excess = datetime.timedelta(seconds=round(excess))
+        else:
+            excess = '%g' % excess
+        excesses.append('%s (+%s)' % (label, excess))
+    return _('Exceeded limits: %(l)s.') % {'l': ', '.join(excesses)}
+
+
+def get_heuristic_schedule(scheduler: Scheduler):
+    """Return a valid schedule found by the fast heuristic, as a list of (agent_pk, task_pk), or an empty list"""
+    start = time.perf_counter()
+    heuristic = HeuristicSolver(scheduler)
+    result_list = heuristic.solve(max_compute_time=settings.PREVIEW_COMPUTE_TIME)
+    scheduler.add_timing('heuristic', start)
+    return result_list if heuristic.is_valid else []
+
+
 def apply_schedule(organization_id, result_dict):
     """Update all tasks to set the right agent"""
     available_agent_ids = {x[0] for x in Agent.objects.filter(organization__id=organization_id).values_list('id')}
@@ -150,6 +329,8 @@ def kill_schedule(self, celery_task_id, window_info_data=None):
     # noinspection PyUnusedLocal
     self = self
     app.control.revoke(celery_task_id)
+    # the running computation keeps its best schedule and stops (see `watch_cancellation`)
+    ScheduleRun.objects.filter(celery_task_id=celery_task_id).update(cancelled=True)
     all_process_ids = []
     for values in ScheduleRun.objects.filter(celery_task_id=celery_task_id).values_list('process_id'):
         if values[0]:
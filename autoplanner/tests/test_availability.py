@@ -0,0 +1,30 @@
+from django.test import TestCase
+
+from autoplanner.availability import AvailabilityIndex, is_available
+
+__author__ = 'Matthieu Gallet'
+
+
+class TestAvailability(TestCase):
+    agents = [(1, None, None), (2, 10, None), (3, None, 20), (4, 5, 30), (5, 8, 25)]
+
+    def test_unavailable_agents(self):
+        index = AvailabilityIndex(self.agents)
+        self.assertEqual({2, 3}, index.unavailable_agents(8, 25))
+        self.assertEqual(set(), index.unavailable_agents(10, 20))
+        self.assertEqual({2, 4, 5}, index.unavailable_agents(0, 15))
+        self.assertEqual({3, 4, 5}, index.unavailable_agents(15, 35))
+
+    def test_is_available(self):
+        index = AvailabilityIndex(self.agents)
+        for start, end in ((8, 25), (10, 20), (0, 15), (15, 35), (25, 26), (0, 40)):
+            unavailable = {agent_pk for (agent_pk, start_time, end_time) in self.agents
+                           if not is_available(start_time, end_time, start, end)}
+            self.assertEqual(unavailable, index.unavailable_agents(start, end))
+
+    def test_bounds(self):
+        # an agent leaving exactly at the end of a task (or arriving exactly at its start) is available
+        self.assertTrue(is_available(8, 25, 8, 25))
+        self.assertFalse(is_available(8, 25, 7, 25))
+        self.assertFalse(is_available(8, 25, 8, 26))
+        self.assertTrue(is_available(None, None, 0, 40))
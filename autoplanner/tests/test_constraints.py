@@ -1,13 +1,39 @@
 import datetime
+import subprocess
+from unittest import mock
 from django.test import TestCase
 from django.utils.timezone import utc
-from autoplanner.models import Organization, Agent, Category, Task
-from autoplanner.schedule import Scheduler
+from autoplanner.models import Organization, Agent, Category, Task, ScheduleRun, MaxTaskAffectation, \
+    AgentCategoryPreferences, MaxTimeTaskAffectation, MaxAffectation
+from autoplanner.schedule import Scheduler, sliding_windows
+from autoplanner.solvers import MilpBackend
 
 __author__ = 'Matthieu Gallet'
 
 
 class BaseTest(TestCase):
+    @staticmethod
+    def get_time(hours, minutes=0):
+        return datetime.datetime(2016, 1, 1, 0, 0, 0, tzinfo=utc) + datetime.timedelta(hours=hours, minutes=minutes)
+
+    @staticmethod
+    def create_organization(agent_count=2, categories=({}, ), **kwargs):
+        """Return a new organization (`kwargs` are its fields), with `agent_count` agents and a category for each
+        dict of fields in `categories`, as `(organization, [agents], [categories])`"""
+        org = Organization.objects.create(name='O', **kwargs)
+        agents = [Agent.objects.create(organization=org, name='A%d' % i) for i in range(agent_count)]
+        categories = [Category.objects.create(organization=org, name='C%d' % (i + 1), **fields)
+                      for (i, fields) in enumerate(categories)]
+        return org, agents, categories
+
+    def create_task(self, org, name, start, end, categories, **kwargs):
+        """Create a task from hour `start` to hour `end` (or datetimes)"""
+        if not isinstance(start, datetime.datetime):
+            start, end = self.get_time(start), self.get_time(end)
+        task = Task.objects.create(organization=org, name=name, start_time=start, end_time=end, **kwargs)
+        task.categories.set(categories)
+        return task
+
     def get_organization(self):
         org = Organization(name='O')
         org.save()
@@ -32,9 +58,6 @@ class TestSimple(BaseTest):
         s = Scheduler(org)
         self.assertEqual(['min:'], [str(x) for x in s.constraints()])
 
-    def get_time(self, value):
-        return datetime.datetime(2016, 1, 1, value, 0, 0, tzinfo=utc)
-
     def test_single(self):
         org = self.get_organization()
         category_1 = org.category_set.get(name='C1')
@@ -168,3 +191,371 @@ class TestSimple(BaseTest):
         result_list = s.solve(verbose=False)
         result_dict = s.result_by_agent(result_list)
         self.assertEqual({}, result_dict)
+
+
+class TestEstimate(BaseTest):
+    def test_predict(self):
+        org, agents, categories = self.create_organization()
+        for i in range(4):
+            self.create_task(org, 'E%d' % i, i // 2, i // 2 + 1, categories)
+        scheduler = Scheduler(org)
+        statistics = scheduler.get_statistics()
+        self.assertEqual((8, {'all_tasks': 4, 'single_task': 4}),
+                         (statistics['variables'], statistics['constraints']))
+        self.assertIsNone(scheduler.predict_compute_time())
+        for duration, constraint_count in ((10, 8), (30, 4), (1000, 16)):
+            ScheduleRun.objects.create(organization=org, status=True, celery_start=self.get_time(0),
+                                       celery_end=self.get_time(0) + datetime.timedelta(seconds=duration),
+                                       timings='{"solve": 1.0}', family_counts='{"all_tasks": %d}' % constraint_count)
+        ScheduleRun.objects.create(organization=org, status=True, celery_start=self.get_time(0),
+                                   celery_end=self.get_time(1), timings='{"heuristic": 1.0}', family_counts='{}')
+        self.assertEqual(60., scheduler.predict_compute_time())
+        self.assertEqual(120, scheduler.suggest_max_compute_time(60.))
+
+
+class TestElastic(BaseTest):
+    def test_exceeded_limits(self):
+        org, agents, (category, ) = self.create_organization(
+            categories=[{'balancing_mode': Category.BALANCE_NUMBER, 'balancing_tolerance': 0}])
+        for i in range(3):
+            self.create_task(org, 'E%d' % i, i, i + 1, [category])
+        MaxTaskAffectation.objects.create(organization=org, category=category, task_maximum_count=1,
+                                          range_time_slice_days=1)
+        self.assertEqual([], Scheduler(org).solve(backend='milp'))
+        org.elastic_constraints = True
+        for formulation in (Organization.BALANCING_PAIRWISE, Organization.BALANCING_RANGE):
+            org.balancing_formulation = formulation
+            scheduler = Scheduler(org)
+            self.assertEqual(3, len(scheduler.solve(backend='milp')))
+            self.assertEqual({('balancing', category.pk): 1., ('max_affectation', category.pk, 0): 1.},
+                             scheduler.exceeded_limits)
+
+    def test_small_excess(self):
+        org, agents, (category, ) = self.create_organization(
+            categories=[{'balancing_mode': Category.BALANCE_TIME, 'balancing_tolerance': 110}],
+            elastic_constraints=True)
+        AgentCategoryPreferences.objects.create(organization=org, agent=agents[0], category=category, affinity=10)
+        tasks = []
+        for i, minutes in enumerate((61, 60, 1)):
+            tasks.append(self.create_task(org, 'E%d' % i, self.get_time(2 * i), self.get_time(2 * i, minutes),
+                                          [category], agent=agents[0] if i == 0 else None, fixed=i == 0))
+        # giving E2 to A0 exceeds the tolerance by 10 seconds (a sixth of the time unit) and increases the affinity,
+        # but a schedule without excess exists
+        scheduler = Scheduler(org)
+        self.assertEqual(60., scheduler.time_unit)
+        result_list = scheduler.solve(backend='milp')
+        self.assertEqual({}, scheduler.exceeded_limits)
+        self.assertEqual({agents[0].pk: {tasks[0].pk}, agents[1].pk: {tasks[1].pk, tasks[2].pk}},
+                         {agent_pk: set(task_pks) for (agent_pk, task_pks)
+                          in scheduler.result_by_agent(result_list).items()})
+
+
+class TestAgentPools(BaseTest):
+    def test_pools(self):
+        org, agents, categories = self.create_organization(agent_count=4)
+        Agent.objects.filter(pk=agents[3].pk).update(start_time=self.get_time(1))
+        for i in range(6):
+            self.create_task(org, 'E%d' % i, i // 3, i // 3 + 1, categories)
+        scheduler = Scheduler(org)
+        self.assertEqual([[agents[0].pk, agents[1].pk, agents[2].pk]], scheduler.get_agent_pools())
+        result_list = scheduler.solve(backend='milp')
+        self.assertEqual(6, len(result_list))
+        tasks_by_hour = {}
+        for agent_pk, task_pk in result_list:
+            tasks_by_hour.setdefault(Task.objects.get(pk=task_pk).start_time, set()).add(agent_pk)
+        self.assertEqual([3, 3], [len(x) for x in tasks_by_hour.values()])
+        # the constraints of the aggregated model are counted when the complete model is not built
+        self.assertEqual(2, scheduler.family_counts['all_tasks'])
+
+    def test_split(self):
+        org, agents, (category_1, category_2) = self.create_organization(categories=({}, {}))
+        for name, start, categories in (('E1', 0, [category_1]), ('E2', 0, [category_2]),
+                                        ('E3', 1, [category_1, category_2])):
+            self.create_task(org, name, start, start + 2, categories)
+        scheduler = Scheduler(org)
+        pools = scheduler.get_agent_pools()
+        self.assertEqual([[agents[0].pk, agents[1].pk]], pools)
+        result_list = scheduler.aggregate_agents(pools).solve(backend='milp')
+        self.assertEqual(3, len(result_list))
+        self.assertIsNone(scheduler.split_pools(result_list, pools))
+        # the complete model is solved when the aggregated schedule cannot be split
+        result_dict = scheduler.result_by_agent(scheduler.solve(backend='milp'))
+        self.assertEqual([1, 2], sorted(len(x) for x in result_dict.values()))
+
+
+class TestTaskClasses(BaseTest):
+    def test_classes(self):
+        org, agents, (category, ) = self.create_organization(agent_count=3)
+        for i, agent in enumerate(agents):
+            AgentCategoryPreferences.objects.create(organization=org, agent=agent, category=category, affinity=i)
+        tasks = [self.create_task(org, 'E%d' % i, i // 3, i // 3 + 1, [category]) for i in range(5)]
+        scheduler = Scheduler(org)
+        classes = scheduler.get_task_classes()
+        self.assertEqual([[x.pk for x in tasks[:3]], [x.pk for x in tasks[3:]]],
+                         sorted(classes, key=lambda x: x[0]))
+        self.assertEqual([], scheduler.get_agent_pools())
+        self.assertEqual(6, scheduler.aggregate_tasks(classes).get_model().variable_count)
+        result_list = scheduler.solve(backend='milp')
+        self.assertEqual(sorted(x.pk for x in tasks), sorted(x[1] for x in result_list))
+        self.assertEqual({agents[1].pk: 2, agents[2].pk: 2, agents[0].pk: 1},
+                         {agent_pk: len(task_pks) for (agent_pk, task_pks)
+                          in scheduler.result_by_agent(result_list).items()})
+        # a hint is accepted for the classes of tasks
+        scheduler = Scheduler(org)
+        scheduler.solve(backend='milp', hint=result_list)
+        self.assertTrue(scheduler.hint_accepted)
+
+
+class TestTimeUnit(BaseTest):
+    def test_scaling(self):
+        org, agents, (category, ) = self.create_organization(
+            categories=[{'balancing_mode': Category.BALANCE_TIME, 'balancing_tolerance': 1800}])
+        for i, (start, end) in enumerate(((0, 60), (60, 180), (180, 270))):
+            self.create_task(org, 'E%d' % i, self.get_time(0, start), self.get_time(0, end), [category])
+        scheduler = Scheduler(org)
+        self.assertEqual(1800., scheduler.time_unit)
+        self.assertEqual(4., max(abs(x) for x in scheduler.get_model().coefficients))
+        result_list = scheduler.solve(backend='milp')
+        self.assertEqual([1, 2], sorted(len(x) for x in scheduler.result_by_agent(result_list).values()))
+        self.assertEqual(1800., scheduler.compute_balancing(result_list)[category.pk][2])
+
+
+class TestLazy(BaseTest):
+    def test_lazy(self):
+        org, agents, (category, ) = self.create_organization(
+            categories=[{'balancing_mode': Category.BALANCE_NUMBER, 'balancing_tolerance': 0}])
+        AgentCategoryPreferences.objects.create(organization=org, agent=agents[0], category=category, affinity=1)
+        for i in range(4):
+            self.create_task(org, 'E%d' % i, i, i + 1, [category])
+        MaxTaskAffectation.objects.create(organization=org, category=category, task_maximum_count=1,
+                                          range_time_slice_days=0, range_time_slice_hours=2)
+        tasks = list(org.task_set.order_by('start_time'))
+        for lazy in (False, True):
+            result_dict = Scheduler.result_by_agent(Scheduler(org).solve(backend='milp', lazy=lazy))
+            # at most one task every two hours: tasks alternate between agents
+            self.assertEqual(sorted([{tasks[0].pk, tasks[2].pk}, {tasks[1].pk, tasks[3].pk}], key=min),
+                             sorted(result_dict.values(), key=min))
+
+
+class TestMaxAffectations(BaseTest):
+    def get_result(self, org, agents):
+        result_dict = Scheduler.result_by_agent(Scheduler(org).solve(backend='milp'))
+        return [set(Task.objects.get(pk=x).name for x in result_dict.get(agent.pk, [])) for agent in agents]
+
+    def test_windows(self):
+        org, agents, (category, ) = self.create_organization(
+            categories=[{'balancing_mode': Category.BALANCE_NUMBER, 'balancing_tolerance': 0}])
+        for i in range(4):
+            self.create_task(org, 'E%d' % i, i, i + 1, [category])
+        MaxTaskAffectation.objects.create(organization=org, category=category, task_maximum_count=1,
+                                          range_time_slice_days=0, range_time_slice_hours=2)
+        MaxTimeTaskAffectation.objects.create(organization=org, category=category, task_maximum_time_days=0,
+                                              task_maximum_time_hours=1, range_time_slice_days=0,
+                                              range_time_slice_hours=2)
+        MaxTaskAffectation.objects.create(organization=org, category=category, task_maximum_count=2,
+                                          range_time_slice_days=0, range_time_slice_hours=3)
+        with mock.patch('autoplanner.schedule.sliding_windows', wraps=sliding_windows) as windows:
+            statistics = Scheduler(org).get_statistics()
+        # the windows are computed once for both two-hour rules
+        self.assertEqual(2, windows.call_count)
+        # the last window of each period length is a subset of the previous one: 2 agents * (3 + 3 + 2) windows
+        self.assertEqual(16, statistics['constraints']['max_affectations'])
+        self.assertEqual([{'E0', 'E2'}, {'E1', 'E3'}], sorted(self.get_result(org, agents), key=sorted))
+
+    def test_time(self):
+        org, agents, (category, ) = self.create_organization()
+        for i, (start, end) in enumerate(((0, 2), (2, 3), (3, 4))):
+            self.create_task(org, 'E%d' % i, start, end, [category])
+        for agent in agents:  # both agents would like to perform all tasks
+            AgentCategoryPreferences.objects.create(organization=org, agent=agent, category=category, affinity=1)
+        MaxTimeTaskAffectation.objects.create(organization=org, category=category, task_maximum_time_days=0,
+                                              task_maximum_time_hours=2, range_time_slice_days=0,
+                                              range_time_slice_hours=4)
+        self.assertEqual(2, Scheduler(org).get_statistics()['constraints']['max_affectations'])
+        self.assertEqual([{'E0'}, {'E1', 'E2'}], sorted(self.get_result(org, agents), key=len))
+
+    def test_minimum(self):
+        org, agents, (category, ) = self.create_organization()
+        AgentCategoryPreferences.objects.create(organization=org, agent=agents[0], category=category, affinity=1)
+        for name, start in (('E0', 0), ('E1', 1), ('E2', 2), ('E3', 2)):
+            self.create_task(org, name, start, start + 1, [category])
+        MaxTaskAffectation.objects.create(organization=org, category=category, task_maximum_count=1,
+                                          range_time_slice_days=0, range_time_slice_hours=2,
+                                          mode=MaxAffectation.MINIMUM)
+        # the window beginning at E1 contains the last one: 2 agents * 2 windows
+        self.assertEqual(4, Scheduler(org).get_statistics()['constraints']['max_affectations'])
+        for task_names in self.get_result(org, agents):
+            self.assertEqual(2, len(task_names))
+            self.assertEqual(1, len(task_names & {'E0', 'E1'}))
+
+
+class TestSingleTask(BaseTest):
+    def test_overlapping_sets(self):
+        org, agents, (category, ) = self.create_organization(agent_count=4)
+        Agent.objects.filter(pk=agents[3].pk).update(end_time=self.get_time(5))
+        tasks = [self.create_task(org, 'E%d' % i, i, i + 2, [category]) for i in range(10)]
+        tasks += [self.create_task(org, 'F%d' % i, 12, 13, [category]) for i in range(3)]
+        scheduler = Scheduler(org)
+        model = scheduler.get_model()
+        # 10 maximal sets of overlapping tasks ({Ei, Ei+1} and {F0, F1, F2}) for the three agents, and the 3 sets
+        # among E0 to E3 for the agent leaving at 5
+        self.assertEqual(33, scheduler.family_counts['single_task'])
+        available_task_pks = {task.pk for task in tasks[:4]}
+        for row_index in range(model.row_count):
+            if model.families[model.row_families[row_index]] != 'single_task':
+                continue
+            for column in model.row(row_index)[0]:
+                __, agent_pk, task_pk = model.keys[column]
+                self.assertTrue(agent_pk != agents[3].pk or task_pk in available_task_pks)
+        result_dict = scheduler.result_by_agent(scheduler.solve(backend='milp'))
+        self.assertEqual(len(tasks), sum(len(x) for x in result_dict.values()))
+        task_times = {task.pk: (task.start_time, task.end_time) for task in tasks}
+        for task_pks in result_dict.values():
+            times = sorted(task_times[x] for x in task_pks)
+            self.assertTrue(all(x[1] <= y[0] for (x, y) in zip(times, times[1:])))
+
+
+class TimeoutBackend(MilpBackend):
+    """Record the allowed time of each solve, and time out when completing a hint"""
+    compute_times = []
+
+    def solve(self, model, verbose=False, max_compute_time=None, schedule_run=None, hint=None, on_incumbent=None):
+        self.compute_times.append(max_compute_time)
+        if len(self.compute_times) == 1:
+            raise subprocess.TimeoutExpired(self.name, max_compute_time)
+        return super().solve(model, verbose=verbose, max_compute_time=max_compute_time, schedule_run=schedule_run,
+                             hint=hint, on_incumbent=on_incumbent)
+
+
+class StopBackend(MilpBackend):
+    """Stop the scheduler during the first solve, as if the user had cancelled the computation"""
+    scheduler = None
+    calls = 0
+
+    def solve(self, model, verbose=False, max_compute_time=None, schedule_run=None, hint=None, on_incumbent=None):
+        StopBackend.calls += 1
+        values = super().solve(model, verbose=verbose, max_compute_time=max_compute_time, schedule_run=schedule_run,
+                               hint=hint, on_incumbent=on_incumbent)
+        self.scheduler.stop()
+        self.optimal = False  # interrupted solve
+        return values
+
+
+class TestStop(BaseTest):
+    def test_stop(self):
+        org, agents, (category, ) = self.create_organization(
+            categories=[{'balancing_mode': Category.BALANCE_NUMBER, 'balancing_tolerance': 0}], elastic_constraints=True)
+        AgentCategoryPreferences.objects.create(organization=org, agent=agents[0], category=category, affinity=1)
+        for i in range(4):
+            self.create_task(org, 'E%d' % i, i, i + 1, [category])
+        scheduler = Scheduler(org)
+        StopBackend.scheduler, StopBackend.calls = scheduler, 0
+        result_list = scheduler.solve(backend='autoplanner.tests.test_constraints.StopBackend')
+        # the first solution of the elastic mode is returned: the solve of the affinity is not started
+        self.assertEqual(4, len(result_list))
+        self.assertEqual(1, StopBackend.calls)
+        self.assertTrue(scheduler.stop_event.is_set())
+        self.assertTrue(all(solver.stopped for solver in scheduler.solvers))
+        # a stopped computation does not start any other solve
+        self.assertRaises(subprocess.TimeoutExpired, scheduler.solve, backend='milp')
+        self.assertRaises(subprocess.TimeoutExpired, scheduler.solve_rolling_horizon, datetime.timedelta(hours=2),
+                          datetime.timedelta(0), backend='milp')
+
+    def test_apply(self):
+        # the best schedule of a stopped computation can be applied, even if the computation failed
+        self.assertTrue(ScheduleRun(status=False, result_dict='{"1": [2]}').can_be_applied)
+        self.assertTrue(ScheduleRun(status=None, result_dict='{"1": [2]}').can_be_applied)
+        self.assertFalse(ScheduleRun(status=False, result_dict='{}').can_be_applied)
+        self.assertFalse(ScheduleRun(status=None).can_be_applied)
+
+
+class TestComputeTime(BaseTest):
+    def test_shared_time(self):
+        org, agents, (category, ) = self.create_organization(agent_count=3)
+        for i, agent in enumerate(agents):
+            AgentCategoryPreferences.objects.create(organization=org, agent=agent, category=category, affinity=i)
+        tasks = [self.create_task(org, 'E%d' % i, i, i + 2, [category]) for i in range(4)]
+        scheduler = Scheduler(org)
+        TimeoutBackend.compute_times = []
+        result_list = scheduler.solve(backend='autoplanner.tests.test_constraints.TimeoutBackend',
+                                      hint=[(agents[0].pk, tasks[0].pk)], max_compute_time=5)
+        # the hint is rejected when it cannot be completed in time, and the model is still solved
+        self.assertFalse(scheduler.hint_accepted)
+        self.assertEqual(4, len(result_list))
+        compute_times = TimeoutBackend.compute_times
+        self.assertEqual(2, len(compute_times))
+        self.assertLessEqual(compute_times[0], 2.5)
+        self.assertLessEqual(compute_times[1], 5)
+
+
+class IncumbentBackend(MilpBackend):
+    """Report the solution of each solve as an incumbent"""
+
+    def solve(self, model, verbose=False, max_compute_time=None, schedule_run=None, hint=None, on_incumbent=None):
+        values = super().solve(model, verbose=verbose, max_compute_time=max_compute_time, schedule_run=schedule_run,
+                               hint=hint)
+        if on_incumbent and values:
+            on_incumbent(values)
+        return values
+
+
+class TestRollingHorizon(BaseTest):
+    def solve(self, org, length, overlap, **kwargs):
+        """Solve the schedule by windows of `length` hours, and return the result as `{task name: agent name}` and
+        the calls to :meth:`Scheduler.restrict` for each window, as `(task names, fixed task names, offsets)`"""
+        scheduler = Scheduler(org)
+        with mock.patch.object(Scheduler, 'restrict', autospec=True, side_effect=Scheduler.restrict) as restrict:
+            result_list = scheduler.solve_rolling_horizon(datetime.timedelta(hours=length),
+                                                          datetime.timedelta(hours=overlap), **kwargs)
+        task_names = {x.pk: x.name for x in scheduler.tasks}
+        agent_names = {x.pk: x.name for x in scheduler.agents}
+        windows = [(sorted(x.name for x in call[0][1]), sorted(task_names[x] for x in call[0][2]), call[0][3])
+                   for call in restrict.call_args_list if call[0][0] is scheduler]
+        self.assertEqual(len(result_list), len({x[1] for x in result_list}))
+        return {task_names[task_pk]: agent_names[agent_pk] for (agent_pk, task_pk) in result_list}, windows
+
+    def test_overlap(self):
+        org, agents, (category, ) = self.create_organization(
+            categories=[{'balancing_mode': Category.BALANCE_NUMBER, 'balancing_tolerance': 0}])
+        AgentCategoryPreferences.objects.create(organization=org, agent=agents[0], category=category, affinity=1)
+        for i in range(8):
+            self.create_task(org, 'E%d' % i, i, i + 1, [category])
+        incumbents = []
+        result_dict, windows = self.solve(org, 4, 2, backend='autoplanner.tests.test_constraints.IncumbentBackend',
+                                          on_incumbent=lambda x, y: incumbents.append({task_pk for (__, task_pk) in x}))
+        self.assertEqual(8, len(result_dict))
+        # the tasks of the overlap are solved again with the next window, without being fixed
+        self.assertEqual([['E0', 'E1', 'E2', 'E3'], ['E2', 'E3', 'E4', 'E5'], ['E4', 'E5', 'E6', 'E7']],
+                         [x[0] for x in windows])
+        self.assertEqual([[], [], []], [x[1] for x in windows])
+        # the incumbents of a window are completed by the frozen tasks
+        self.assertEqual([4, 6, 8], sorted({len(x) for x in incumbents}))
+        self.assertEqual(set(org.task_set.values_list('pk', flat=True)), incumbents[-1])
+        self.assertRaises(ValueError, self.solve, org, 4, 4)
+        self.assertRaises(ValueError, self.solve, org, 4, 5)
+
+    def test_balancing_offsets(self):
+        org, agents, (category, ) = self.create_organization(
+            categories=[{'balancing_mode': Category.BALANCE_NUMBER, 'balancing_tolerance': 1}])
+        AgentCategoryPreferences.objects.create(organization=org, agent=agents[0], category=category, affinity=10)
+        self.create_task(org, 'E0', 0, 1, [category], agent=agents[0], fixed=True)
+        for i in range(1, 4):
+            self.create_task(org, 'E%d' % i, i + 3, i + 4, [category])
+        result_dict, windows = self.solve(org, 4, 0, backend='milp')
+        # E0 is counted in the second window: A0 can only perform one more task
+        self.assertEqual([['E0'], ['E1', 'E2', 'E3']], [x[0] for x in windows])
+        self.assertEqual({category.pk: {agents[0].pk: 1}}, windows[1][2])
+        self.assertEqual(2, list(result_dict.values()).count('A0'))
+
+    def test_max_affectations(self):
+        org, agents, (category, ) = self.create_organization()
+        AgentCategoryPreferences.objects.create(organization=org, agent=agents[0], category=category, affinity=10)
+        for i in range(4):
+            self.create_task(org, 'E%d' % i, 2 * i, 2 * i + 1, [category])
+        MaxTaskAffectation.objects.create(organization=org, category=category, task_maximum_count=1,
+                                          range_time_slice_days=0, range_time_slice_hours=3)
+        result_dict, windows = self.solve(org, 4, 0, backend='milp')
+        # E1 and E2 are in the same period of the rule, but not in the same window: E1 is fixed in the second one
+        self.assertEqual([(['E0', 'E1'], []), (['E1', 'E2', 'E3'], ['E1'])], [x[:2] for x in windows])
+        self.assertEqual(4, len(result_dict))
+        self.assertTrue(all(result_dict['E%d' % i] != result_dict['E%d' % (i + 1)] for i in range(3)))
@@ -0,0 +1,43 @@
+import datetime
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils.timezone import utc
+
+from autoplanner.diagnosis import Diagnosis
+from autoplanner.models import Organization, Agent, Category, Task, MaxTaskAffectation
+from autoplanner.schedule import Scheduler
+
+__author__ = 'Matthieu Gallet'
+
+
+@override_settings(SOLVER_WORKERS=1)
+class TestDiagnosis(TestCase):
+    @staticmethod
+    def get_time(value):
+        return datetime.datetime(2016, 1, 1, value, 0, 0, tzinfo=utc)
+
+    def get_organization(self, task_count, overlap=False):
+        org = Organization.objects.create(name='O')
+        agents = [Agent.objects.create(organization=org, name='A0'),
+                  Agent.objects.create(organization=org, name='A1', end_time=self.get_time(23))]
+        category = Category.objects.create(organization=org, name='C1', balancing_mode=Category.BALANCE_NUMBER,
+                                           balancing_tolerance=0)
+        for i in range(task_count):
+            hour = 0 if overlap else i
+            task = Task.objects.create(organization=org, name='E%d' % i, start_time=self.get_time(hour),
+                                       end_time=self.get_time(hour + 1), agent=agents[0] if i == 0 else None,
+                                       fixed=(i == 0))
+            task.categories.set([category])
+        MaxTaskAffectation.objects.create(organization=org, category=category, task_maximum_count=5,
+                                          range_time_slice_days=1, range_time_slice_hours=0)
+        return org
+
+    def test_balancing(self):
+        diagnosis = Diagnosis(Scheduler(self.get_organization(3)), backend='milp')
+        self.assertEqual(4, len(diagnosis.groups))
+        self.assertEqual(['balancing of C1'], diagnosis.run())
+
+    def test_not_enough_agents(self):
+        diagnosis = Diagnosis(Scheduler(self.get_organization(3, overlap=True)), backend='milp')
+        self.assertEqual([], diagnosis.run())
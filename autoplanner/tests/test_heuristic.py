@@ -0,0 +1,51 @@
+import datetime
+
+from django.test import TestCase
+from django.utils.timezone import utc
+
+from autoplanner.heuristic import HeuristicSolver
+from autoplanner.models import Organization, Agent, Category, Task, MaxTaskAffectation
+from autoplanner.schedule import Scheduler
+
+__author__ = 'Matthieu Gallet'
+
+
+class TestHeuristic(TestCase):
+    @staticmethod
+    def get_time(value):
+        return datetime.datetime(2016, 1, 1, value, 0, 0, tzinfo=utc)
+
+    def get_organization(self):
+        org = Organization.objects.create(name='O')
+        agents = [Agent.objects.create(organization=org, name='A%d' % i) for i in range(3)]
+        category = Category.objects.create(organization=org, name='C1', balancing_mode=Category.BALANCE_NUMBER,
+                                           balancing_tolerance=0)
+        for i in range(9):
+            task = Task.objects.create(organization=org, name='E%d' % i, start_time=self.get_time(i // 2),
+                                       end_time=self.get_time(i // 2 + 1), agent=agents[0] if i == 0 else None,
+                                       fixed=(i == 0))
+            task.categories.set([category])
+        MaxTaskAffectation.objects.create(organization=org, category=category, task_maximum_count=2,
+                                          range_time_slice_days=0, range_time_slice_hours=2)
+        return org
+
+    def test_valid(self):
+        org = self.get_organization()
+        heuristic = HeuristicSolver(Scheduler(org))
+        result_list = heuristic.solve(max_compute_time=1.)
+        self.assertTrue(heuristic.is_valid)
+        self.assertEqual(9, len(result_list))
+        self.assertIn((org.agent_set.get(name='A0').pk, org.task_set.get(name='E0').pk), result_list)
+        # the exact solver accepts the heuristic schedule as a complete solution
+        scheduler = Scheduler(org)
+        scheduler.solve(backend='milp', hint=result_list)
+        self.assertTrue(scheduler.hint_accepted)
+
+    def test_infeasible(self):
+        org = self.get_organization()
+        Task.objects.create(organization=org, name='E9', start_time=self.get_time(0),
+                            end_time=self.get_time(1)).categories.set(org.category_set.all())
+        heuristic = HeuristicSolver(Scheduler(org))
+        heuristic.solve(max_compute_time=0.1)
+        self.assertFalse(heuristic.is_valid)
+        self.assertIn('balancing', heuristic.violations)
@@ -0,0 +1,71 @@
+from django.test import TestCase
+
+from autoplanner.linear_model import LinearModel
+
+__author__ = 'Matthieu Gallet'
+
+
+class TestLinearModel(TestCase):
+    def get_model(self):
+        model = LinearModel({'v': 'v_a%s_e%s'})
+        x_1 = model.variable(('v', 1, 1), upper=1., integer=True)
+        x_2 = model.variable(('v', 2, 1), upper=1., integer=True)
+        model.objective[x_1] = -2.
+        model.add_row([x_1, x_2], None, model.EQ, 1, 'all_tasks')
+        model.add_row([x_1, x_2], [3600., -1.5], model.LE, 7200, 'balancing')
+        model.add_row([x_2], None, model.GE, 1, 'fixed_tasks')
+        return model
+
+    def test_arrays(self):
+        model = self.get_model()
+        self.assertEqual(2, model.variable_count)
+        self.assertEqual(3, model.row_count)
+        self.assertEqual(5, model.nonzero_count)
+        columns, coefficients, sense, rhs = model.row(1)
+        self.assertEqual([0, 1], list(columns))
+        self.assertEqual([3600., -1.5], list(coefficients))
+        self.assertEqual((model.LE, 7200.), (sense, rhs))
+        self.assertEqual({'all_tasks': 1, 'balancing': 1, 'fixed_tasks': 1}, model.family_counts())
+
+    def test_lp_statements(self):
+        self.assertEqual(['min: -2 v_a1_e1',
+                          'v_a1_e1 + v_a2_e1 = 1',
+                          '3600 v_a1_e1 - 1.5 v_a2_e1 <= 7200',
+                          'R3: v_a2_e1 >= 1',
+                          'v_a1_e1 <= 1',
+                          'v_a2_e1 <= 1',
+                          'int v_a1_e1',
+                          'int v_a2_e1'], list(self.get_model().lp_statements()))
+
+    def test_subset(self):
+        model = self.get_model()
+        subset = model.subset([0, 2])
+        self.assertEqual((2, 2, {'all_tasks': 1, 'fixed_tasks': 1}),
+                         (subset.variable_count, subset.row_count, subset.family_counts()))
+        self.assertEqual([], model.violated_rows(range(model.row_count), {1: 1.}))
+        self.assertEqual([0], model.violated_rows(range(model.row_count), {0: 1., 1: 1.}))
+        self.assertEqual([0, 2], model.violated_rows(range(model.row_count), {}))
+
+    def test_split(self):
+        model = self.get_model()
+        x_3 = model.variable(('v', 1, 2), upper=1., integer=True)
+        model.add_row([x_3], None, model.LE, 1, 'single_task')
+        (model_1, indices_1), (model_2, indices_2) = model.split()
+        self.assertEqual([0, 1], indices_1)
+        self.assertEqual(3, model_1.row_count)
+        self.assertEqual(-2., model_1.objective[0])
+        self.assertEqual([2], indices_2)
+        self.assertEqual(['R1: v_a1_e2 <= 1', 'v_a1_e2 <= 1', 'int v_a1_e2'], list(model_2.lp_statements())[1:])
+
+    def test_fingerprint(self):
+        model = LinearModel({'v': 'v_a%s_e%s'})
+        x_2 = model.variable(('v', 2, 1), upper=1., integer=True)
+        x_1 = model.variable(('v', 1, 1), upper=1., integer=True)
+        model.add_row([x_2], None, model.GE, 1, 'fixed_tasks')
+        model.add_row([x_2, x_1], [-1.5, 3600.], model.LE, 7200, 'balancing')
+        model.add_row([x_2, x_1], None, model.EQ, 1, 'all_tasks')
+        model.objective[x_1] = -2.
+        self.assertEqual(self.get_model().fingerprint(), model.fingerprint())
+        self.assertNotEqual(self.get_model().fingerprint(), model.fingerprint((1, 0)))
+        model.rhs[0] = 0.
+        self.assertNotEqual(self.get_model().fingerprint(), model.fingerprint())
@@ -0,0 +1,50 @@
+import datetime
+
+from django.test import TestCase
+from django.utils.timezone import utc
+
+from autoplanner.loader import OrganizationData, TaskArray
+from autoplanner.models import Organization, Agent, Category, Task, MaxTimeTaskAffectation, AgentTaskExclusion
+
+__author__ = 'Matthieu Gallet'
+
+
+class TestLoader(TestCase):
+    @staticmethod
+    def get_time(value):
+        return datetime.datetime(2016, 1, 1, value, 0, 0, tzinfo=utc)
+
+    def test_load(self):
+        org = Organization.objects.create(name='O')
+        agent_1 = Agent.objects.create(organization=org, name='A1')
+        category_1 = Category.objects.create(organization=org, name='C1')
+        category_2 = Category.objects.create(organization=org, name='C2')
+        task_2 = Task.objects.create(organization=org, name='E2', start_time=self.get_time(2),
+                                     end_time=self.get_time(4))
+        task_2.categories.set([category_1, category_2])
+        task_1 = Task.objects.create(organization=org, name='E1', start_time=self.get_time(0),
+                                     end_time=self.get_time(1), agent=agent_1, fixed=True)
+        invalid_task = Task.objects.create(organization=org, name='E3', start_time=self.get_time(3),
+                                           end_time=self.get_time(3))
+        AgentTaskExclusion.objects.create(organization=org, agent=agent_1, task=task_2)
+        AgentTaskExclusion.objects.create(organization=org, agent=agent_1, task=invalid_task)
+        MaxTimeTaskAffectation.objects.create(organization=org, category=category_1, range_time_slice_days=1,
+                                              task_maximum_time_days=0, task_maximum_time_hours=3)
+        data = OrganizationData(org)
+        self.assertEqual([task_1.pk, task_2.pk], [x.pk for x in data.tasks])
+        self.assertEqual([task_1.pk, task_2.pk], list(data.task_pks))
+        self.assertEqual({task_1.pk: 0, task_2.pk: 1}, data.task_ids)
+        self.assertEqual([3600., 7200.], list(data.task_durations))
+        self.assertEqual([self.get_time(0).timestamp(), self.get_time(2).timestamp()], list(data.task_start_times))
+        self.assertEqual([self.get_time(1).timestamp(), self.get_time(4).timestamp()], list(data.task_end_times))
+        self.assertEqual({task_1.pk: 3600., task_2.pk: 7200.}, dict(TaskArray(data.task_ids, data.task_durations)))
+        self.assertEqual({category_1.pk: 0, category_2.pk: 1}, data.category_ids)
+        self.assertEqual([agent_1.pk], list(data.agent_pks))
+        self.assertEqual([[], [category_1.pk, category_2.pk]], [sorted(x) for x in data.categories_by_task])
+        self.assertEqual((agent_1.pk, True), (data.tasks[0].agent_id, data.tasks[0].fixed))
+        self.assertEqual([(agent_1.pk, task_2.pk)], data.agent_task_exclusions)
+        max_affectation, = data.max_affectations
+        self.assertEqual((category_1.pk, None, datetime.timedelta(hours=3)),
+                         (max_affectation.category_id, max_affectation.task_maximum_count,
+                          max_affectation.task_maximum_time))
+        self.assertEqual(['C1', 'C2'], [str(x) for x in data.categories])
@@ -0,0 +1,49 @@
+from django.test import TestCase
+
+from autoplanner.linear_model import LinearModel
+from autoplanner.presolve import presolve
+
+__author__ = 'Matthieu Gallet'
+
+
+class TestPresolve(TestCase):
+    def get_model(self):
+        model = LinearModel({'v': 'v_a%s_e%s'})
+        x_1 = model.variable(('v', 1, 1), upper=1., integer=True)
+        x_2 = model.variable(('v', 2, 1), upper=1., integer=True)
+        x_3 = model.variable(('v', 3, 1), upper=0., integer=True)  # excluded agent
+        y_1 = model.variable(('v', 1, 2), upper=1., integer=True)
+        y_2 = model.variable(('v', 2, 2), upper=1., integer=True)
+        model.objective[y_2] = -1.
+        model.add_row([x_1, x_2, x_3], None, model.EQ, 1, 'all_tasks')
+        model.add_row([y_1, y_2], None, model.EQ, 1, 'all_tasks')
+        model.add_row([x_1], None, model.EQ, 1, 'fixed_tasks')
+        model.add_row([x_1, y_1], None, model.LE, 1, 'single_task')
+        model.add_row([x_2, y_2], None, model.LE, 1, 'single_task')
+        model.add_row([x_2, y_2], None, model.LE, 1, 'single_task')
+        return model
+
+    def test_presolve(self):
+        result = presolve(self.get_model())
+        self.assertFalse(result.infeasible)
+        # x_1 = 1 forces x_2 = x_3 = 0 and y_1 = 0, so y_2 = 1
+        self.assertEqual(0, result.model.variable_count)
+        self.assertEqual(0, result.model.row_count)
+        self.assertEqual({0: 1., 4: 1.}, result.postsolve({}))
+
+    def test_duplicate_rows(self):
+        model = LinearModel({'v': 'v_a%s_e%s'})
+        columns = [model.variable(('v', agent_pk, task_pk), upper=1., integer=True)
+                   for agent_pk in (1, 2) for task_pk in (1, 2)]
+        model.add_row(columns[:2], None, model.LE, 1, 'single_task')
+        model.add_row(columns[2:], None, model.LE, 1, 'single_task')
+        model.add_row(list(reversed(columns[:2])), None, model.LE, 1, 'single_task')
+        result = presolve(model)
+        self.assertEqual({'duplicate': 1}, result.removed_rows)
+        self.assertEqual(4, result.model.variable_count)
+        self.assertEqual(2, result.model.row_count)
+
+    def test_infeasible(self):
+        model = self.get_model()
+        model.add_row([model.indices[('v', 1, 2)], model.indices[('v', 2, 2)]], None, model.GE, 3, 'all_tasks')
+        self.assertTrue(presolve(model).infeasible)
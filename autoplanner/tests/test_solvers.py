@@ -0,0 +1,156 @@
+import io
+import os
+import stat
+import subprocess
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from autoplanner.linear_model import LinearModel
+from autoplanner.solvers import LpSolveBackend, LpSolveOutputParser, PortfolioBackend, get_backend, MilpBackend, \
+    is_feasible, solve_all
+
+__author__ = 'Matthieu Gallet'
+
+
+class TestLpSolve(TestCase):
+    def test_parse_output(self):
+        std_out = b'\n'.join([b'', b'Value of objective function: 0', b'',
+                              b'Actual values of the variables:',
+                              b'v_a1_e2                         1',
+                              b'v_a2_e2                         0',
+                              b'c_c1_a1                      3600',
+                              b'', b'Actual values of the constraints:',
+                              b'R1                              1'])
+        self.assertEqual({'v_a1_e2': 1., 'c_c1_a1': 3600.}, LpSolveBackend().parse_output(std_out))
+
+    def test_parse_infeasible(self):
+        self.assertEqual({}, LpSolveBackend().parse_output(b'\nThis problem is infeasible'))
+
+    def test_parse_incumbents(self):
+        solutions = []
+        parser = LpSolveOutputParser(on_solution=lambda values, objective: solutions.append((values, objective)),
+                                     indices={b'v_a1_e1': 0, b'v_a1_e2': 1, b'v_a2_e2': 2})
+        for line in [b'', b'Improved solution being store...', b'', b'Value of objective function: 3', b'',
+                     b'Actual values of the variables:', b'v_a1_e1                         1',
+                     b'v_a1_e2                         1', b'', b'Improved solution being store...', b'',
+                     b'Value of objective function: 2', b'', b'Actual values of the variables:',
+                     b'v_a1_e1                         1', b'v_a2_e2                         1', b'',
+                     b'Actual values of the constraints:', b'R1                              1']:
+            parser.feed(line + b'\n')
+        parser.close()
+        self.assertEqual([({0: 1., 1: 1.}, 3.), ({0: 1., 2: 1.}, 2.)], solutions)
+        self.assertEqual({0: 1., 2: 1.}, parser.values)
+        self.assertFalse(parser.infeasible)
+
+
+    def get_model(self):
+        model = LinearModel({'v': 'v_a%s_e%s'})
+        variables = [model.variable(('v', agent, task), upper=1., integer=True) for agent in range(1, 4)
+                     for task in range(1, 4)]
+        for task in range(3):
+            model.add_row(variables[task::3], None, model.EQ, 1, 'all_tasks')
+        for agent in range(3):
+            model.add_row(variables[3 * agent:3 * agent + 3], None, model.LE, 2, 'single_task')
+            model.objective[variables[3 * agent]] = agent + 1.
+        return model
+
+    def test_write_model(self):
+        model = self.get_model()
+        statements = list(model.lp_statements())
+        expected = ''.join('%s;\n' % statement for statement in statements).encode()
+        for chunk_size in (1, 2, 5, len(statements), 1000):
+            solver = LpSolveBackend()
+            solver.chunk_size = chunk_size
+            fd = io.BytesIO()
+            solver.write_model(model, fd)
+            self.assertEqual(expected, fd.getvalue())
+
+    def test_model_dir(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            path = os.path.join(dirname, 'lp_solve')
+            with open(path, 'w') as fd:  # fake lp_solve binary, that only reads the model
+                fd.write('#!/bin/sh\ncat "$2" > /dev/null\necho\necho "This problem is infeasible"\n')
+            os.chmod(path, stat.S_IRWXU)
+            with override_settings(LP_SOLVE_MODEL_DIR=dirname):
+                solver = LpSolveBackend(path=path)
+                self.assertEqual({}, solver.solve(self.get_model()))
+            self.assertTrue(solver.infeasible)
+            filenames = [x for x in os.listdir(dirname) if x != 'lp_solve']
+            self.assertEqual(1, len(filenames))
+            self.assertTrue(filenames[0].startswith('autoplanner-') and filenames[0].endswith('.lp'))
+            with open(os.path.join(dirname, filenames[0]), 'rb') as fd:
+                content = fd.read()
+        fd = io.BytesIO()
+        LpSolveBackend().write_model(self.get_model(), fd)
+        self.assertEqual(fd.getvalue(), content)
+
+
+    def test_stop(self):
+        model = self.get_model()
+        with tempfile.TemporaryDirectory() as dirname:
+            path = os.path.join(dirname, 'lp_solve')
+            with open(path, 'w') as fd:  # fake lp_solve binary, that prints an improved solution and keeps running
+                fd.write('#!/bin/sh\ncat > /dev/null\nif [ "$2" = "-ia" ]; then exit 0; fi\n'
+                         'echo "Improved solution being stored"\necho "Actual values of the variables:"\n'
+                         'echo "v_a1_e1 1"\necho "v_a2_e2 1"\necho "v_a3_e3 1"\n'
+                         'echo "Actual values of the constraints:"\nexec sleep 30\n')
+            os.chmod(path, stat.S_IRWXU)
+            solver = LpSolveBackend(path=path)
+            incumbents = []
+
+            def on_incumbent(values):
+                incumbents.append(values)
+                solver.stop()
+
+            # the best solution is returned when the user stops the computation, but it is not optimal
+            self.assertEqual({0: 1., 4: 1., 8: 1.}, solver.solve(model, on_incumbent=on_incumbent))
+            self.assertEqual(1, len(incumbents))
+            self.assertFalse(solver.optimal)
+            # the next solves are refused
+            self.assertRaises(subprocess.TimeoutExpired, solve_all, solver, [model])
+            self.assertEqual([{0: 1.}], solve_all(solver, [model], fallbacks=[{0: 1.}]))
+
+
+class TestPortfolio(TestCase):
+    def get_model(self):
+        model = LinearModel({'v': 'v_a%s_e%s'})
+        x_1 = model.variable(('v', 1, 1), upper=1., integer=True)
+        x_2 = model.variable(('v', 2, 1), upper=1., integer=True)
+        model.objective[x_2] = -1.
+        model.add_row([x_1, x_2], None, model.EQ, 1, 'all_tasks')
+        return model
+
+    def test_configuration(self):
+        solver = get_backend('lp_solve:/opt/lp_solve/lp_solve -piv1 -e 7')
+        self.assertEqual(('/opt/lp_solve/lp_solve', ['-piv1', '-e', '7']), (solver.path, solver.options))
+        self.assertEqual('lp_solve:/opt/lp_solve/lp_solve -piv1 -e 7', solver.configuration)
+        solver = get_backend('highs mip_rel_gap=0.01 presolve=off parallel=true threads=2')
+        self.assertEqual({'mip_rel_gap': 0.01, 'presolve': 'off', 'parallel': True, 'threads': 2},
+                         solver.option_values())
+
+    def test_race(self):
+        self.assertRaises(ImproperlyConfigured, PortfolioBackend, configurations=['milp', 'invalid.Backend'])
+        solver = PortfolioBackend(configurations=['milp', 'milp presolve=false'])
+        self.assertEqual({1: 1.}, solver.solve(self.get_model()))
+        self.assertTrue(solver.optimal)
+        self.assertEqual(1, sum(solver.winning_configurations().values()))
+        self.assertIn(list(solver.winning_configurations())[0], {'milp', 'milp presolve=false'})
+
+
+class TestFeasibility(TestCase):
+    def test_zero_solution(self):
+        model = LinearModel({'v': 'v_a%s_e%s'})
+        x_1 = model.variable(('v', 1, 1), upper=1., integer=True)
+        x_2 = model.variable(('v', 2, 1), upper=1., integer=True)
+        model.objective[x_1] = 1.
+        model.add_row([x_1, x_2], None, model.LE, 1, 'single_task')
+        # the only non-zero values are returned: the solution of this model is empty
+        solver = MilpBackend()
+        self.assertEqual({}, solver.solve(model))
+        self.assertFalse(solver.infeasible)
+        self.assertTrue(is_feasible(solver, model))
+        model.add_row([x_1, x_2], None, model.GE, 3, 'all_tasks')
+        self.assertFalse(is_feasible(solver, model))
@@ -159,7 +159,7 @@ def apply_schedule_run(request, schedule_run_pk):
     opts = model_admin.model._meta
 
     result_dict = json.loads(obj.result_dict)
-    end = obj.celery_end
+    end = obj.celery_end or obj.celery_start  # the computation may be still running
     d = '%(d)s, %(t)s' % {'d': date_format(end, use_l10n=True), 't': time_format(end, use_l10n=True)}
     if not result_dict:
         messages.error(request, _('Unable to apply the invalid schedule "%(d)s".') % {'d': d})
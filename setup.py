@@ -27,6 +27,7 @@ setup(
     zip_safe=False,
     test_suite='autoplanner.tests',
     install_requires=['djangofloor>=1.1.0', 'icalendar', 'markdown', 'django', ],
+    extras_require={'milp': ['scipy>=1.9'], 'highs': ['highspy']},
     setup_requires=[],
     classifiers=['Development Status :: 5 - Production/Stable',
                  'Framework :: Django :: 1.11',